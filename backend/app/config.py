@@ -0,0 +1,77 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Database connection
+DATABASE_URL = os.getenv('DATABASE_URL')
+DB_SSLMODE = os.getenv('DB_SSLMODE', 'require')
+
+# Connection pool sizing
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))  # seconds to wait for a free connection
+DB_POOL_CHECK_INTERVAL = float(os.getenv('DB_POOL_CHECK_INTERVAL', '60'))  # seconds between idle connection health checks
+DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '3600'))  # recycle connections older than this
+
+# Metrics (/metrics) and slow-query log
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_MAX_STATEMENTS = int(os.getenv('METRICS_MAX_STATEMENTS', '500'))  # distinct SQL texts labelled before the rest share "other"
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '0'))  # log slower statements with their parameters and EXPLAIN plan; 0 disables
+
+# Catalog change notifications (see notify_catalog_changed in schema.sql)
+CATALOG_CHANNEL = os.getenv('CATALOG_CHANNEL', 'catalog_changed')
+CATALOG_RELOAD_DEBOUNCE = float(os.getenv('CATALOG_RELOAD_DEBOUNCE', '2'))  # seconds to coalesce notifications
+CATALOG_LISTEN = os.getenv('CATALOG_LISTEN', 'true').lower() == 'true'
+
+# Memory-mapped catalog snapshot shared by every worker on a host; unset loads the graph from the database
+CATALOG_SNAPSHOT_PATH = os.getenv('CATALOG_SNAPSHOT_PATH')
+
+# Admin endpoints are open when no token is configured
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+# Planner limits
+PLANNER_BATCH_MAX_CHECKS = int(os.getenv('PLANNER_BATCH_MAX_CHECKS', '5000'))
+PLANNER_TIME_BUDGET_MS = int(os.getenv('PLANNER_TIME_BUDGET_MS', '250'))  # default search budget for /generate
+
+# Gen-ed optimizer: codes still to cover when a request doesn't list them (IDEAs in Action focus capacities)
+GEN_ED_REQUIRED_CODES = [c.strip() for c in os.getenv(
+    'GEN_ED_REQUIRED_CODES',
+    'FC-AESTH,FC-CREATE,FC-GLOBAL,FC-KNOWING,FC-LAB,FC-NATSCI,FC-PAST,FC-POWER,FC-QUANT,FC-VALUES'
+).split(',') if c.strip()]
+GEN_ED_TIME_BUDGET_MS = int(os.getenv('GEN_ED_TIME_BUDGET_MS', '100'))
+
+# Degree audit
+AUDIT_BATCH_MAX_STUDENTS = int(os.getenv('AUDIT_BATCH_MAX_STUDENTS', '10000'))
+AUDIT_CLOSEST_MAX_LIMIT = int(os.getenv('AUDIT_CLOSEST_MAX_LIMIT', '100'))  # programs returned by /closest-programs
+
+# Prerequisite closure queries
+CLOSURE_MAX_DEPTH = int(os.getenv('CLOSURE_MAX_DEPTH', '20'))
+CLOSURE_MAX_PATHS = int(os.getenv('CLOSURE_MAX_PATHS', '20'))
+
+# Catalog response cache
+CACHE_TTL = float(os.getenv('CACHE_TTL', '3600'))  # seconds; entries are also dropped when the catalog changes
+CACHE_MAX_AGE = int(os.getenv('CACHE_MAX_AGE', '60'))  # Cache-Control max-age sent to clients
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1000'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')  # optional shared cache across workers
+
+# Bulk course fetch
+COURSE_BATCH_MAX_IDS = int(os.getenv('COURSE_BATCH_MAX_IDS', '500'))
+COURSE_BATCH_STREAM_CHUNK = int(os.getenv('COURSE_BATCH_STREAM_CHUNK', '100'))  # ids fetched per NDJSON chunk
+
+# Listing endpoints (/api/departments, /api/programs, ...)
+LISTING_MAX_PAGE_SIZE = int(os.getenv('LISTING_MAX_PAGE_SIZE', '1000'))
+LISTING_STREAM_CHUNK = int(os.getenv('LISTING_STREAM_CHUNK', '500'))  # rows per server-side cursor fetch when streaming
+
+# Typeahead
+AUTOCOMPLETE_MAX_LIMIT = int(os.getenv('AUTOCOMPLETE_MAX_LIMIT', '50'))
+
+# Course embeddings and semantic search
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', '384'))  # must match courses.embedding vector(n)
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+EMBEDDING_INDEX_TTL = float(os.getenv('EMBEDDING_INDEX_TTL', '300'))  # seconds before the in-memory fallback reloads
+SEMANTIC_SEARCH_PROBES = int(os.getenv('SEMANTIC_SEARCH_PROBES', '10'))  # ivfflat lists scanned per query
+SEMANTIC_SEARCH_CANDIDATES = int(os.getenv('SEMANTIC_SEARCH_CANDIDATES', '100'))  # neighbours re-ranked per query
+SEMANTIC_SEARCH_TEXT_WEIGHT = float(os.getenv('SEMANTIC_SEARCH_TEXT_WEIGHT', '0.3'))
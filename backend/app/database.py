@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+from urllib.parse import urlparse
+
+import psycopg
+from psycopg.adapt import Loader
+from psycopg.rows import dict_row, tuple_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from app import config, metrics
+
+logger = logging.getLogger(__name__)
+
+def connection_params(database_url: str) -> Dict:
+    """Build libpq connection parameters from a DATABASE_URL."""
+    url = urlparse(database_url)
+    return {
+        "host": url.hostname,
+        "port": url.port,
+        "dbname": url.path[1:],
+        "user": url.username,
+        "password": url.password,
+        "sslmode": config.DB_SSLMODE,
+        "gssencmode": "disable"
+    }
+
+
+class RawJSONLoader(Loader):
+    """Load json values as the bytes Postgres sent, without parsing them."""
+
+    def load(self, data) -> bytes:
+        return bytes(data)
+
+
+class Database:
+    """Async data-access layer over a psycopg connection pool.
+
+    Each fetch borrows its own pooled connection, so independent queries
+    can be awaited together with asyncio.gather().
+    """
+
+    def __init__(self, database_url: str, min_size: int = config.DB_POOL_MIN_SIZE,
+                 max_size: int = config.DB_POOL_MAX_SIZE, timeout: float = config.DB_POOL_TIMEOUT,
+                 max_lifetime: float = config.DB_POOL_MAX_LIFETIME):
+        if not database_url:
+            raise ValueError("DATABASE_URL must be set to create the connection pool")
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self.conn_params = connection_params(database_url)
+        self.pool = AsyncConnectionPool(
+            kwargs={**self.conn_params, "autocommit": True, "row_factory": dict_row,
+                    "cursor_factory": metrics.TimedCursor if config.METRICS_ENABLED else psycopg.AsyncCursor},
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            max_lifetime=max_lifetime,
+            open=False,
+            name="api",
+        )
+        self._health_task: Optional[asyncio.Task] = None
+
+        # Acquire latency, measured on our side of the pool
+        self._acquires = 0
+        self._acquire_time_total = 0.0
+        self._acquire_time_max = 0.0
+
+    # Lifecycle
+    async def open(self):
+        """Open the pool, wait for min_size connections and start health checks."""
+        url = self.conn_params
+        logger.info(f"Opening connection pool to {url['host']}:{url['port']}/{url['dbname']} "
+                    f"(min={self.pool.min_size}, max={self.pool.max_size})")
+        await self.pool.open(wait=True)
+        if config.DB_POOL_CHECK_INTERVAL > 0:
+            self._health_task = asyncio.create_task(self._check_idle_connections())
+
+    async def close(self):
+        """Stop health checks and close every pooled connection."""
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await self.pool.close()
+        logger.info("Connection pool closed")
+
+    async def _check_idle_connections(self):
+        # The pool discards broken connections and reconnects in the background
+        while True:
+            await asyncio.sleep(config.DB_POOL_CHECK_INTERVAL)
+            try:
+                await self.pool.check()
+            except Exception as e:
+                logger.warning(f"Connection pool health check failed: {e}")
+
+    # Queries
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a pooled connection for the duration of the block."""
+        start = time.monotonic()
+        async with self.pool.connection() as conn:
+            elapsed = time.monotonic() - start
+            self._acquires += 1
+            self._acquire_time_total += elapsed
+            self._acquire_time_max = max(self._acquire_time_max, elapsed)
+            if config.METRICS_ENABLED:
+                metrics.observe_acquire(elapsed)
+            yield conn
+
+    async def fetch_one(self, query: str, params: Optional[Sequence] = None) -> Optional[Dict]:
+        """Run a query and return the first row as a dict, or None."""
+        async with self.connection() as conn:
+            cur = await conn.execute(query, params)
+            return await cur.fetchone()
+
+    async def fetch_all(self, query: str, params: Optional[Sequence] = None) -> List[Dict]:
+        """Run a query and return all rows as dicts."""
+        async with self.connection() as conn:
+            cur = await conn.execute(query, params)
+            return await cur.fetchall()
+
+    async def fetch_json(self, query: str, params: Optional[Sequence] = None) -> Optional[bytes]:
+        """Run a query selecting one json document and return it as raw bytes, or None if no row.
+
+        For responses Postgres builds in full: the bytes can be sent to the
+        client as they are, skipping dict rows and JSON encoding in Python.
+        """
+        async with self.connection() as conn:
+            cur = conn.cursor(row_factory=tuple_row)
+            cur.adapters.register_loader("json", RawJSONLoader)
+            await cur.execute(query, params)
+            row = await cur.fetchone()
+            return row[0] if row else None
+
+    async def stream(self, query: str, params: Optional[Sequence] = None,
+                     chunk_size: int = config.LISTING_STREAM_CHUNK) -> AsyncIterator[List[Dict]]:
+        """Yield a query's rows in chunks read from a server-side cursor.
+
+        Only one chunk is held in memory at a time. The pooled connection
+        (inside a transaction, which the cursor needs) is held until the
+        generator is exhausted or closed.
+        """
+        async with self.connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor(name="stream") as cur:
+                    await cur.execute(query, params)
+                    while True:
+                        rows = await cur.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        yield rows
+
+    # Health
+    async def check(self) -> bool:
+        """Run a round trip through the pool; used by the health endpoint."""
+        try:
+            row = await self.fetch_one("SELECT 1 AS ok")
+            return row["ok"] == 1
+        except Exception as e:
+            logger.error(f"Database health check failed: {e}")
+            return False
+
+    def stats(self) -> Dict:
+        """Snapshot of pool usage for sizing and monitoring."""
+        pool_stats = self.pool.get_stats()
+        size = pool_stats.get("pool_size", 0)
+        available = pool_stats.get("pool_available", 0)
+        return {
+            "min_size": self.pool.min_size,
+            "max_size": self.pool.max_size,
+            "size": size,
+            "in_use": size - available,
+            "idle": available,
+            "waiting": pool_stats.get("requests_waiting", 0),
+            "acquires": self._acquires,
+            "acquire_time_avg_ms": (self._acquire_time_total / self._acquires * 1000) if self._acquires else 0.0,
+            "acquire_time_max_ms": self._acquire_time_max * 1000,
+            "timeouts": pool_stats.get("requests_errors", 0),
+            "connections_opened": pool_stats.get("connections_num", 0),
+            "connections_lost": pool_stats.get("connections_lost", 0),
+            "connections_errors": pool_stats.get("connections_errors", 0),
+            "returns_bad": pool_stats.get("returns_bad", 0),
+        }
+
+
+# Application-wide database, created on startup
+db: Optional[Database] = None
+
+
+async def init_db() -> Database:
+    """Create and open the application database pool."""
+    global db
+    db = Database(config.DATABASE_URL)
+    await db.open()
+    return db
+
+
+async def close_db():
+    """Close the application database pool."""
+    global db
+    if db is not None:
+        await db.close()
+        db = None
+
+
+def get_db() -> Database:
+    """FastAPI dependency returning the shared async database."""
+    if db is None:
+        raise RuntimeError("Database pool is not initialized")
+    return db
+
+
+async def listen(channel: str, callback: Callable[[Set[str]], Awaitable[None]],
+                 debounce: float = config.CATALOG_RELOAD_DEBOUNCE, resync: Set[str] = frozenset()):
+    """Call callback with the payloads received on a NOTIFY channel.
+
+    Uses a dedicated connection outside the pool. Notifications arriving
+    within the debounce window are coalesced into a single callback, since
+    one scrape commit notifies once per table it touched. Reconnects with
+    backoff if the connection drops; notifications sent while disconnected
+    are lost, so every reconnect after the first delivers the resync
+    payloads as if they had been notified. Cancel the task to stop listening.
+    """
+    pending: Set[str] = set()
+    wake = asyncio.Event()
+
+    async def dispatch():
+        while True:
+            await wake.wait()
+            await asyncio.sleep(debounce)
+            wake.clear()
+            payloads = set(pending)
+            pending.clear()
+            try:
+                await callback(payloads)
+            except Exception:
+                logger.exception(f"Handler for NOTIFY {channel} failed")
+
+    dispatcher = asyncio.create_task(dispatch())
+    backoff = 1.0
+    connected = False
+    try:
+        while True:
+            try:
+                conn = await psycopg.AsyncConnection.connect(
+                    **connection_params(config.DATABASE_URL), autocommit=True
+                )
+                async with conn:
+                    await conn.execute(f"LISTEN {channel}")
+                    logger.info(f"Listening for catalog changes on channel {channel}")
+                    backoff = 1.0
+                    if connected and resync:
+                        # Catch up on anything committed while the connection was down
+                        pending.update(resync)
+                        wake.set()
+                    connected = True
+                    async for notify in conn.notifies():
+                        pending.add(notify.payload)
+                        wake.set()
+            except psycopg.Error as e:
+                logger.warning(f"Lost LISTEN connection for {channel}: {e}; retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+    finally:
+        dispatcher.cancel()
@@ -0,0 +1,315 @@
+"""Request, SQL and connection pool metrics in Prometheus text format.
+
+MetricsMiddleware times every request by route template and counts the
+bytes it sends. TimedCursor, installed as the pool's cursor factory, times
+every statement and counts its rows. Both add to the current request's
+RequestTimings, so a route's latency splits into waiting for connections,
+running SQL, and everything else (mostly building and serializing the
+response). render() produces the /metrics body.
+"""
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import psycopg
+from psycopg import pq, sql
+from psycopg.rows import tuple_row
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# Longest repr of a slow query's parameters written to the log
+SLOW_QUERY_MAX_PARAMS_CHARS = 2000
+# Longest SQL text shown in pathfinder_db_statement_info
+STATEMENT_TEXT_CHARS = 200
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, le: Optional[str] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in sorted(self._series.items())]
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Monotonic total per label combination."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(self.labels, labels)} {_number(value)}" for labels, value in values)
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "pathfinder_http_request_duration_seconds",
+    "Request latency from receiving the request to sending the last body byte",
+    ("method", "route", "status"))
+REQUEST_SQL_DURATION = Histogram(
+    "pathfinder_http_request_sql_seconds",
+    "Time a request spent running SQL, summed over its statements (concurrent ones overlap)",
+    ("method", "route"))
+REQUEST_ACQUIRE_DURATION = Histogram(
+    "pathfinder_http_request_acquire_seconds",
+    "Time a request spent waiting for pooled connections, summed over its acquires",
+    ("method", "route"))
+RESPONSE_SIZE = Histogram(
+    "pathfinder_http_response_size_bytes", "Response body size", ("method", "route"), SIZE_BUCKETS)
+QUERY_DURATION = Histogram(
+    "pathfinder_db_query_duration_seconds",
+    "Statement execution time, including transferring its result rows", ("statement",))
+QUERY_ROWS = Histogram(
+    "pathfinder_db_query_rows", "Rows returned or affected per statement", ("statement",), ROW_BUCKETS)
+QUERY_ERRORS = Counter("pathfinder_db_query_errors_total", "Statements that raised", ("statement",))
+ACQUIRE_DURATION = Histogram("pathfinder_db_pool_acquire_seconds", "Wait for a pooled connection")
+
+METRICS = [REQUEST_DURATION, REQUEST_SQL_DURATION, REQUEST_ACQUIRE_DURATION, RESPONSE_SIZE,
+           QUERY_DURATION, QUERY_ROWS, QUERY_ERRORS, ACQUIRE_DURATION]
+
+
+# Statement labels: a short hash of the whitespace-normalized SQL text
+_statement_ids: Dict[str, str] = {}
+_statement_text: Dict[str, str] = {}
+
+
+def statement_id(query) -> str:
+    """Stable label for a statement's SQL text.
+
+    Statements beyond config.METRICS_MAX_STATEMENTS distinct texts share
+    the label "other", so dynamically built SQL can't grow the label set
+    without bound.
+    """
+    key = query if isinstance(query, str) else query.decode() if isinstance(query, bytes) else repr(query)
+    sid = _statement_ids.get(key)
+    if sid is None:
+        normalized = " ".join(key.split())
+        sid = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+        if sid not in _statement_text and len(_statement_text) >= config.METRICS_MAX_STATEMENTS:
+            sid = "other"
+        else:
+            _statement_text[sid] = normalized[:STATEMENT_TEXT_CHARS]
+        _statement_ids[key] = sid
+    return sid
+
+
+class RequestTimings:
+    """Connection and SQL time accumulated by one request."""
+
+    __slots__ = ("acquire", "sql", "queries")
+
+    def __init__(self):
+        self.acquire = 0.0
+        self.sql = 0.0
+        self.queries = 0
+
+
+# Set by MetricsMiddleware; tasks started by the request (asyncio.gather) share the same object
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def observe_acquire(elapsed: float):
+    """Record the wait for a pooled connection."""
+    ACQUIRE_DURATION.observe(elapsed)
+    timings = _current.get()
+    if timings is not None:
+        timings.acquire += elapsed
+
+
+def _observe_statement(sid: str, elapsed: float):
+    QUERY_DURATION.observe(elapsed, sid)
+    timings = _current.get()
+    if timings is not None:
+        timings.sql += elapsed
+        timings.queries += 1
+
+
+async def log_slow_query(conn: psycopg.AsyncConnection, query, params, elapsed: float, rows: int):
+    """Log a slow statement with its parameters and EXPLAIN plan.
+
+    The plan is only fetched on an idle autocommit connection: inside a
+    transaction a failing EXPLAIN would abort the caller's work.
+    """
+    plan = "(not explained: connection is inside a transaction)"
+    if conn.autocommit and conn.info.transaction_status == pq.TransactionStatus.IDLE:
+        if isinstance(query, str):
+            explain = "EXPLAIN " + query
+        elif isinstance(query, bytes):
+            explain = b"EXPLAIN " + query
+        else:
+            explain = sql.SQL("EXPLAIN ") + query
+        try:
+            # A plain cursor, so the EXPLAIN isn't itself timed and logged
+            cur = psycopg.AsyncCursor(conn, row_factory=tuple_row)
+            await cur.execute(explain, params)
+            plan = "\n".join(row[0] for row in await cur.fetchall())
+        except psycopg.Error as e:
+            plan = f"(EXPLAIN failed: {e})"
+    text = " ".join((query if isinstance(query, str) else str(query)).split())
+    logger.warning(f"Slow query [{statement_id(query)}] {elapsed * 1000:.1f} ms, {rows} rows: {text}\n"
+                   f"params: {repr(params)[:SLOW_QUERY_MAX_PARAMS_CHARS]}\n{plan}")
+
+
+class TimedCursor(psycopg.AsyncCursor):
+    """AsyncCursor that records each statement's time, row count and errors."""
+
+    async def execute(self, query, params=None, *, prepare=None, binary=None):
+        sid = statement_id(query)
+        start = time.perf_counter()
+        try:
+            await super().execute(query, params, prepare=prepare, binary=binary)
+        except Exception:
+            QUERY_ERRORS.inc(sid)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _observe_statement(sid, elapsed)
+        QUERY_ROWS.observe(max(self.rowcount, 0), sid)
+        if config.SLOW_QUERY_MS > 0 and elapsed * 1000 >= config.SLOW_QUERY_MS:
+            await log_slow_query(self.connection, query, params, elapsed, self.rowcount)
+        return self
+
+    async def executemany(self, query, params_seq, *, returning=False):
+        sid = statement_id(query)
+        start = time.perf_counter()
+        try:
+            await super().executemany(query, params_seq, returning=returning)
+        except Exception:
+            QUERY_ERRORS.inc(sid)
+            raise
+        finally:
+            _observe_statement(sid, time.perf_counter() - start)
+        QUERY_ROWS.observe(max(self.rowcount, 0), sid)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, SQL and acquire time, and response size per route.
+
+    Routes are labelled by their template (/api/courses/{course_id}), read
+    from the scope after routing; requests that match no route are
+    labelled "unmatched". Streaming responses are timed to their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_counted(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            REQUEST_DURATION.observe(time.perf_counter() - start, method, route, str(status))
+            REQUEST_SQL_DURATION.observe(timings.sql, method, route)
+            REQUEST_ACQUIRE_DURATION.observe(timings.acquire, method, route)
+            RESPONSE_SIZE.observe(size, method, route)
+
+
+def _gauges(prefix: str, stats: Dict, help: str) -> List[str]:
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            name = f"{prefix}_{key}"
+            lines += [f"# HELP {name} {help}: {key}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+    return lines
+
+
+def render(pool: Optional[Dict] = None, cache: Optional[Dict] = None) -> str:
+    """The /metrics body: every metric above, plus pool and cache stats snapshots as gauges."""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines += ["# HELP pathfinder_db_statement_info SQL text behind each statement label",
+              "# TYPE pathfinder_db_statement_info gauge"]
+    for sid, text in sorted(_statement_text.items()):
+        lines.append(f"pathfinder_db_statement_info{_labels(('statement', 'query'), (sid, text))} 1")
+    if pool:
+        lines.extend(_gauges("pathfinder_db_pool", pool, "Connection pool"))
+    if cache:
+        lines.extend(_gauges("pathfinder_cache", cache, "Response cache"))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,92 @@
+from typing import Dict, List, Optional, Tuple
+
+from app.services.prerequisite import PrerequisiteGraph
+from app.services.requirements import CompiledProgram, Requirement, bitmask, bits, credit_hours
+
+
+def apply_requirement(req: Requirement, available: int) -> Tuple[List[int], int]:
+    """Pick the completed courses that count toward one requirement.
+
+    `available` is the bitset of completed options not yet used by an earlier
+    requirement. Required courses go first, then other options in catalog
+    order until the requirement is met, never past max_credits. When it
+    can't be met, every usable course is applied as partial progress.
+    Returns (applied courses, credits applied).
+    """
+    applied: List[int] = []
+    credits = 0
+    required = bits(available & req.required_mask)
+    for course in required + bits(available & ~req.required_mask):
+        if len(applied) >= len(required) and req.is_satisfied(applied):
+            break
+        hours = req.hours[course]
+        if req.max_credits and credits + hours > req.max_credits:
+            continue
+        applied.append(course)
+        credits += hours
+    return applied, credits
+
+
+def audit_program(program: CompiledProgram, completed: int, graph: PrerequisiteGraph) -> Dict:
+    """Audit one program against a bitset of completed courses.
+
+    Requirements are evaluated in display order and a course counts toward
+    only one of them, as in the planner.
+    """
+    used = 0
+    results = []
+    for req in program.requirements:
+        available = completed & req.option_mask & ~used
+        applied, credits = apply_requirement(req, available) if available else ([], 0)
+        applied_mask = bitmask(applied)
+        used |= applied_mask
+        satisfied = req.is_satisfied(applied)
+        required_remaining = bits(req.required_mask & ~applied_mask)
+
+        courses_remaining = 0
+        if not satisfied:
+            choose_one = not req.min_courses and not req.min_credits and not req.required
+            courses_remaining = max((req.min_courses or 0) - len(applied), len(required_remaining), int(choose_one))
+        results.append({
+            "requirement_id": req.id,
+            "requirement_type": req.requirement_type,
+            "category_name": req.category_name,
+            "satisfied": satisfied,
+            "courses_applied": graph.codes(applied),
+            "credits_applied": credits,
+            "courses_remaining": courses_remaining,
+            "credits_remaining": max((req.min_credits or 0) - credits, 0),
+            "required_remaining": graph.codes(required_remaining),
+            "options_available": bin(req.option_mask & ~completed).count("1"),
+        })
+
+    return {
+        "program_id": program.program_id,
+        "name": program.name,
+        "program_type": program.program_type,
+        "satisfied": all(r["satisfied"] for r in results),
+        "requirements_satisfied": sum(1 for r in results if r["satisfied"]),
+        "requirements_total": len(results),
+        "credits_applied": sum(r["credits_applied"] for r in results),
+        "total_hours": program.total_hours,
+        "requirements": results,
+    }
+
+
+def audit_student(programs: List[Tuple[str, Optional[CompiledProgram]]], completed_courses,
+                  graph: PrerequisiteGraph) -> Dict:
+    """Audit one student's completed courses against each of their programs.
+
+    `programs` pairs each requested program_id with its compiled program,
+    or None when it doesn't exist.
+    """
+    completed = graph.indices(completed_courses)
+    mask = bitmask(completed)
+    return {
+        "completed_credits": sum(credit_hours(graph.credits[c]) for c in completed),
+        "unknown_courses": sorted(cid for cid in completed_courses if cid not in graph),
+        "programs": [
+            audit_program(program, mask, graph) if program else {"program_id": program_id, "error": "Program not found"}
+            for program_id, program in programs
+        ],
+    }
@@ -0,0 +1,154 @@
+import heapq
+import logging
+import re
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.services import prerequisite
+from app.services.prerequisite import PrerequisiteGraph
+
+logger = logging.getLogger(__name__)
+
+# Match tiers, best first
+EXACT_CODE, CODE_PREFIX, NAME_PREFIX, NAME_TOKEN = range(4)
+MATCH_TYPES = ("exact", "code", "name", "name")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Sorts after every character that appears in a key
+_HIGH = "\uffff"
+
+
+def _code_key(text: str) -> str:
+    """Normalize a course code or code prefix: 'comp 2' and 'COMP2' both give 'COMP2'."""
+    return re.sub(r"[^A-Z0-9]", "", text.upper())
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _prefix_range(keys: List[str], prefix: str) -> Tuple[int, int]:
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + _HIGH)
+
+
+class AutocompleteIndex:
+    """Sorted-array prefix index over course codes and course name tokens.
+
+    Built from the prerequisite graph, so it shares its course numbering and
+    is rebuilt whenever the graph reloads. Code lookups are a binary search
+    plus a slice; name lookups intersect the posting lists of each query token.
+    """
+
+    def __init__(self, graph: PrerequisiteGraph):
+        start = time.monotonic()
+        self.version = graph.version
+        self.course_ids = graph.course_ids
+        self.names = graph.names
+        self.credits = graph.credits
+
+        # Course codes sort in catalog order, so a prefix range is already ranked
+        codes = sorted((_code_key(cid), i) for i, cid in enumerate(graph.course_ids))
+        self.code_keys = [key for key, _ in codes]
+        self.code_courses = [i for _, i in codes]
+        self.departments = {cid.split(" ", 1)[0].upper() for cid in graph.course_ids}
+
+        postings: Dict[str, Set[int]] = {}
+        for i, name in enumerate(graph.names):
+            for token in _tokens(name or ""):
+                postings.setdefault(token, set()).add(i)
+        self.token_keys = sorted(postings)
+        self.token_courses = [frozenset(postings[t]) for t in self.token_keys]
+        # First word of each name, for ranking "starts with" matches higher
+        self.first_tokens = [(_tokens(name or "") or [""])[0] for name in graph.names]
+        self.build_ms = (time.monotonic() - start) * 1000
+
+    def _department(self, course: int) -> str:
+        return self.course_ids[course].split(" ", 1)[0]
+
+    def _courses_with_token_prefix(self, prefix: str) -> Set[int]:
+        lo, hi = _prefix_range(self.token_keys, prefix)
+        if hi - lo == 1:
+            return set(self.token_courses[lo])
+        matched: Set[int] = set()
+        for courses in self.token_courses[lo:hi]:
+            matched |= courses
+        return matched
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Top matches for a partially typed query, best first.
+
+        Exact code matches rank first, then code prefixes ("COMP 2"), then
+        names whose words start with every query token. A leading department
+        code narrows name matches ("COMP data").
+        """
+        code = _code_key(query)
+        tokens = _tokens(query)
+        if not code or limit < 1:
+            return []
+
+        ranked: List[Tuple[int, str, int]] = []
+        seen: Set[int] = set()
+
+        lo, hi = _prefix_range(self.code_keys, code)
+        for pos in range(lo, min(hi, lo + limit)):
+            course = self.code_courses[pos]
+            tier = EXACT_CODE if self.code_keys[pos] == code else CODE_PREFIX
+            ranked.append((tier, self.course_ids[course], course))
+            seen.add(course)
+
+        department: Optional[str] = None
+        if len(tokens) > 1 and tokens[0].upper() in self.departments:
+            department, tokens = tokens[0].upper(), tokens[1:]
+
+        if tokens and len(ranked) < limit:
+            candidates: Optional[Set[int]] = None
+            # Rarest-looking (longest) token first keeps the intersections small
+            for token in sorted(tokens, key=len, reverse=True):
+                matched = self._courses_with_token_prefix(token)
+                candidates = matched if candidates is None else candidates & matched
+                if not candidates:
+                    break
+            matches = (
+                (NAME_PREFIX if self.first_tokens[course].startswith(tokens[0]) else NAME_TOKEN,
+                 self.course_ids[course], course)
+                for course in candidates or ()
+                if course not in seen and (department is None or self._department(course) == department)
+            )
+            ranked.extend(heapq.nsmallest(limit - len(ranked), matches))
+
+        ranked.sort()
+        return [
+            {
+                "course_id": self.course_ids[course],
+                "name": self.names[course],
+                "credits": self.credits[course],
+                "department_code": self._department(course),
+                "match": MATCH_TYPES[tier],
+            }
+            for tier, _, course in ranked[:limit]
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "codes": len(self.code_keys),
+            "tokens": len(self.token_keys),
+            "build_ms": round(self.build_ms, 2),
+        }
+
+
+_index: Optional[AutocompleteIndex] = None
+
+
+def get_index() -> AutocompleteIndex:
+    """FastAPI dependency returning an index for the current prerequisite graph.
+
+    Rebuilt on first use after a graph reload.
+    """
+    global _index
+    graph = prerequisite.get_graph()
+    if _index is None or _index.version != graph.version:
+        _index = AutocompleteIndex(graph)
+        logger.info(f"Built autocomplete index v{graph.version} in {_index.build_ms:.0f}ms")
+    return _index
@@ -0,0 +1,267 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app import config
+from app.database import Database
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Cached value: (ETag, serialized JSON body)
+Entry = Tuple[str, bytes]
+
+
+class MemoryBackend:
+    """In-process LRU cache with a per-entry TTL and entry/byte bounds.
+
+    Also the local stand-in for a shared backend: anything with the same
+    async get/set/clear methods can be passed to ResponseCache as `shared`.
+    """
+
+    def __init__(self, max_entries: int = config.CACHE_MAX_ENTRIES, max_bytes: int = config.CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, Entry]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Entry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires, entry = item
+        if expires < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: Entry, ttl: float):
+        size = len(entry[1])
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, entry)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: str):
+        _, (_, body) = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "bytes": self._bytes, "evictions": self.evictions}
+
+
+class RedisBackend:
+    """Shared cache in Redis, so every API worker reuses the same responses.
+
+    Keys already carry the catalog version, so stale entries are simply
+    never read again and expire on their own TTL.
+    """
+
+    def __init__(self, url: str, prefix: str = "pathfinder:cache:"):
+        if redis is None:
+            raise RuntimeError("CACHE_REDIS_URL is set but the redis package is not installed")
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Entry]:
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        etag, _, body = value.partition(b"\n")
+        return etag.decode(), body
+
+    async def set(self, key: str, entry: Entry, ttl: float):
+        etag, body = entry
+        await self.client.set(self.prefix + key, etag.encode() + b"\n" + body, ex=max(1, int(ttl)))
+
+    async def clear(self):
+        # Old versions age out by TTL; nothing to do
+        pass
+
+    def stats(self) -> Dict:
+        return {"backend": "redis"}
+
+
+def serialize(content: Any) -> bytes:
+    """Encode a response body as compact UTF-8 JSON, like FastAPI's JSONResponse.
+
+    bytes are taken to be a JSON document already (e.g. from
+    Database.fetch_json) and pass through unchanged. Uses orjson (falling
+    back to json where it isn't installed), handing it anything it can't encode natively
+    (Decimal, pydantic models) via jsonable_encoder.
+    """
+    if isinstance(content, bytes):
+        return content
+    if orjson is not None:
+        return orjson.dumps(content, default=jsonable_encoder,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+class ResponseCache:
+    """Read-through cache for catalog responses, keyed by catalog version.
+
+    Lookups go local LRU -> shared backend -> loader. Concurrent misses on
+    the same key share one loader call. When the catalog version moves
+    (the scraper committed), every cached response is invalidated at once.
+    """
+
+    def __init__(self, local: Optional[MemoryBackend] = None, shared=None,
+                 ttl: float = config.CACHE_TTL, max_age: int = config.CACHE_MAX_AGE):
+        self.local = local or MemoryBackend()
+        self.shared = shared
+        self.ttl = ttl
+        self.max_age = max_age
+        self.version = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    async def set_version(self, version: int):
+        """Switch to a new catalog version, dropping responses for older ones."""
+        if version != self.version:
+            logger.info(f"Response cache invalidated: catalog v{self.version} -> v{version}")
+            self.version = version
+            await self.local.clear()
+
+    async def _lookup(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Entry:
+        entry = await self.local.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            entry = await asyncio.shield(pending)
+            if entry is None:
+                # The leading request was cancelled before loading; load it here instead
+                return await self._lookup(key, loader)
+            self.hits += 1
+            return entry
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = None
+            if self.shared is not None:
+                try:
+                    entry = await self.shared.get(key)
+                except Exception as e:
+                    logger.warning(f"Shared cache read failed: {e}")
+            if entry is not None:
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+                body = serialize(await loader())
+                entry = (etag_for(body), body)
+                if self.shared is not None:
+                    try:
+                        await self.shared.set(key, entry, self.ttl)
+                    except Exception as e:
+                        logger.warning(f"Shared cache write failed: {e}")
+            await self.local.set(key, entry, self.ttl)
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            # Only this request was cancelled (e.g. the client went away); waiters retry
+            future.set_result(None)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def respond(self, request: Request, loader: Callable[[], Awaitable[Any]]) -> Response:
+        """Serve a cached JSON response for the request, calling loader on a miss.
+
+        Answers 304 when If-None-Match already names the current body.
+        Exceptions from loader (e.g. 404s) propagate and are not cached.
+        """
+        key = f"v{self.version}:{request.url.path}?{request.url.query}"
+        etag, body = await self._lookup(key, loader)
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={self.max_age}"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "local": self.local.stats(),
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+async def load_catalog_version(db: Database) -> Optional[int]:
+    """Current catalog version, or None if the catalog_version table is missing."""
+    try:
+        row = await db.fetch_one("SELECT version FROM catalog_version")
+    except Exception as e:
+        logger.warning(f"Could not read catalog version (run migration 002?): {e}")
+        return None
+    return row["version"] if row else None
+
+
+# Application-wide response cache
+response_cache = ResponseCache(shared=RedisBackend(config.CACHE_REDIS_URL) if config.CACHE_REDIS_URL else None)
+
+
+async def refresh_version(db: Database):
+    """Re-read the catalog version and invalidate cached responses if it moved."""
+    version = await load_catalog_version(db)
+    if version is None:
+        # No shared counter in this database; fall back to a local bump
+        version = response_cache.version + 1
+    await response_cache.set_version(version)
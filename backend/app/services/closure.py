@@ -0,0 +1,160 @@
+import heapq
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on partial chains explored per path query, to keep latency bounded
+MAX_PATH_EXPANSIONS = 50000
+
+
+class ClosureIndex:
+    """Transitive closure of the prerequisite graph as reachability bitsets.
+
+    ancestors[c] has a bit set for every course that can appear somewhere
+    in c's prerequisite chain (any option of any group, prerequisites and
+    corequisites alike); descendants[c] is the reverse, every course that c
+    eventually unlocks. Both are Python ints used as bitsets, so
+    "is A upstream of B" is a single AND, and path searches only visit
+    courses that lie between the two endpoints.
+
+    Built from the requisite groups, or taken ready-made from a mapped
+    CatalogSnapshot with from_tables.
+    """
+
+    def __init__(self, prereqs, coreqs):
+        start = time.monotonic()
+        n = len(prereqs)
+        # Direct edges: course -> prerequisite options, and prerequisite -> courses it unlocks
+        self.parents: List[Tuple[int, ...]] = []
+        children: List[List[int]] = [[] for _ in range(n)]
+        for course in range(n):
+            options = sorted({o for group in prereqs[course] + coreqs[course] for o in group if o != course})
+            self.parents.append(tuple(options))
+            for option in options:
+                children[option].append(course)
+        self.children: List[Tuple[int, ...]] = [tuple(c) for c in children]
+
+        self.ancestors = self._propagate(self.parents, self.children)
+        self.descendants = self._propagate(self.children, self.parents)
+        self.closure_edges = sum(m.bit_count() for m in self.ancestors)
+        self.build_ms = (time.monotonic() - start) * 1000
+
+    @classmethod
+    def from_tables(cls, parents: Sequence[Tuple[int, ...]], children: Sequence[Tuple[int, ...]],
+                    ancestors: Sequence[int], descendants: Sequence[int], closure_edges: int) -> "ClosureIndex":
+        """An index over precomputed edges and reachability sets, e.g. a snapshot's tables."""
+        index = cls.__new__(cls)
+        index.parents = parents
+        index.children = children
+        index.ancestors = ancestors
+        index.descendants = descendants
+        index.closure_edges = closure_edges
+        index.build_ms = 0.0
+        return index
+
+    @staticmethod
+    def _propagate(inbound: List[Tuple[int, ...]], outbound: List[Tuple[int, ...]]) -> List[int]:
+        """Union reachability along inbound edges in topological order.
+
+        Courses caught in a requisite cycle (bad scrape data) are left after
+        Kahn's pass and settled by iterating to a fixpoint.
+        """
+        n = len(inbound)
+        reach = [0] * n
+        pending = [len(edges) for edges in inbound]
+        queue = deque(i for i in range(n) if pending[i] == 0)
+        settled = 0
+        while queue:
+            node = queue.popleft()
+            settled += 1
+            mask = 0
+            for source in inbound[node]:
+                mask |= reach[source] | (1 << source)
+            reach[node] = mask
+            for target in outbound[node]:
+                pending[target] -= 1
+                if pending[target] == 0:
+                    queue.append(target)
+
+        if settled < n:
+            cyclic = [i for i in range(n) if pending[i] > 0]
+            changed = True
+            while changed:
+                changed = False
+                for node in cyclic:
+                    mask = reach[node]
+                    for source in inbound[node]:
+                        mask |= reach[source] | (1 << source)
+                    if mask != reach[node]:
+                        reach[node] = mask
+                        changed = True
+            logger.warning(f"{len(cyclic)} courses are part of prerequisite cycles")
+        return reach
+
+    def is_prerequisite(self, upstream: int, course: int) -> bool:
+        """Whether upstream appears anywhere in course's prerequisite chain."""
+        return bool(self.ancestors[course] >> upstream & 1)
+
+    def _levels(self, course: int, edges: List[Tuple[int, ...]], max_depth: Optional[int]) -> Dict[int, int]:
+        depth = {course: 0}
+        queue = deque([course])
+        while queue:
+            node = queue.popleft()
+            if max_depth is not None and depth[node] >= max_depth:
+                continue
+            for nxt in edges[node]:
+                if nxt not in depth:
+                    depth[nxt] = depth[node] + 1
+                    queue.append(nxt)
+        del depth[course]
+        return depth
+
+    def prerequisites(self, course: int, max_depth: Optional[int] = None) -> Dict[int, int]:
+        """All transitive prerequisites of course, mapped to their minimum depth."""
+        if not self.ancestors[course]:
+            return {}
+        return self._levels(course, self.parents, max_depth)
+
+    def unlocks(self, course: int, max_depth: Optional[int] = None) -> Dict[int, int]:
+        """All courses that transitively require course, mapped to their minimum depth."""
+        if not self.descendants[course]:
+            return {}
+        return self._levels(course, self.children, max_depth)
+
+    def paths(self, source: int, target: int, k: int = 1, max_length: Optional[int] = None) -> List[List[int]]:
+        """Up to k shortest prerequisite chains from source to target, shortest first.
+
+        Each chain starts at source and follows "unlocks" edges to target.
+        The search is restricted to courses between the two endpoints, so
+        every partial chain can be completed.
+        """
+        if source == target or not self.is_prerequisite(source, target):
+            return []
+        between = self.descendants[source] & self.ancestors[target]
+        allowed = between | (1 << target)
+
+        paths: List[List[int]] = []
+        heap: List[Tuple[int, Tuple[int, ...]]] = [(0, (source,))]
+        expansions = 0
+        while heap and len(paths) < k and expansions < MAX_PATH_EXPANSIONS:
+            expansions += 1
+            length, path = heapq.heappop(heap)
+            node = path[-1]
+            if node == target:
+                paths.append(list(path))
+                continue
+            if max_length is not None and length >= max_length:
+                continue
+            for nxt in self.children[node]:
+                if allowed >> nxt & 1 and nxt not in path:
+                    heapq.heappush(heap, (length + 1, path + (nxt,)))
+        return paths
+
+    def stats(self) -> Dict:
+        return {
+            "build_ms": round(self.build_ms, 2),
+            "closure_edges": self.closure_edges,
+        }
@@ -0,0 +1,70 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Tuple
+
+from app.database import Database
+from app.services.cache import serialize
+
+
+def parse_ids(values: List[str]) -> List[str]:
+    """Course ids from repeated and/or comma-separated values, deduplicated in order."""
+    ids = (cid.strip() for value in values for cid in value.split(','))
+    return list(dict.fromkeys(cid for cid in ids if cid))
+
+
+async def fetch_courses(db: Database, course_ids: List[str]) -> Tuple[List[Dict], List[str]]:
+    """Course rows with their prerequisite and corequisite groups, in request order.
+
+    One query per table (courses, prerequisites) for the whole batch, run
+    concurrently. Returns (courses, ids not in the catalog).
+    """
+    rows, groups = await asyncio.gather(
+        db.fetch_all("""
+            SELECT c.course_id, c.name, c.credits, c.description, c.grading_status,
+                   c.requisites_note, d.code as department_code,
+                   (SELECT array_agg(g.gen_ed_code ORDER BY g.requirement_group, g.gen_ed_code)
+                    FROM gen_ed_fulfillments g WHERE g.course_id = c.id) as gen_ed
+            FROM courses c
+            JOIN departments d ON c.department_id = d.id
+            WHERE c.course_id = ANY(%s)
+        """, (course_ids,)),
+        db.fetch_all("""
+            SELECT
+                c.course_id as for_course,
+                p.prereq_group,
+                p.is_corequisite,
+                json_agg(
+                    json_build_object(
+                        'course_id', pc.course_id,
+                        'name', pc.name
+                    ) ORDER BY pc.course_id
+                ) as courses
+            FROM prerequisites p
+            JOIN courses c ON p.course_id = c.id
+            JOIN courses pc ON p.prereq_course_id = pc.id
+            WHERE c.course_id = ANY(%s)
+            GROUP BY c.course_id, p.prereq_group, p.is_corequisite
+            ORDER BY c.course_id, p.prereq_group
+        """, (course_ids,))
+    )
+
+    by_id = {row['course_id']: {**row, "prerequisite_groups": [], "corequisite_groups": []} for row in rows}
+    for group in groups:
+        course = by_id[group.pop('for_course')]
+        course["corequisite_groups" if group['is_corequisite'] else "prerequisite_groups"].append(group)
+    return [by_id[cid] for cid in course_ids if cid in by_id], [cid for cid in course_ids if cid not in by_id]
+
+
+async def stream_courses(db: Database, course_ids: List[str], chunk_size: int) -> AsyncIterator[bytes]:
+    """NDJSON lines, one per requested course, fetched chunk by chunk.
+
+    Unknown ids come out as {"course_id": ..., "error": "Course not found"}
+    so every requested id gets exactly one line.
+    """
+    for start in range(0, len(course_ids), chunk_size):
+        chunk = course_ids[start:start + chunk_size]
+        found, _ = await fetch_courses(db, chunk)
+        found_by_id = {course['course_id']: course for course in found}
+        yield b"".join(
+            serialize(found_by_id.get(cid, {"course_id": cid, "error": "Course not found"})) + b"\n"
+            for cid in chunk
+        )
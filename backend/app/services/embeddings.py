@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app import config
+from app.database import Database
+
+logger = logging.getLogger(__name__)
+
+_model = None
+
+
+def load_model():
+    """Load the local sentence-transformers model once per process."""
+    global _model
+    if _model is None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("Semantic search needs the sentence-transformers package installed")
+        start = time.monotonic()
+        model = SentenceTransformer(config.EMBEDDING_MODEL, device="cpu")
+        dim = model.get_sentence_embedding_dimension()
+        if dim != config.EMBEDDING_DIM:
+            raise RuntimeError(f"{config.EMBEDDING_MODEL} produces {dim}-d vectors but "
+                               f"EMBEDDING_DIM is {config.EMBEDDING_DIM}")
+        _model = model
+        logger.info(f"Loaded embedding model {config.EMBEDDING_MODEL} in {time.monotonic() - start:.1f}s")
+    return _model
+
+
+def course_text(course: Dict) -> str:
+    """Text embedded for a course: code, title and description."""
+    parts = [course.get("course_id"), course.get("name"), course.get("description")]
+    return ". ".join(p.strip() for p in parts if p)
+
+
+def encode(texts: Sequence[str], batch_size: int = config.EMBEDDING_BATCH_SIZE) -> np.ndarray:
+    """Unit-length float32 embeddings, one row per text."""
+    model = load_model()
+    return model.encode(list(texts), batch_size=batch_size, normalize_embeddings=True,
+                        convert_to_numpy=True, show_progress_bar=False).astype(np.float32)
+
+
+def to_vector(embedding: Sequence[float]) -> str:
+    """pgvector text literal, passed as a parameter and cast with ::vector."""
+    return "[" + ",".join(f"{x:.7g}" for x in embedding) + "]"
+
+
+def parse_vector(text: str) -> np.ndarray:
+    return np.array(text.strip("[]").split(","), dtype=np.float32)
+
+
+class ExactIndex:
+    """Brute-force cosine search over every course embedding held in memory.
+
+    Used when the ANN query fails or exact=true is requested,
+    and as ground truth for the recall benchmark.
+    """
+
+    def __init__(self, course_ids: List[str], vectors: np.ndarray):
+        self.course_ids = course_ids
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.maximum(norms, 1e-12)
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.course_ids)
+
+    def search(self, query: np.ndarray, k: int) -> List[tuple]:
+        """Top-k (course_id, cosine similarity) pairs, best first."""
+        if not len(self.course_ids) or k < 1:
+            return []
+        scores = self.vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.course_ids[i], float(scores[i])) for i in top]
+
+
+async def load_exact_index(db: Database) -> ExactIndex:
+    rows = await db.fetch_all(
+        "SELECT course_id, embedding::text AS embedding FROM courses WHERE embedding IS NOT NULL ORDER BY course_id"
+    )
+    vectors = np.stack([parse_vector(r["embedding"]) for r in rows]) if rows else np.zeros((0, config.EMBEDDING_DIM), np.float32)
+    return ExactIndex([r["course_id"] for r in rows], vectors)
+
+
+_exact_index: Optional[ExactIndex] = None
+_exact_lock = asyncio.Lock()
+
+
+async def get_exact_index(db: Database) -> ExactIndex:
+    """Shared ExactIndex, reloaded after EMBEDDING_INDEX_TTL seconds.
+
+    Embedding writes don't send catalog notifications, so staleness is
+    bounded by the TTL rather than invalidated.
+    """
+    global _exact_index
+    async with _exact_lock:
+        if _exact_index is None or time.monotonic() - _exact_index.loaded_at > config.EMBEDDING_INDEX_TTL:
+            _exact_index = await load_exact_index(db)
+        return _exact_index
+
+
+async def ann_candidates(db: Database, query: np.ndarray, k: int, probes: int) -> List[tuple]:
+    """Top-k (course_id, cosine similarity) pairs from the pgvector ivfflat index."""
+    async with db.connection() as conn:
+        async with conn.transaction():
+            # SET LOCAL scope: the setting ends with this transaction, not the pooled connection
+            await conn.execute("SELECT set_config('ivfflat.probes', %s, true)", (str(probes),))
+            cur = await conn.execute("""
+                SELECT course_id, 1 - (embedding <=> %(q)s::vector) AS similarity
+                FROM courses
+                WHERE embedding IS NOT NULL
+                ORDER BY embedding <=> %(q)s::vector
+                LIMIT %(k)s
+            """, {"q": to_vector(query), "k": k})
+            rows = await cur.fetchall()
+    return [(r["course_id"], float(r["similarity"])) for r in rows]
+
+
+async def semantic_search(db: Database, query: str, limit: int = 10, probes: int = config.SEMANTIC_SEARCH_PROBES,
+                          text_weight: float = config.SEMANTIC_SEARCH_TEXT_WEIGHT, exact: bool = False) -> Dict:
+    """Nearest courses to a free-text query, re-ranked with full-text relevance.
+
+    Takes SEMANTIC_SEARCH_CANDIDATES nearest neighbours (ANN via ivfflat, or
+    brute force with exact=True), then scores each as
+    (1 - text_weight) * cosine similarity + text_weight * normalized ts_rank.
+    """
+    start = time.monotonic()
+    vector = (await asyncio.to_thread(encode, [query]))[0]
+    encode_ms = (time.monotonic() - start) * 1000
+    k = max(limit, config.SEMANTIC_SEARCH_CANDIDATES)
+
+    method = "exact" if exact else "ann"
+    candidates = []
+    if not exact:
+        try:
+            candidates = await ann_candidates(db, vector, k, probes)
+        except Exception as e:
+            logger.warning(f"ANN search failed, falling back to exact search: {e}")
+            method = "exact"
+    if method == "exact":
+        candidates = (await get_exact_index(db)).search(vector, k)
+
+    rows = await db.fetch_all("""
+        SELECT c.course_id, c.name, c.credits, c.description, d.code as department_code,
+               ts_rank(c.search_vector, plainto_tsquery('english', %s)) AS text_rank
+        FROM courses c
+        JOIN departments d ON c.department_id = d.id
+        WHERE c.course_id = ANY(%s)
+    """, (query, [cid for cid, _ in candidates]))
+    by_id = {r["course_id"]: r for r in rows}
+    max_rank = max((r["text_rank"] for r in rows), default=0) or 1.0
+
+    results = []
+    for course_id, similarity in candidates:
+        row = by_id.get(course_id)
+        if row is None:
+            continue
+        text_score = row["text_rank"] / max_rank
+        results.append({
+            **row,
+            "similarity": round(similarity, 4),
+            "text_rank": round(text_score, 4),
+            "score": round((1 - text_weight) * similarity + text_weight * text_score, 4),
+        })
+    results.sort(key=lambda r: r["score"], reverse=True)
+
+    return {
+        "query": query,
+        "method": method,
+        "probes": probes if method == "ann" else None,
+        "candidates": len(candidates),
+        "encode_ms": round(encode_ms, 2),
+        "total_ms": round((time.monotonic() - start) * 1000, 2),
+        "results": results[:limit],
+    }
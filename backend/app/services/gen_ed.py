@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import math
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.database import Database
+from app.services import audit
+from app.services.planner import restart_search
+from app.services.prerequisite import PrerequisiteGraph
+from app.services.requirements import DEFAULT_CREDITS, CompiledProgram, bitmask, bits, credit_hours
+
+logger = logging.getLogger(__name__)
+
+
+class GenEdIndex:
+    """gen_ed_fulfillments held in memory, numbered like the prerequisite graph.
+
+    Each course keeps its requirement groups: it can count toward one code
+    from every group at once (that's what makes double-counting possible),
+    but only one code within a group. Each code keeps a bitset of the
+    courses that fulfil it.
+    """
+
+    def __init__(self, rows: List[Dict], graph: PrerequisiteGraph):
+        self.graph_version = graph.version
+        groups: Dict[int, Dict[int, List[str]]] = {}
+        for row in rows:
+            course = graph.get(row['course_id'])
+            if course is not None:
+                groups.setdefault(course, {}).setdefault(row['requirement_group'], []).append(row['gen_ed_code'])
+        self.groups: Dict[int, Tuple[Tuple[str, ...], ...]] = {
+            course: tuple(tuple(codes) for _, codes in sorted(by_group.items()))
+            for course, by_group in groups.items()
+        }
+        self.courses_by_code: Dict[str, int] = {}
+        for course, course_groups in self.groups.items():
+            for codes in course_groups:
+                for code in codes:
+                    self.courses_by_code[code] = self.courses_by_code.get(code, 0) | (1 << course)
+
+    def candidates(self, codes) -> int:
+        """Bitset of courses fulfilling any of the codes."""
+        mask = 0
+        for code in codes:
+            mask |= self.courses_by_code.get(code, 0)
+        return mask
+
+    def match(self, courses, needed: Set[str]) -> Dict[str, int]:
+        """Maximum assignment of needed codes to courses, at most one code per course group.
+
+        Bipartite matching (augmenting paths) between needed codes and
+        (course, group) slots; returns {code: course}.
+        """
+        slots_by_code: Dict[str, List[Tuple[int, int]]] = {}
+        for course in courses:
+            for g, codes in enumerate(self.groups.get(course, ())):
+                for code in codes:
+                    if code in needed:
+                        slots_by_code.setdefault(code, []).append((course, g))
+
+        owner: Dict[Tuple[int, int], str] = {}
+
+        def augment(code: str, seen: Set[Tuple[int, int]]) -> bool:
+            for slot in slots_by_code.get(code, ()):
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                if slot not in owner or augment(owner[slot], seen):
+                    owner[slot] = code
+                    return True
+            return False
+
+        for code in sorted(slots_by_code):
+            augment(code, set())
+        return {code: course for (course, _), code in owner.items()}
+
+    def stats(self) -> Dict:
+        return {
+            "graph_version": self.graph_version,
+            "courses": len(self.groups),
+            "codes": len(self.courses_by_code),
+        }
+
+
+class GenEdOptimizer:
+    """Picks new courses covering the most remaining gen-ed codes and major requirements.
+
+    Greedy set cover: each step adds the course with the largest gain
+    (newly matchable gen-ed codes, plus one if it also counts toward an
+    unmet major requirement), preferring courses whose prerequisites are
+    already met, then fewer credits. The first pass is deterministic; later
+    passes randomize tie-breaks, and the best selection found within the
+    time budget wins.
+    """
+
+    def __init__(self, index: GenEdIndex, graph: PrerequisiteGraph, taken: Set[int], needed: Set[str],
+                 major_slots: Dict[int, Tuple[int, int]], max_courses: int):
+        self.index = index
+        self.graph = graph
+        self.taken = taken
+        self.needed = needed
+        # requirement id -> (bitset of open options, courses still needed)
+        self.major_slots = major_slots
+        self.max_courses = max_courses
+        self.candidates = bits(index.candidates(needed) & ~bitmask(taken))
+        self.blocked = {c: len(graph.missing_prerequisites(c, taken)) for c in self.candidates}
+
+    def _major_gain(self, course: int, filled: Dict[int, int]) -> Optional[int]:
+        """Requirement this course would progress, or None."""
+        for req_id, (mask, remaining) in self.major_slots.items():
+            if mask >> course & 1 and filled.get(req_id, 0) < remaining:
+                return req_id
+        return None
+
+    def _select(self, rng: Optional[random.Random]) -> Tuple[List[int], Dict[str, int], Dict[int, int]]:
+        chosen: List[int] = []
+        covered: Dict[str, int] = {}
+        filled: Dict[int, int] = {}
+        assigned: Dict[int, int] = {}
+        while len(chosen) < self.max_courses:
+            open_codes = self.needed - covered.keys()
+            best, best_key = None, None
+            for course in self.candidates:
+                if course in assigned or course in chosen:
+                    continue
+                gain = sum(1 for codes in self.index.groups[course] if open_codes.intersection(codes))
+                if not gain:
+                    continue
+                major = self._major_gain(course, filled)
+                key = (gain + (major is not None), -self.blocked[course],
+                       -credit_hours(self.graph.credits[course]), rng.random() if rng else -course)
+                if best_key is None or key > best_key:
+                    best, best_key = course, key
+            if best is None:
+                break
+            matched = self.index.match(chosen + [best], self.needed)
+            if len(matched) <= len(covered):
+                # Its codes only conflict with ones already matched
+                self.candidates = [c for c in self.candidates if c != best]
+                continue
+            chosen.append(best)
+            covered = matched
+            major = self._major_gain(best, filled)
+            if major is not None:
+                filled[major] = filled.get(major, 0) + 1
+                assigned[best] = major
+        return chosen, covered, assigned
+
+    def solve(self, time_budget: float) -> Dict:
+        candidates = self.candidates
+
+        def attempt(rng):
+            # _select drops candidates as it goes; every iteration starts from the full list
+            self.candidates = candidates
+            chosen, covered, assigned = self._select(rng)
+            credits = sum(credit_hours(self.graph.credits[c]) for c in chosen)
+            # Most codes and double counts, then fewest courses and credits (negated: lowest score wins)
+            score = (-(len(covered) + len(assigned)), len(chosen), credits)
+            # Nothing left to randomize, or every code covered with each pick also counting toward the major
+            optimal = not candidates or (len(covered) == len(self.needed) and len(assigned) == len(chosen))
+            return score, (chosen, covered, assigned), optimal
+
+        (chosen, covered, assigned), iterations, elapsed_ms = restart_search(attempt, time_budget)
+        self.candidates = candidates
+        return {
+            "chosen": chosen,
+            "covered": covered,
+            "assigned": assigned,
+            "iterations": iterations,
+            "elapsed_ms": elapsed_ms,
+        }
+
+
+def open_requirements(program: CompiledProgram, taken: Set[int], graph: PrerequisiteGraph) -> Dict[int, Tuple[int, int]]:
+    """Unmet requirements of a program: {requirement id: (open options bitset, courses still needed)}."""
+    result = audit.audit_program(program, bitmask(taken), graph)
+    taken_mask = bitmask(taken)
+    slots = {}
+    for req, status in zip(program.requirements, result["requirements"]):
+        if status["satisfied"]:
+            continue
+        remaining = max(status["courses_remaining"], math.ceil(status["credits_remaining"] / DEFAULT_CREDITS))
+        if remaining:
+            slots[req.id] = (req.option_mask & ~taken_mask, remaining)
+    return slots
+
+
+def optimize(index: GenEdIndex, graph: PrerequisiteGraph, program: Optional[CompiledProgram],
+             taken_courses: List[str], needed_codes: List[str], max_courses: int, time_budget_ms: int) -> Dict:
+    """Recommend courses that cover the most remaining gen-ed codes, counting twice toward the major where possible."""
+    taken = graph.indices(taken_courses)
+    needed = set(needed_codes)
+    already = index.match(sorted(taken), needed)
+    remaining = needed - already.keys()
+    major_slots = open_requirements(program, taken, graph) if program else {}
+
+    optimizer = GenEdOptimizer(index, graph, taken, remaining, major_slots, max_courses)
+    result = optimizer.solve(time_budget_ms / 1000)
+
+    codes_by_course: Dict[int, List[str]] = {}
+    for code, course in result["covered"].items():
+        codes_by_course.setdefault(course, []).append(code)
+    recommended = [
+        {
+            "course_id": graph.course_ids[c],
+            "name": graph.names[c],
+            "credits": graph.credits[c],
+            "gen_eds": sorted(codes_by_course.get(c, [])),
+            "requirement_id": result["assigned"].get(c),
+            "missing_prerequisites": sorted({cid for g in graph.missing_prerequisites(c, taken)
+                                             for cid in graph.codes(g)}),
+        }
+        for c in result["chosen"]
+    ]
+
+    return {
+        "gen_ed_codes": sorted(needed),
+        "already_covered": {code: graph.course_ids[c] for code, c in sorted(already.items())},
+        "recommended": recommended,
+        "covered": sorted(result["covered"]),
+        "uncovered": sorted(remaining - result["covered"].keys()),
+        "unknown_codes": sorted(code for code in needed if code not in index.courses_by_code),
+        "count_twice": sum(1 for r in recommended if r["requirement_id"] is not None and r["gen_eds"]),
+        "search": {
+            "candidates": len(optimizer.candidates),
+            "iterations": result["iterations"],
+            "elapsed_ms": round(result["elapsed_ms"], 2),
+            "time_budget_ms": time_budget_ms,
+        },
+    }
+
+
+async def load_index(db: Database, graph: PrerequisiteGraph) -> GenEdIndex:
+    rows = await db.fetch_all("""
+        SELECT c.course_id, g.gen_ed_code, g.requirement_group
+        FROM gen_ed_fulfillments g
+        JOIN courses c ON g.course_id = c.id
+        ORDER BY c.course_id, g.requirement_group, g.gen_ed_code
+    """)
+    return GenEdIndex(rows, graph)
+
+
+# Application-wide index, rebuilt when gen ed fulfillments or the prerequisite graph change
+index: Optional[GenEdIndex] = None
+_reload_lock = asyncio.Lock()
+
+
+async def reload_index(db: Database, graph: PrerequisiteGraph) -> GenEdIndex:
+    """Rebuild the gen-ed index from the database and swap it in."""
+    global index
+    async with _reload_lock:
+        index = await load_index(db, graph)
+        logger.info(f"Loaded gen ed index: {index.stats()}")
+        return index
+
+
+async def current_index(db: Database, graph: PrerequisiteGraph) -> GenEdIndex:
+    """The index, rebuilt first if it predates the graph (course numbering changed)."""
+    if index is None or index.graph_version != graph.version:
+        return await reload_index(db, graph)
+    return index
@@ -0,0 +1,57 @@
+import base64
+import json
+from typing import AsyncIterator, Callable, Dict, List, Sequence
+
+from app.services.cache import serialize
+
+
+class CursorError(ValueError):
+    """An after= cursor that doesn't decode, or that was issued by another listing."""
+
+
+def encode_cursor(listing: str, key: Sequence) -> str:
+    """Opaque cursor for the row whose sort key is key."""
+    raw = json.dumps([listing, *key], separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, listing: str, size: int) -> List:
+    """The sort key in a cursor issued by encode_cursor for the same listing."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise CursorError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size + 1 or values[0] != listing:
+        raise CursorError(f"Cursor does not belong to {listing}")
+    return values[1:]
+
+
+def page(rows: List[Dict], page_size: int, listing: str, key: Callable[[Dict], Sequence]) -> Dict:
+    """A page envelope from rows fetched with LIMIT page_size + 1.
+
+    The extra row only tells whether there is a next page; next_cursor
+    points after the last row returned.
+    """
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    return {
+        "items": rows,
+        "next_cursor": encode_cursor(listing, key(rows[-1])) if more and rows else None,
+    }
+
+
+async def stream_json(chunks: AsyncIterator[List[Dict]], format: str) -> AsyncIterator[bytes]:
+    """Serialize row chunks as they arrive: one NDJSON line per row, or one JSON array."""
+    if format == "ndjson":
+        async for rows in chunks:
+            yield b"".join(serialize(row) + b"\n" for row in rows)
+        return
+
+    first = True
+    yield b"["
+    async for rows in chunks:
+        body = b",".join(serialize(row) for row in rows)
+        yield body if first else b"," + body
+        first = False
+    yield b"]"
@@ -0,0 +1,153 @@
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.services.prerequisite import PrerequisiteGraph
+
+# Semester position of courses the student has already completed
+COMPLETED = -1
+
+
+class PlanError(ValueError):
+    """An edit that doesn't apply to the plan it was sent with."""
+
+
+class Plan:
+    """A multi-semester plan as course -> semester positions.
+
+    A course placed more than once counts from its earliest placement.
+    """
+
+    def __init__(self, graph: PrerequisiteGraph, completed_courses: Iterable[str], semesters: List[Tuple[str, List[str]]]):
+        self.graph = graph
+        self.semester_ids = [sid for sid, _ in semesters]
+        self.positions = {sid: i for i, sid in enumerate(self.semester_ids)}
+        self.courses: List[List[str]] = [list(courses) for _, courses in semesters]
+        self.completed = graph.indices(completed_courses)
+
+        self.placements: Dict[int, List[int]] = {}
+        for course in self.completed:
+            self.placements[course] = [COMPLETED]
+        for i, courses in enumerate(self.courses):
+            for course in graph.indices(courses):
+                self.placements.setdefault(course, []).append(i)
+
+    def position(self, course: int) -> Optional[int]:
+        placed = self.placements.get(course)
+        return min(placed) if placed else None
+
+    def placed_by(self, group: Tuple[int, ...], i: int) -> bool:
+        """Whether some option of a requisite group is completed or placed in semester i or earlier."""
+        for course in group:
+            position = self.position(course)
+            if position is not None and position <= i:
+                return True
+        return False
+
+    def _semester(self, semester_id: Optional[str]) -> int:
+        if semester_id not in self.positions:
+            raise PlanError(f"Unknown semester: {semester_id}")
+        return self.positions[semester_id]
+
+    def add(self, course_id: str, semester_id: Optional[str]):
+        i = self._semester(semester_id)
+        self.courses[i].append(course_id)
+        course = self.graph.get(course_id)
+        if course is not None:
+            self.placements.setdefault(course, []).append(i)
+
+    def remove(self, course_id: str, semester_id: Optional[str]):
+        i = self._semester(semester_id)
+        if course_id not in self.courses[i]:
+            raise PlanError(f"{course_id} is not planned in {semester_id}")
+        self.courses[i].remove(course_id)
+        course = self.graph.get(course_id)
+        if course is not None:
+            placed = self.placements[course]
+            placed.remove(i)
+            if not placed:
+                del self.placements[course]
+
+    def check(self, course_id: str, i: int) -> Optional[Dict]:
+        """Violation for one placement of a course, or None when it's valid.
+
+        Prerequisites must be completed or placed in an earlier semester;
+        corequisites may also share the semester. Requisites that are in
+        the plan but too late are reported as scheduled_too_late.
+        """
+        graph = self.graph
+        course = graph.get(course_id)
+        if course is None:
+            return {"course_id": course_id, "semester_id": self.semester_ids[i],
+                    "missing_prerequisites": [], "missing_corequisites": [], "scheduled_too_late": [],
+                    "warnings": ["Course not found"]}
+
+        coreq_sets = {frozenset(g) for g in graph.coreqs[course]}
+        missing_pre = [g for g in graph.prereqs[course]
+                       if not self.placed_by(g, i - 1)
+                       # "Pre- or corequisite" groups are stored as both
+                       and not (frozenset(g) in coreq_sets and self.placed_by(g, i))]
+        missing_co = [g for g in graph.coreqs[course] if not self.placed_by(g, i)]
+        if not missing_pre and not missing_co:
+            return None
+
+        unmet = {c for g in missing_pre + missing_co for c in g}
+        return {
+            "course_id": course_id,
+            "semester_id": self.semester_ids[i],
+            "missing_prerequisites": sorted({graph.course_ids[c] for g in missing_pre for c in g}),
+            "missing_corequisites": sorted({graph.course_ids[c] for g in missing_co for c in g}),
+            "scheduled_too_late": [
+                {"course_id": graph.course_ids[c], "semester_id": self.semester_ids[self.position(c)]}
+                for c in sorted(unmet, key=lambda c: graph.course_ids[c]) if self.position(c) is not None
+            ],
+            "warnings": [],
+        }
+
+    def placements_of(self, courses: Set[str]) -> List[Tuple[str, int]]:
+        return [(cid, i) for i, semester in enumerate(self.courses) for cid in semester if cid in courses]
+
+
+def validate_plan(graph: PrerequisiteGraph, completed_courses: List[str], semesters: List[Tuple[str, List[str]]],
+                  edits: List[Dict], previous: Optional[List[Dict]] = None) -> Dict:
+    """Apply edits to a plan and return its violations, re-checking only what the edits can affect.
+
+    Without previous violations every placement is checked. With them,
+    only the edited courses and the planned courses that list an edited
+    course as a direct prerequisite or corequisite are re-checked, since
+    a course's validity depends only on where its direct requisites sit.
+    """
+    start = time.monotonic()
+    plan = Plan(graph, completed_courses, semesters)
+
+    touched: Set[str] = set()
+    for edit in edits:
+        action, course_id = edit["action"], edit["course_id"]
+        if action not in ("add", "remove", "move"):
+            raise PlanError(f"Unknown edit action: {action}")
+        if action in ("remove", "move"):
+            plan.remove(course_id, edit.get("from_semester"))
+        if action in ("add", "move"):
+            plan.add(course_id, edit.get("to_semester"))
+        touched.add(course_id)
+
+    if previous is None:
+        recheck = {cid for semester in plan.courses for cid in semester}
+        kept: List[Dict] = []
+    else:
+        recheck = set(touched)
+        for course in graph.indices(touched):
+            recheck.update(graph.course_ids[c] for c in graph.closure.children[course])
+        kept = [v for v in previous if v["course_id"] not in recheck]
+
+    rechecked = plan.placements_of(recheck)
+    violations = kept + [v for v in (plan.check(cid, i) for cid, i in rechecked) if v]
+    order = {sid: i for i, sid in enumerate(plan.semester_ids)}
+    violations.sort(key=lambda v: (order.get(v["semester_id"], len(order)), v["course_id"]))
+
+    return {
+        "valid": not violations,
+        "violations": violations,
+        "semesters": [{"id": sid, "courses": courses} for sid, courses in zip(plan.semester_ids, plan.courses)],
+        "rechecked": len(rechecked),
+        "elapsed_ms": round((time.monotonic() - start) * 1000, 3),
+    }
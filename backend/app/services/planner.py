@@ -0,0 +1,294 @@
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.services.prerequisite import PrerequisiteGraph
+from app.services.audit import apply_requirement
+from app.services.requirements import Requirement, bitmask, credit_hours
+
+# Give up on randomized restarts after this many iterations without a better result
+MAX_STALE_ITERATIONS = 200
+
+
+def restart_search(select: Callable[[Optional[random.Random]], Tuple[Any, Any, bool]],
+                   time_budget: float) -> Tuple[Any, int, float]:
+    """Run select deterministically, then with seeded random tie-breaks, keeping the best result.
+
+    select(rng) returns (score, result, optimal); the lowest score wins, and
+    optimal means no later iteration can beat it. Also stops after
+    MAX_STALE_ITERATIONS iterations without improvement or once time_budget
+    seconds have passed. Returns (best result, iterations, elapsed ms).
+    """
+    start = time.monotonic()
+    deadline = start + time_budget
+    best = None
+    iterations = since_improvement = 0
+    while True:
+        rng = random.Random(iterations) if iterations else None
+        score, result, optimal = select(rng)
+        if best is None or score < best[0]:
+            best = (score, result)
+            since_improvement = 0
+        else:
+            since_improvement += 1
+        iterations += 1
+        if optimal or since_improvement >= MAX_STALE_ITERATIONS or time.monotonic() >= deadline:
+            break
+    return best[1], iterations, (time.monotonic() - start) * 1000
+
+
+class DegreePlanner:
+    """Builds a semester-by-semester plan for a set of requirement groups.
+
+    Each search iteration (1) picks courses for every unmet requirement,
+    (2) adds the prerequisite closure of those picks, choosing the cheapest
+    option in each OR group, and (3) lays the courses out in topological
+    layers under the per-semester credit cap, highest dependency chains
+    first. The first iteration is deterministic; later ones randomize
+    tie-breaks, and the best plan found within the time budget wins.
+    """
+
+    def __init__(self, graph: PrerequisiteGraph, requirements: List[Requirement], completed: Set[int],
+                 max_credits: int, max_semesters: int):
+        self.graph = graph
+        self.requirements = requirements
+        self.completed = completed
+        self.completed_mask = bitmask(completed)
+        self.max_credits = max_credits
+        self.max_semesters = max_semesters
+        self._depth: Dict[int, int] = {}
+
+        # "Pre- or corequisite" groups are stored in both lists; treat them as corequisites
+        self.hard_prereqs: Dict[int, List[Tuple[int, ...]]] = {}
+
+    def _prereqs(self, course: int) -> List[Tuple[int, ...]]:
+        groups = self.hard_prereqs.get(course)
+        if groups is None:
+            coreq_sets = {frozenset(g) for g in self.graph.coreqs[course]}
+            groups = [g for g in self.graph.prereqs[course] if frozenset(g) not in coreq_sets]
+            self.hard_prereqs[course] = groups
+        return groups
+
+    def _groups(self, course: int) -> List[Tuple[int, ...]]:
+        return self._prereqs(course) + list(self.graph.coreqs[course])
+
+    def _cost(self, course: int, visiting: Optional[Set[int]] = None) -> int:
+        """Rough number of courses needed to reach `course` from the completed set."""
+        if course in self.completed:
+            return 0
+        if course in self._depth:
+            return self._depth[course]
+        if visiting is None:
+            visiting = set()
+        if course in visiting:
+            return len(self.graph)  # Cycle: effectively unreachable
+        visiting.add(course)
+        cost = 1 + sum(
+            min(self._cost(option, visiting) for option in group)
+            for group in self._groups(course)
+            if self.completed.isdisjoint(group)
+        )
+        visiting.discard(course)
+        self._depth[course] = cost
+        return cost
+
+    def _add_with_prerequisites(self, course: int, planned: Set[int], rng: Optional[random.Random]):
+        stack = [course]
+        while stack:
+            current = stack.pop()
+            if current in planned or current in self.completed:
+                continue
+            planned.add(current)
+            for group in self._groups(current):
+                if not self.completed.isdisjoint(group) or not planned.isdisjoint(group):
+                    continue
+                stack.append(min(group, key=lambda o: (self._cost(o) + (rng.random() if rng else 0.0), o)))
+
+    def _select(self, rng: Optional[random.Random]) -> Tuple[Set[int], Dict[int, List[int]]]:
+        """Choose courses for every requirement; returns (planned courses, assignments)."""
+        used: Set[int] = set()
+        planned: Set[int] = set()
+        assignments: Dict[int, List[int]] = {}
+        for req in self.requirements:
+            # Completed courses count first, only as many as the requirement needs (as in the
+            # audit), so the rest stay free for later requirements; a course counts toward one
+            available = self.completed_mask & req.option_mask & ~bitmask(used)
+            assigned = apply_requirement(req, available)[0] if available else []
+            used.update(assigned)
+            candidates = [c for c in req.options if c not in used]
+            for course in req.required:
+                if course not in used:
+                    assigned.append(course)
+                    used.add(course)
+                    self._add_with_prerequisites(course, planned, rng)
+
+            def preference(c):
+                noise = rng.random() * 2 if rng else 0.0
+                # Courses already planned as prerequisites are free
+                return (0 if c in planned else self._cost(c)) + noise, c
+
+            candidates.sort(key=preference)
+            for course in candidates:
+                if req.is_satisfied(assigned):
+                    break
+                if course in used:
+                    continue
+                assigned.append(course)
+                used.add(course)
+                self._add_with_prerequisites(course, planned, rng)
+            assignments[req.id] = assigned
+        return planned, assignments
+
+    def _heights(self, planned: Set[int]) -> Dict[int, int]:
+        """Longest chain of planned dependents for each course (critical path priority)."""
+        dependents: Dict[int, List[int]] = {c: [] for c in planned}
+        for course in planned:
+            for group in self._prereqs(course):
+                for option in group:
+                    if option in dependents:
+                        dependents[option].append(course)
+        heights: Dict[int, int] = {}
+
+        def height(course: int, visiting: Set[int]) -> int:
+            if course in heights:
+                return heights[course]
+            if course in visiting:
+                return 0
+            visiting.add(course)
+            h = 1 + max((height(d, visiting) for d in dependents[course]), default=0)
+            visiting.discard(course)
+            heights[course] = h
+            return h
+
+        for course in planned:
+            height(course, set())
+        return heights
+
+    def _schedule(self, planned: Set[int], heights: Dict[int, int],
+                  rng: Optional[random.Random]) -> Tuple[List[List[int]], Set[int]]:
+        """Lay out planned courses in semesters; returns (semesters, unscheduled)."""
+        graph = self.graph
+        done = set(self.completed)
+        remaining = set(planned)
+        semesters: List[List[int]] = []
+
+        while remaining and len(semesters) < self.max_semesters:
+            available = [c for c in remaining
+                         if all(not done.isdisjoint(g) for g in self._prereqs(c))]
+            available.sort(key=lambda c: (-heights[c] - (rng.random() if rng else 0.0), c))
+            available_set = set(available)
+
+            semester: List[int] = []
+            credits = 0
+            for course in available:
+                if course in semester:
+                    continue
+                hours = credit_hours(graph.credits[course])
+                # Corequisites not yet taken must be added alongside
+                companions = []
+                for group in graph.coreqs[course]:
+                    if not done.isdisjoint(group) or not set(semester).isdisjoint(group):
+                        continue
+                    options = [o for o in group if o in available_set and o not in companions]
+                    if not options:
+                        companions = None
+                        break
+                    companions.append(min(options, key=lambda o: credit_hours(graph.credits[o])))
+                if companions is None:
+                    continue
+                total = hours + sum(credit_hours(graph.credits[c]) for c in companions)
+                if semester and credits + total > self.max_credits:
+                    continue
+                semester.append(course)
+                semester.extend(companions)
+                credits += total
+
+            if not semester:
+                break
+            semesters.append(semester)
+            done.update(semester)
+            remaining.difference_update(semester)
+
+        return semesters, remaining
+
+    def _attempt(self, rng: Optional[random.Random]):
+        """One search iteration, scored for restart_search."""
+        planned, assignments = self._select(rng)
+        heights = self._heights(planned)
+        semesters, unscheduled = self._schedule(planned, heights, rng)
+        credits = sum(credit_hours(self.graph.credits[c]) for c in planned)
+        score = (len(unscheduled), len(semesters), credits)
+        # Optimal once neither the dependency chain nor the credit load allows fewer semesters
+        lower_bound = max(max(heights.values(), default=0), -(-credits // self.max_credits))
+        optimal = not unscheduled and len(semesters) <= lower_bound
+        return score, (semesters, unscheduled, assignments), optimal
+
+    def solve(self, time_budget: float) -> Dict:
+        """Search for the shortest valid plan within time_budget seconds."""
+        (semesters, unscheduled, assignments), iterations, elapsed_ms = restart_search(self._attempt, time_budget)
+        return {
+            "semesters": semesters,
+            "unscheduled": unscheduled,
+            "assignments": assignments,
+            "iterations": iterations,
+            "elapsed_ms": elapsed_ms,
+        }
+
+
+def generate_plan(graph: PrerequisiteGraph, requirements: List[Requirement], completed_courses: List[str],
+                  max_credits: int, max_semesters: int, time_budget_ms: int) -> Dict:
+    """Generate a semester-by-semester plan that satisfies a program's requirements."""
+    completed = graph.indices(completed_courses)
+    planner = DegreePlanner(graph, requirements, completed, max_credits, max_semesters)
+    result = planner.solve(time_budget_ms / 1000)
+
+    fulfills: Dict[int, List[int]] = {}
+    for req_id, courses in result["assignments"].items():
+        for course in courses:
+            fulfills.setdefault(course, []).append(req_id)
+
+    def course_entry(course: int) -> Dict:
+        return {
+            "course_id": graph.course_ids[course],
+            "name": graph.names[course],
+            "credits": graph.credits[course],
+            "fulfills": fulfills.get(course, [])
+        }
+
+    semesters = [
+        {
+            "semester": i + 1,
+            "credits": sum(credit_hours(graph.credits[c]) for c in courses),
+            "courses": [course_entry(c) for c in courses]
+        }
+        for i, courses in enumerate(result["semesters"])
+    ]
+    requirement_status = []
+    for req in requirements:
+        assigned = result["assignments"].get(req.id, [])
+        requirement_status.append({
+            "requirement_id": req.id,
+            "requirement_type": req.requirement_type,
+            "category_name": req.category_name,
+            "satisfied": req.is_satisfied(assigned),
+            "completed": [graph.course_ids[c] for c in assigned if c in completed],
+            "planned": [graph.course_ids[c] for c in assigned if c not in completed]
+        })
+
+    warnings = []
+    if result["unscheduled"]:
+        warnings.append(f"{len(result['unscheduled'])} courses did not fit in {max_semesters} semesters "
+                        f"or have unmet prerequisites")
+
+    return {
+        "feasible": not result["unscheduled"] and all(r["satisfied"] for r in requirement_status),
+        "semesters": semesters,
+        "unscheduled": [course_entry(c) for c in sorted(result["unscheduled"])],
+        "requirements": requirement_status,
+        "warnings": warnings,
+        "search": {
+            "iterations": result["iterations"],
+            "elapsed_ms": round(result["elapsed_ms"], 2),
+            "time_budget_ms": time_budget_ms
+        }
+    }
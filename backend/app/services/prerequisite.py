@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from app import config
+from app.database import Database
+from app.services import snapshot
+from app.services.cache import load_catalog_version
+from app.services.closure import ClosureIndex
+from app.services.snapshot import CatalogSnapshot
+
+logger = logging.getLogger(__name__)
+
+# AND-of-OR prerequisite groups: every inner tuple must have one course satisfied
+Groups = Tuple[Tuple[int, ...], ...]
+
+
+class PrerequisiteGraph:
+    """Read-only, in-process view of the prerequisite tables.
+
+    Courses are addressed by dense integer indices (0..n-1) rather than
+    database ids, and each course's requisites are stored as AND-of-OR
+    tuples of those indices. The graph is immutable once built; reloads
+    build a new graph and swap the module-level reference.
+
+    The per-course sequences are lists when loaded from the database, or
+    read-only views over a memory-mapped CatalogSnapshot, which also
+    supplies the ClosureIndex instead of it being recomputed.
+    """
+
+    def __init__(self, course_ids: List[str], names: Sequence[str], credits: Sequence[Optional[str]],
+                 prereqs: Sequence[Groups], coreqs: Sequence[Groups],
+                 grade_requirements: Sequence[Dict[int, str]], version: int = 0,
+                 snapshot: Optional[CatalogSnapshot] = None, closure: Optional[ClosureIndex] = None):
+        self.course_ids = course_ids
+        self.names = names
+        self.credits = credits
+        self.prereqs = prereqs
+        self.coreqs = coreqs
+        self.grade_requirements = grade_requirements
+        self.version = version
+        self.snapshot = snapshot
+        self.loaded_at = time.time()
+        self.index: Dict[str, int] = {cid: i for i, cid in enumerate(course_ids)}
+        self.closure = closure or ClosureIndex(prereqs, coreqs)
+
+    def __len__(self):
+        return len(self.course_ids)
+
+    def __contains__(self, course_id: str):
+        return course_id in self.index
+
+    def get(self, course_id: str) -> Optional[int]:
+        """Return the graph index for a course code, or None if unknown."""
+        return self.index.get(course_id)
+
+    def indices(self, course_ids) -> Set[int]:
+        """Map course codes to graph indices, dropping unknown codes."""
+        index = self.index
+        return {index[cid] for cid in course_ids if cid in index}
+
+    def codes(self, indices) -> List[str]:
+        """Map graph indices back to course codes."""
+        return [self.course_ids[i] for i in indices]
+
+    def missing_prerequisites(self, course: int, completed: Set[int]) -> List[Tuple[int, ...]]:
+        """Return the prerequisite groups that no completed course satisfies."""
+        return [group for group in self.prereqs[course] if completed.isdisjoint(group)]
+
+    def missing_corequisites(self, course: int, completed: Set[int], concurrent: Set[int]) -> List[Tuple[int, ...]]:
+        """Return the corequisite groups satisfied neither before nor alongside the course."""
+        return [group for group in self.coreqs[course]
+                if completed.isdisjoint(group) and concurrent.isdisjoint(group)]
+
+    def validate_semester(self, semester_courses: List[str], completed: Set[int]) -> List[Dict]:
+        """Check every course in a semester against completed courses.
+
+        Prerequisites must be completed in an earlier term; corequisites may
+        also be taken in the same semester.
+        """
+        concurrent = self.indices(semester_courses)
+        results = []
+        for course_id in semester_courses:
+            course = self.index.get(course_id)
+            if course is None:
+                results.append({
+                    "course_id": course_id,
+                    "valid": False,
+                    "missing_prerequisites": [],
+                    "missing_corequisites": [],
+                    "warnings": ["Course not found"]
+                })
+                continue
+
+            missing_pre = self.missing_prerequisites(course, completed)
+            if missing_pre and self.coreqs[course]:
+                # "Pre- or corequisite" groups are stored as both, so taking
+                # one alongside the course also satisfies the prerequisite
+                coreq_sets = {frozenset(g) for g in self.coreqs[course]}
+                missing_pre = [g for g in missing_pre
+                               if frozenset(g) not in coreq_sets or concurrent.isdisjoint(g)]
+            missing_co = self.missing_corequisites(course, completed, concurrent)
+            warnings = []
+            if not self.prereqs[course]:
+                warnings.append("No prerequisites found for this course")
+            results.append({
+                "course_id": course_id,
+                "valid": not missing_pre and not missing_co,
+                "missing_prerequisites": sorted({self.course_ids[i] for g in missing_pre for i in g}),
+                "missing_corequisites": sorted({self.course_ids[i] for g in missing_co for i in g}),
+                "warnings": warnings
+            })
+        return results
+
+    def stats(self) -> Dict:
+        with_prereqs, prereq_edges = _counts(self.prereqs)
+        with_coreqs, coreq_edges = _counts(self.coreqs)
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "courses": len(self.course_ids),
+            "courses_with_prerequisites": with_prereqs,
+            "courses_with_corequisites": with_coreqs,
+            "prerequisite_edges": prereq_edges,
+            "corequisite_edges": coreq_edges,
+            "closure": self.closure.stats(),
+            "snapshot": self.snapshot.stats() if self.snapshot else None,
+        }
+
+
+def _counts(groups: Sequence[Groups]) -> Tuple[int, int]:
+    """(courses with any group, total options); snapshot tables count without decoding."""
+    if isinstance(groups, snapshot.GroupTable):
+        return groups.counts()
+    return sum(1 for g in groups if g), sum(len(o) for g in groups for o in g)
+
+
+def _freeze(groups: Dict[int, List[int]]) -> Groups:
+    return tuple(tuple(groups[g]) for g in sorted(groups))
+
+
+async def load_graph(db: Database, version: int = 0) -> PrerequisiteGraph:
+    """Build a PrerequisiteGraph from the courses and requisite tables."""
+    start = time.monotonic()
+    courses, prereq_rows, grade_rows = await asyncio.gather(
+        db.fetch_all("SELECT id, course_id, name, credits FROM courses ORDER BY course_id"),
+        db.fetch_all("""
+            SELECT course_id, prereq_group, prereq_course_id, is_corequisite
+            FROM prerequisites
+            ORDER BY course_id, prereq_group, prereq_course_id
+        """),
+        db.fetch_all("SELECT course_id, required_course_id, minimum_grade FROM grade_requirements")
+    )
+
+    db_to_index = {row['id']: i for i, row in enumerate(courses)}
+    n = len(courses)
+
+    prereq_groups: List[Dict[int, List[int]]] = [{} for _ in range(n)]
+    coreq_groups: List[Dict[int, List[int]]] = [{} for _ in range(n)]
+    for row in prereq_rows:
+        course = db_to_index.get(row['course_id'])
+        prereq = db_to_index.get(row['prereq_course_id'])
+        if course is None or prereq is None:
+            continue
+        target = coreq_groups if row['is_corequisite'] else prereq_groups
+        target[course].setdefault(row['prereq_group'], []).append(prereq)
+
+    grade_requirements: List[Dict[int, str]] = [{} for _ in range(n)]
+    for row in grade_rows:
+        course = db_to_index.get(row['course_id'])
+        required = db_to_index.get(row['required_course_id'])
+        if course is not None and required is not None:
+            grade_requirements[course][required] = row['minimum_grade']
+
+    graph = PrerequisiteGraph(
+        course_ids=[row['course_id'] for row in courses],
+        names=[row['name'] for row in courses],
+        credits=[row['credits'] for row in courses],
+        prereqs=[_freeze(g) for g in prereq_groups],
+        coreqs=[_freeze(g) for g in coreq_groups],
+        grade_requirements=grade_requirements,
+        version=version,
+    )
+    logger.info(f"Loaded prerequisite graph v{version}: {len(graph)} courses, "
+                f"{len(prereq_rows)} requisite rows in {(time.monotonic() - start) * 1000:.0f}ms")
+    return graph
+
+
+def graph_from_snapshot(snap: CatalogSnapshot, version: int = 0) -> PrerequisiteGraph:
+    """A PrerequisiteGraph reading courses and requisites from a mapped snapshot.
+
+    Only the course codes are copied into the worker, for the code ->
+    index lookup; requisites and the closure are read from the shared
+    mapping as courses are looked up.
+    """
+    start = time.monotonic()
+    closure = ClosureIndex.from_tables(snap.parents, snap.children, snap.ancestors, snap.descendants,
+                                       snap.closure_edges)
+    graph = PrerequisiteGraph(
+        course_ids=list(snap.course_ids),
+        names=snap.names,
+        credits=snap.credits,
+        prereqs=snap.prereqs,
+        coreqs=snap.coreqs,
+        grade_requirements=snap.grade_requirements,
+        version=version,
+        snapshot=snap,
+        closure=closure,
+    )
+    logger.info(f"Mapped prerequisite graph v{version} from {snap.path} (catalog v{snap.catalog_version}): "
+                f"{len(graph)} courses in {(time.monotonic() - start) * 1000:.0f}ms")
+    return graph
+
+
+async def refresh_snapshot(db: Database, path: str, force: bool = False) -> CatalogSnapshot:
+    """Map the catalog snapshot at path, rebuilding it first if the catalog has moved on.
+
+    Workers take turns under snapshot.build_lock: the first to find the
+    file stale rebuilds it, the rest find it current and just map it.
+    """
+    async with snapshot.build_lock(path):
+        current = snapshot.open_snapshot(path)
+        catalog_version = await load_catalog_version(db)
+        if (not force and current is not None and catalog_version is not None
+                and current.catalog_version == catalog_version):
+            return current
+
+        # Re-read if a scrape commits while the graph queries run, so the
+        # snapshot matches the catalog version it is stamped with
+        for _ in range(3):
+            built = await load_graph(db)
+            after = await load_catalog_version(db)
+            if after == catalog_version:
+                break
+            catalog_version = after
+        else:
+            # Still changing; leave the version unknown so the next reload rebuilds
+            catalog_version = None
+        size = await asyncio.to_thread(snapshot.write_snapshot, path, built, catalog_version)
+        logger.info(f"Wrote catalog snapshot {path} for catalog v{catalog_version} ({size / 1024:.0f} KiB)")
+        return snapshot.CatalogSnapshot(path)
+
+
+# Application-wide graph, loaded on startup and swapped on reload
+graph: Optional[PrerequisiteGraph] = None
+_reload_lock = asyncio.Lock()
+
+
+async def reload_graph(db: Database, rebuild_snapshot: bool = False) -> PrerequisiteGraph:
+    """Rebuild the graph and atomically swap it in.
+
+    With config.CATALOG_SNAPSHOT_PATH set the graph is mapped from the
+    shared snapshot (rebuilt first when stale, or always with
+    rebuild_snapshot); otherwise it is loaded from the database.
+    """
+    global graph
+    async with _reload_lock:
+        version = graph.version + 1 if graph else 1
+        if config.CATALOG_SNAPSHOT_PATH:
+            snap = await refresh_snapshot(db, config.CATALOG_SNAPSHOT_PATH, force=rebuild_snapshot)
+            graph = graph_from_snapshot(snap, version)
+        else:
+            graph = await load_graph(db, version)
+        return graph
+
+
+def get_graph() -> PrerequisiteGraph:
+    """FastAPI dependency returning the current prerequisite graph."""
+    if graph is None:
+        raise RuntimeError("Prerequisite graph is not loaded")
+    return graph
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.database import Database
+from app.services import audit
+from app.services.prerequisite import PrerequisiteGraph
+from app.services.requirements import CompiledProgram, Requirement, bitmask, load_programs
+
+logger = logging.getLogger(__name__)
+
+# Programs re-audited exactly per requested result, to correct the vectorized estimate
+RERANK_FACTOR = 3
+MIN_RERANK = 20
+
+
+def credits_needed(req: Requirement) -> float:
+    """Credits a requirement asks for: min_credits, or what its course counts imply.
+
+    Course counts are priced at the required courses' hours plus the
+    cheapest remaining options.
+    """
+    if not req.options:
+        # Nothing in the catalog can count toward it; only min_credits says how big it is
+        return float(req.min_credits or 0)
+    required = set(req.required)
+    required_hours = [req.hours[c] for c in req.required]
+    other_hours = sorted(req.hours[c] for c in req.options if c not in required)
+    choose_one = not req.min_courses and not req.min_credits and not req.required
+    extra = max((req.min_courses or 0) - len(required_hours), int(choose_one), 0)
+    return float(max(req.min_credits or 0, sum(required_hours) + sum(other_hours[:extra])))
+
+
+class ProgramMatchIndex:
+    """Every program's requirement-course memberships as flat NumPy arrays.
+
+    Scoring a course history against all programs is two bincounts: credits
+    of completed options per requirement (capped at what the requirement
+    needs), then covered credits per program. That estimate ignores the
+    one-course-one-requirement rule, so the best candidates are re-audited
+    exactly before ranking.
+    """
+
+    def __init__(self, programs: Dict[str, CompiledProgram], graph: PrerequisiteGraph):
+        start = time.monotonic()
+        self.graph_version = graph.version
+        self.n_courses = len(graph)
+        # Programs without requirements have nothing to measure
+        self.programs = [p for _, p in sorted(programs.items()) if p.requirements]
+        self.program_types = np.array([(p.program_type or "").lower() for p in self.programs])
+
+        entry_req, entry_course, entry_hours = [], [], []
+        req_program, need = [], []
+        self.need_by_requirement: Dict[int, float] = {}
+        for p, program in enumerate(self.programs):
+            for req in program.requirements:
+                r = len(need)
+                need.append(credits_needed(req))
+                self.need_by_requirement[req.id] = need[-1]
+                req_program.append(p)
+                for course in req.options:
+                    entry_req.append(r)
+                    entry_course.append(course)
+                    entry_hours.append(req.hours[course])
+
+        self.entry_req = np.array(entry_req, dtype=np.int32)
+        self.entry_course = np.array(entry_course, dtype=np.int32)
+        self.entry_hours = np.array(entry_hours, dtype=np.float32)
+        self.req_program = np.array(req_program, dtype=np.int32)
+        self.need = np.array(need, dtype=np.float32)
+        self.program_need = np.bincount(self.req_program, weights=self.need, minlength=len(self.programs))
+        self.build_ms = (time.monotonic() - start) * 1000
+
+    def estimate(self, completed: List[int]) -> np.ndarray:
+        """Estimated credits covered per program, for every program at once."""
+        taken = np.zeros(self.n_courses, dtype=bool)
+        taken[list(completed)] = True
+        got = np.bincount(self.entry_req, weights=self.entry_hours * taken[self.entry_course],
+                          minlength=len(self.need))
+        covered = np.minimum(got, self.need)
+        return np.bincount(self.req_program, weights=covered, minlength=len(self.programs))
+
+    def rank(self, completed: List[int], graph: PrerequisiteGraph, limit: int,
+             program_type: Optional[str] = None) -> List[Dict]:
+        """Top programs by share of required credits already covered, best first."""
+        candidates = np.flatnonzero(self.program_need > 0)
+        if program_type:
+            candidates = candidates[self.program_types[candidates] == program_type.lower()]
+        if not len(candidates):
+            return []
+
+        coverage = self.estimate(completed)[candidates] / self.program_need[candidates]
+        shortlist = max(limit * RERANK_FACTOR, MIN_RERANK)
+        if shortlist < len(candidates):
+            top = np.argpartition(-coverage, shortlist - 1)[:shortlist]
+            candidates = candidates[top]
+
+        mask = bitmask(completed)
+        results = []
+        for p in candidates:
+            program = self.programs[p]
+            exact = audit.audit_program(program, mask, graph)
+            covered = sum(min(r["credits_applied"], self.need_by_requirement[r["requirement_id"]])
+                          for r in exact["requirements"])
+            needed = float(self.program_need[p])
+            results.append({
+                "program_id": program.program_id,
+                "name": program.name,
+                "program_type": program.program_type,
+                "total_hours": program.total_hours,
+                "coverage": round(covered / needed, 4),
+                "credits_covered": round(covered),
+                "credits_needed": round(needed),
+                "credits_remaining": round(needed - covered),
+                "requirements_satisfied": exact["requirements_satisfied"],
+                "requirements_total": exact["requirements_total"],
+            })
+        results.sort(key=lambda r: (-r["coverage"], r["credits_remaining"], r["program_id"]))
+        return results[:limit]
+
+    def stats(self) -> Dict:
+        return {
+            "graph_version": self.graph_version,
+            "programs": len(self.programs),
+            "requirements": len(self.need),
+            "memberships": len(self.entry_req),
+            "build_ms": round(self.build_ms, 2),
+        }
+
+
+# Application-wide index, rebuilt when programs or the prerequisite graph change
+index: Optional[ProgramMatchIndex] = None
+_reload_lock = asyncio.Lock()
+
+
+async def reload_index(db: Database, graph: PrerequisiteGraph) -> ProgramMatchIndex:
+    """Compile every program against the current graph and swap the index in."""
+    global index
+    async with _reload_lock:
+        index = ProgramMatchIndex(await load_programs(db, None, graph), graph)
+        logger.info(f"Loaded program match index: {index.stats()}")
+        return index
+
+
+async def current_index(db: Database, graph: PrerequisiteGraph) -> ProgramMatchIndex:
+    """The index, rebuilt first if it predates the graph (course numbering changed)."""
+    if index is None or index.graph_version != graph.version:
+        return await reload_index(db, graph)
+    return index
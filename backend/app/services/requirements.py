@@ -0,0 +1,190 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from app.database import Database
+from app.services.cache import response_cache
+from app.services.prerequisite import PrerequisiteGraph
+
+# Assumed when a course's credits can't be parsed (e.g. missing from the catalog)
+DEFAULT_CREDITS = 3
+
+
+def credit_hours(credits: Optional[str]) -> int:
+    """Minimum credit hours from a catalog credits string ('3', '1-3', '3-6')."""
+    if not credits:
+        return DEFAULT_CREDITS
+    match = re.match(r'\s*(\d+)', credits)
+    return int(match.group(1)) if match else DEFAULT_CREDITS
+
+
+def course_level(course_id: str) -> Optional[int]:
+    """Numeric course level, e.g. 'COMP 426H' -> 426."""
+    match = re.search(r'\s(\d+)', course_id)
+    return int(match.group(1)) if match else None
+
+
+def level_range(level_requirement: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse level requirements like '200+', '300-400' or '400' into an inclusive range."""
+    if not level_requirement:
+        return None
+    numbers = [int(n) for n in re.findall(r'\d{3}', level_requirement)]
+    if not numbers:
+        return None
+    if '+' in level_requirement or 'above' in level_requirement.lower():
+        return numbers[0], 999
+    # '300-400' means 300- or 400-level courses
+    return min(numbers), max(numbers) + 99
+
+
+def bitmask(courses) -> int:
+    """Set of graph indices as an int bitset (bit i = course i)."""
+    mask = 0
+    for course in courses:
+        mask |= 1 << course
+    return mask
+
+
+def bits(mask: int) -> List[int]:
+    """Graph indices set in a bitset, ascending."""
+    courses = []
+    while mask:
+        low = mask & -mask
+        courses.append(low.bit_length() - 1)
+        mask ^= low
+    return courses
+
+
+class Requirement:
+    """One program_requirements row compiled against the prerequisite graph.
+
+    Options are kept both as index lists (for the planner's search) and as
+    bitsets, so checking a student's history against a requirement is a few
+    integer ANDs.
+    """
+    __slots__ = ("id", "requirement_type", "category_name", "min_courses", "min_credits", "max_credits",
+                 "level_requirement", "options", "required", "option_mask", "required_mask", "hours")
+
+    def __init__(self, row: Dict, graph: PrerequisiteGraph):
+        self.id = row['id']
+        self.requirement_type = row['requirement_type']
+        self.category_name = row['category_name']
+        self.min_courses = row['min_courses']
+        self.min_credits = row['min_credits']
+        self.max_credits = row.get('max_credits')
+        self.level_requirement = row['level_requirement']
+
+        levels = level_range(row['level_requirement'])
+        self.options: List[int] = []
+        self.required: List[int] = []
+        for course_id, is_required in zip(row['course_ids'], row['required_flags']):
+            course = graph.get(course_id)
+            if course is None:
+                continue
+            level = course_level(course_id)
+            if levels and level is not None and not levels[0] <= level <= levels[1]:
+                continue
+            self.options.append(course)
+            if is_required:
+                self.required.append(course)
+        self.option_mask = bitmask(self.options)
+        self.required_mask = bitmask(self.required)
+        self.hours: Dict[int, int] = {c: credit_hours(graph.credits[c]) for c in self.options}
+
+    def is_satisfied(self, assigned: List[int]) -> bool:
+        """Whether the courses assigned to this requirement fulfil it.
+
+        Courses marked is_required must always be taken. With no
+        min_courses/min_credits, a requirement without required courses
+        is treated as "choose one".
+        """
+        if not set(self.required) <= set(assigned):
+            return False
+        if self.min_courses and len(assigned) < self.min_courses:
+            return False
+        if self.min_credits and sum(self.hours[c] for c in assigned) < self.min_credits:
+            return False
+        if not self.min_courses and not self.min_credits and not self.required:
+            return bool(assigned) or not self.options
+        return True
+
+
+class CompiledProgram:
+    """A program's requirement groups, compiled once per catalog and graph version."""
+    __slots__ = ("program_id", "name", "program_type", "total_hours", "requirements")
+
+    def __init__(self, program_id: str, name: str, program_type: str, total_hours: Optional[int],
+                 requirements: List[Requirement]):
+        self.program_id = program_id
+        self.name = name
+        self.program_type = program_type
+        self.total_hours = total_hours
+        self.requirements = requirements
+
+
+async def load_programs(db: Database, program_ids: Optional[List[str]], graph: PrerequisiteGraph) -> Dict[str, CompiledProgram]:
+    """Compile the requirement groups of many programs (None: every program) in one query.
+
+    Unknown programs are left out.
+    """
+    if program_ids is not None and not program_ids:
+        return {}
+    ids = list(program_ids) if program_ids is not None else None
+    rows = await db.fetch_all("""
+        SELECT
+            p.program_id,
+            p.name as program_name,
+            p.program_type,
+            p.total_hours,
+            pr.id,
+            pr.requirement_type,
+            pr.category_name,
+            pr.min_courses,
+            pr.min_credits,
+            pr.max_credits,
+            pr.level_requirement,
+            COALESCE(array_agg(c.course_id ORDER BY c.course_id) FILTER (WHERE c.id IS NOT NULL), '{}') as course_ids,
+            COALESCE(array_agg(prc.is_required ORDER BY c.course_id) FILTER (WHERE c.id IS NOT NULL), '{}') as required_flags
+        FROM programs p
+        LEFT JOIN program_requirements pr ON pr.program_id = p.id
+        LEFT JOIN program_requirement_courses prc ON pr.id = prc.requirement_id
+        LEFT JOIN courses c ON prc.course_id = c.id
+        WHERE %s::text[] IS NULL OR p.program_id = ANY(%s)
+        GROUP BY p.id, pr.id
+        ORDER BY p.program_id, pr.display_order, pr.requirement_type, pr.id
+    """, (ids, ids))
+
+    programs: Dict[str, CompiledProgram] = {}
+    for row in rows:
+        program = programs.get(row['program_id'])
+        if program is None:
+            program = programs[row['program_id']] = CompiledProgram(
+                row['program_id'], row['program_name'], row['program_type'], row['total_hours'], [])
+        if row['id'] is not None:
+            program.requirements.append(Requirement(row, graph))
+    return programs
+
+
+# Compiled programs for the current (catalog version, graph version)
+_compiled: Dict[str, CompiledProgram] = {}
+_compiled_version: Optional[Tuple[int, int]] = None
+
+
+async def get_programs(db: Database, program_ids: List[str], graph: PrerequisiteGraph) -> Dict[str, CompiledProgram]:
+    """Compiled programs by program_id, loading only those not already compiled.
+
+    Entries are dropped whenever the catalog version (any catalog table
+    changed) or the graph (course numbering) moves.
+    """
+    global _compiled_version
+    version = (response_cache.version, graph.version)
+    if version != _compiled_version:
+        _compiled.clear()
+        _compiled_version = version
+    missing = [pid for pid in dict.fromkeys(program_ids) if pid not in _compiled]
+    if missing:
+        loaded = await load_programs(db, missing, graph)
+        if _compiled_version != version:
+            # The catalog moved while loading; don't cache programs compiled from the old one
+            return loaded
+        _compiled.update(loaded)
+    return {pid: _compiled[pid] for pid in program_ids if pid in _compiled}
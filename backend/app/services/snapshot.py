@@ -0,0 +1,385 @@
+"""Read-only binary catalog snapshot, memory-mapped by every API worker.
+
+The snapshot holds what PrerequisiteGraph needs: course codes, names and
+credits as offset-indexed string tables, prerequisite and corequisite
+groups as CSR arrays (course -> groups -> options), grade minimums, and
+the ClosureIndex (direct edges both ways, plus every course's ancestor and
+descendant bitsets). Workers map the same file, so the
+operating system keeps one physical copy however many workers there are,
+and a worker starts by mapping the file instead of querying the catalog
+and recomputing the closure.
+
+File layout, little-endian:
+    header     magic, format version, catalog version, build time, section count
+    directory  (name, offset, length) per section
+    sections   each starting on an 8-byte boundary
+
+A new snapshot is written beside the old one and renamed over it, so
+readers see either the old file or the new one, never a partial write.
+Workers that still map the old file keep its pages until they drop it.
+
+Tables decode an entry the first time it is read and keep the Python
+object, so hot courses cost one decode per worker while courses a worker
+never touches stay in the shared mapping only. Course codes are the
+exception: every worker decodes them all at startup for the code -> index
+lookup (and names, for the autocomplete index).
+"""
+import array
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PFCS"
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<4sIqdI")  # magic, format version, catalog version (-1: unknown), built_at, sections
+_SECTION = struct.Struct("<16sQQ")  # name, offset, length
+_ALIGN = 8
+
+
+class SnapshotError(ValueError):
+    """A snapshot file that is truncated, corrupt or from another format version."""
+
+
+# Placeholder for string table entries not decoded yet (None is a valid value)
+_UNDECODED = object()
+
+
+def _u32(values) -> bytes:
+    return array.array("I", values).tobytes()
+
+
+class StringTable:
+    """Strings stored as one UTF-8 blob plus n+1 offsets, decoded on first access.
+
+    With a null mask, entries whose mask byte is set read as None.
+    """
+
+    def __init__(self, offsets: memoryview, data: memoryview, nulls: Optional[memoryview] = None):
+        self.offsets = offsets
+        self.data = data
+        self.nulls = nulls
+        self._decoded: List = [_UNDECODED] * len(self)
+
+    @staticmethod
+    def encode(values: Sequence[Optional[str]]) -> Tuple[bytes, bytes, bytes]:
+        """(offsets, data, null mask) sections for a list of strings."""
+        offsets, chunks, size = [0], [], 0
+        for value in values:
+            chunk = (value or "").encode("utf-8")
+            chunks.append(chunk)
+            size += len(chunk)
+            offsets.append(size)
+        return _u32(offsets), b"".join(chunks), bytes(value is None for value in values)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        value = self._decoded[i]
+        if value is _UNDECODED:
+            j = i + len(self) if i < 0 else i
+            if self.nulls is not None and self.nulls[j]:
+                value = None
+            else:
+                value = str(self.data[self.offsets[j]:self.offsets[j + 1]], "utf-8")
+            self._decoded[i] = value
+        return value
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        return (self[i] for i in range(len(self)))
+
+
+class GroupTable:
+    """AND-of-OR requisite groups in CSR form: course -> groups -> options.
+
+    table[c] returns the same tuple of tuples PrerequisiteGraph stores,
+    decoded on first access.
+    """
+
+    def __init__(self, courses: memoryview, groups: memoryview, options: memoryview):
+        self.courses = courses
+        self.groups = groups
+        self.options = options
+        self._decoded: List[Optional[Tuple]] = [None] * len(self)
+
+    @staticmethod
+    def encode(per_course: Sequence[Sequence[Sequence[int]]]) -> Tuple[bytes, bytes, bytes]:
+        """(course pointers, group pointers, options) sections."""
+        courses, groups, options = [0], [0], []
+        for course_groups in per_course:
+            for group in course_groups:
+                options.extend(group)
+                groups.append(len(options))
+            courses.append(len(groups) - 1)
+        return _u32(courses), _u32(groups), _u32(options)
+
+    def __len__(self):
+        return len(self.courses) - 1
+
+    def __getitem__(self, course: int) -> Tuple[Tuple[int, ...], ...]:
+        value = self._decoded[course]
+        if value is None:
+            groups, options = self.groups, self.options
+            value = tuple(tuple(options[groups[g]:groups[g + 1]])
+                          for g in range(self.courses[course], self.courses[course + 1]))
+            self._decoded[course] = value
+        return value
+
+    def __iter__(self):
+        return (self[c] for c in range(len(self)))
+
+    def counts(self) -> Tuple[int, int]:
+        """(courses with any group, total options), without decoding any course."""
+        courses = self.courses
+        return sum(1 for c in range(len(self)) if courses[c + 1] > courses[c]), len(self.options)
+
+
+class IndexTable:
+    """Per-course tuples of course indices in CSR form, decoded on first access."""
+
+    def __init__(self, pointers: memoryview, indices: memoryview):
+        self.pointers = pointers
+        self.indices = indices
+        self._decoded: List[Optional[Tuple[int, ...]]] = [None] * len(self)
+
+    @staticmethod
+    def encode(per_course: Sequence[Sequence[int]]) -> Tuple[bytes, bytes]:
+        """(pointers, indices) sections."""
+        pointers, indices = [0], []
+        for values in per_course:
+            indices.extend(values)
+            pointers.append(len(indices))
+        return _u32(pointers), _u32(indices)
+
+    def __len__(self):
+        return len(self.pointers) - 1
+
+    def __getitem__(self, course: int) -> Tuple[int, ...]:
+        value = self._decoded[course]
+        if value is None:
+            value = tuple(self.indices[self.pointers[course]:self.pointers[course + 1]])
+            self._decoded[course] = value
+        return value
+
+    def __iter__(self):
+        return (self[c] for c in range(len(self)))
+
+
+class BitsetTable:
+    """Per-course int bitsets (bit i = course i), stored as little-endian bytes up to the highest set bit.
+
+    A row is turned back into an int on first access, so a worker only
+    holds the ancestor/descendant sets of the courses it has been asked about.
+    """
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self.offsets = offsets
+        self.data = data
+        self._decoded: List[Optional[int]] = [None] * len(self)
+
+    @staticmethod
+    def encode(masks: Sequence[int]) -> Tuple[bytes, bytes]:
+        """(offsets, data) sections for a list of bitsets."""
+        offsets, chunks, size = [0], [], 0
+        for mask in masks:
+            chunk = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+            chunks.append(chunk)
+            size += len(chunk)
+            offsets.append(size)
+        return _u32(offsets), b"".join(chunks)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, course: int) -> int:
+        value = self._decoded[course]
+        if value is None:
+            value = int.from_bytes(self.data[self.offsets[course]:self.offsets[course + 1]], "little")
+            self._decoded[course] = value
+        return value
+
+    def __iter__(self):
+        return (self[c] for c in range(len(self)))
+
+
+class GradeTable:
+    """Per-course minimum grades for required courses, in CSR form."""
+
+    def __init__(self, courses: memoryview, required: memoryview, grades: StringTable):
+        self.courses = courses
+        self.required = required
+        self.grades = grades
+
+    @staticmethod
+    def encode(per_course: Sequence[Dict[int, str]]) -> Tuple[bytes, bytes, List[str]]:
+        """(course pointers, required courses, grades) sections; grades still to be string-encoded."""
+        courses, required, grades = [0], [], []
+        for minimums in per_course:
+            for course, grade in sorted(minimums.items()):
+                required.append(course)
+                grades.append(grade)
+            courses.append(len(required))
+        return _u32(courses), _u32(required), grades
+
+    def __len__(self):
+        return len(self.courses) - 1
+
+    def __getitem__(self, course: int) -> Dict[int, str]:
+        return {self.required[j]: self.grades[j] for j in range(self.courses[course], self.courses[course + 1])}
+
+    def __iter__(self):
+        return (self[c] for c in range(len(self)))
+
+
+def write_snapshot(path: str, graph, catalog_version: Optional[int]) -> int:
+    """Serialize a PrerequisiteGraph to path and atomically replace any previous snapshot.
+
+    Returns the file size in bytes.
+    """
+    if sys.byteorder != "little":
+        raise SnapshotError("Catalog snapshots are little-endian only")
+
+    sections: Dict[str, bytes] = {}
+    for name, values in (("course_ids", graph.course_ids), ("names", graph.names), ("credits", graph.credits)):
+        sections[f"{name}.off"], sections[f"{name}.dat"], sections[f"{name}.null"] = StringTable.encode(values)
+    for name, groups in (("prereqs", graph.prereqs), ("coreqs", graph.coreqs)):
+        sections[f"{name}.crs"], sections[f"{name}.grp"], sections[f"{name}.opt"] = GroupTable.encode(groups)
+    sections["grades.crs"], sections["grades.req"], grades = GradeTable.encode(graph.grade_requirements)
+    sections["grades.off"], sections["grades.dat"], _ = StringTable.encode(grades)
+    closure = graph.closure
+    sections["closure.par.ptr"], sections["closure.par.idx"] = IndexTable.encode(closure.parents)
+    sections["closure.chl.ptr"], sections["closure.chl.idx"] = IndexTable.encode(closure.children)
+    sections["closure.anc.off"], sections["closure.anc.dat"] = BitsetTable.encode(closure.ancestors)
+    sections["closure.dsc.off"], sections["closure.dsc.dat"] = BitsetTable.encode(closure.descendants)
+    sections["closure.edges"] = struct.pack("<Q", closure.closure_edges)
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    directory, padded = [], []
+    for name, data in sections.items():
+        offset += -offset % _ALIGN
+        directory.append(_SECTION.pack(name.encode(), offset, len(data)))
+        padded.append(data)
+        offset += len(data)
+
+    version = catalog_version if catalog_version is not None else -1
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, version, time.time(), len(sections)))
+        f.write(b"".join(directory))
+        for data in padded:
+            f.write(b"\0" * (-f.tell() % _ALIGN))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return offset
+
+
+class CatalogSnapshot:
+    """A mapped snapshot file, exposing its tables as read-only sequences.
+
+    The mapping stays open for as long as the snapshot (or any table taken
+    from it) is referenced, even after a newer file replaces it on disk.
+    """
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise SnapshotError("Catalog snapshots are little-endian only")
+        self.path = path
+        with open(path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            if self.size < _HEADER.size:
+                raise SnapshotError(f"{path} is too short to be a catalog snapshot")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buf = memoryview(self._mmap)
+        magic, format_version, version, self.built_at, count = _HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a catalog snapshot")
+        if format_version != FORMAT_VERSION:
+            raise SnapshotError(f"{path} has format version {format_version}, expected {FORMAT_VERSION}")
+        self.catalog_version = version if version >= 0 else None
+
+        sections: Dict[str, memoryview] = {}
+        for i in range(count):
+            name, offset, length = _SECTION.unpack_from(buf, _HEADER.size + i * _SECTION.size)
+            if offset + length > self.size:
+                raise SnapshotError(f"{path} is truncated")
+            sections[name.rstrip(b"\0").decode()] = buf[offset:offset + length]
+
+        def section(name: str, fmt: str = "B") -> memoryview:
+            if name not in sections:
+                raise SnapshotError(f"{path} has no {name} section")
+            return sections[name].cast(fmt)
+
+        def strings(name: str) -> StringTable:
+            return StringTable(section(f"{name}.off", "I"), section(f"{name}.dat"), section(f"{name}.null"))
+
+        self.course_ids = strings("course_ids")
+        self.names = strings("names")
+        self.credits = strings("credits")
+        self.prereqs = GroupTable(section("prereqs.crs", "I"), section("prereqs.grp", "I"), section("prereqs.opt", "I"))
+        self.coreqs = GroupTable(section("coreqs.crs", "I"), section("coreqs.grp", "I"), section("coreqs.opt", "I"))
+        self.grade_requirements = GradeTable(
+            section("grades.crs", "I"), section("grades.req", "I"),
+            StringTable(section("grades.off", "I"), section("grades.dat"))
+        )
+        self.parents = IndexTable(section("closure.par.ptr", "I"), section("closure.par.idx", "I"))
+        self.children = IndexTable(section("closure.chl.ptr", "I"), section("closure.chl.idx", "I"))
+        self.ancestors = BitsetTable(section("closure.anc.off", "I"), section("closure.anc.dat"))
+        self.descendants = BitsetTable(section("closure.dsc.off", "I"), section("closure.dsc.dat"))
+        self.closure_edges = section("closure.edges", "Q")[0]
+
+    def __len__(self):
+        return len(self.course_ids)
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "catalog_version": self.catalog_version,
+            "built_at": self.built_at,
+            "bytes": self.size,
+        }
+
+
+def open_snapshot(path: str) -> Optional[CatalogSnapshot]:
+    """Map the snapshot at path, or None when it's missing or unreadable."""
+    try:
+        return CatalogSnapshot(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, SnapshotError, struct.error) as e:
+        logger.warning(f"Ignoring catalog snapshot {path}: {e}")
+        return None
+
+
+def _lock(path: str):
+    f = open(f"{path}.lock", "a")
+    fcntl.flock(f, fcntl.LOCK_EX)
+    return f
+
+
+@asynccontextmanager
+async def build_lock(path: str):
+    """Exclusive lock on a file beside the snapshot, shared by every worker on the host.
+
+    Held while checking and rebuilding the snapshot, so after a catalog
+    change one worker rebuilds it and the others wait and map the result.
+    """
+    f = await asyncio.to_thread(_lock, path)
+    try:
+        yield
+    finally:
+        f.close()
@@ -0,0 +1,80 @@
+from typing import Dict, List, Optional
+
+from app.database import Database
+
+# Grades that don't count as completing a course, as in prerequisite_eligibility
+FAILING_GRADES = ('F', 'FA', 'AB')
+
+
+async def completed_courses(db: Database, student_ids: List[str]) -> Dict[str, Dict[str, Optional[str]]]:
+    """Fetch completed course history for many students in one query.
+
+    Returns {student_id: {course_id: grade}}; students without history map
+    to an empty dict.
+    """
+    history: Dict[str, Dict[str, Optional[str]]] = {sid: {} for sid in student_ids}
+    if not student_ids:
+        return history
+
+    rows = await db.fetch_all("""
+        SELECT sc.student_id::text as student_id, c.course_id, sc.grade
+        FROM student_courses sc
+        JOIN courses c ON sc.course_id = c.id
+        WHERE sc.student_id = ANY(%s::uuid[])
+            AND sc.status = 'completed'
+            AND sc.grade <> ALL(%s)
+    """, (list(student_ids), list(FAILING_GRADES)))
+
+    for row in rows:
+        history[row['student_id']][row['course_id']] = row['grade']
+    return history
+
+
+async def declared_programs(db: Database, student_ids: List[str]) -> Dict[str, List[str]]:
+    """Fetch declared program_ids for many students in one query, primary program first."""
+    programs: Dict[str, List[str]] = {sid: [] for sid in student_ids}
+    if not student_ids:
+        return programs
+
+    rows = await db.fetch_all("""
+        SELECT sp.student_id::text as student_id, p.program_id
+        FROM student_programs sp
+        JOIN programs p ON sp.program_id = p.id
+        WHERE sp.student_id = ANY(%s::uuid[])
+        ORDER BY sp.is_primary DESC, sp.declared_date, p.program_id
+    """, (list(student_ids),))
+
+    for row in rows:
+        programs[row['student_id']].append(row['program_id'])
+    return programs
+
+
+async def eligible_courses(db: Database, student_id: str, department: Optional[str] = None,
+                           unlocked_only: bool = False) -> List[Dict]:
+    """Courses a student can take next, from one scan of the whole catalog.
+
+    Uses prerequisite_eligibility (migration 005), so grade_requirements
+    minimums apply. Courses already passed or in progress are left out;
+    unlocked_only keeps just the courses that have prerequisites.
+    """
+    return await db.fetch_all("""
+        SELECT c.course_id, c.name, c.credits, d.code as department_code, h.has_prerequisites
+        FROM prerequisite_eligibility(ARRAY[%s::uuid]) e
+        JOIN courses c ON c.id = e.course_id
+        JOIN departments d ON c.department_id = d.id
+        CROSS JOIN LATERAL (
+            SELECT EXISTS (
+                SELECT 1 FROM prerequisites p WHERE p.course_id = c.id AND NOT p.is_corequisite
+            ) as has_prerequisites
+        ) h
+        WHERE e.prerequisites_met
+            AND (%s::text IS NULL OR d.code = %s)
+            AND (NOT %s OR h.has_prerequisites)
+            AND NOT EXISTS (
+                SELECT 1 FROM student_courses sc
+                WHERE sc.student_id = e.student_id
+                    AND sc.course_id = c.id
+                    AND (sc.status = 'enrolled' OR (sc.status = 'completed' AND sc.grade <> ALL(%s)))
+            )
+        ORDER BY d.code, c.course_number, c.course_id
+    """, (student_id, department, department, unlocked_only, list(FAILING_GRADES)))
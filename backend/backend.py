@@ -1,16 +1,72 @@
-import os
-from fastapi import FastAPI, HTTPException
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import List, Optional
-from pydantic import BaseModel
-from dotenv import load_dotenv
-from urllib.parse import urlparse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from typing import Dict, List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
 
-load_dotenv()
+from app import config, database, metrics
+from app.database import Database, get_db, PoolTimeout
+from app.services import audit, autocomplete, cache, courses, embeddings, gen_ed, listing, plan_validation, planner, prerequisite, program_match, requirements, students
+from app.services.autocomplete import AutocompleteIndex
+from app.services.cache import response_cache
+from app.services.listing import CursorError
+from app.services.prerequisite import PrerequisiteGraph, get_graph
 
-app = FastAPI(title="UNC Course API")
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Course columns for list and search responses; leaves out embedding (a ~4 KB vector
+# literal once embed_courses.py has run) and search_vector
+COURSE_COLUMNS = """c.id, c.course_id, c.department_id, c.course_number, c.name, c.description, c.credits,
+    c.grading_status, c.requisites_note, c.repeatable, c.max_repeat_credits, c.max_repeat_completions,
+    c.created_at, c.updated_at"""
+
+# Tables whose changes invalidate the in-memory prerequisite graph
+PREREQUISITE_TABLES = {"courses", "prerequisites", "grade_requirements"}
+# Tables whose changes invalidate the program match index
+PROGRAM_TABLES = {"courses", "programs", "program_requirements", "program_requirement_courses"}
+# Tables whose changes invalidate the gen-ed index
+GEN_ED_TABLES = {"courses", "gen_ed_fulfillments"}
+
+async def on_catalog_changed(tables):
+    """Reload in-memory catalog data after the scraper commits new rows"""
+    await cache.refresh_version(database.db)
+    if tables & PREREQUISITE_TABLES:
+        await prerequisite.reload_graph(database.db)
+        autocomplete.get_index()
+    if tables & PROGRAM_TABLES:
+        await program_match.reload_index(database.db, prerequisite.get_graph())
+    if tables & GEN_ED_TABLES:
+        await gen_ed.reload_index(database.db, prerequisite.get_graph())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the connection pool once and share it across requests
+    db = await database.init_db()
+    graph = await prerequisite.reload_graph(db)
+    autocomplete.get_index()
+    await program_match.reload_index(db, graph)
+    await gen_ed.reload_index(db, graph)
+    await cache.refresh_version(db)
+    listener = None
+    if config.CATALOG_LISTEN:
+        listener = asyncio.create_task(database.listen(
+            config.CATALOG_CHANNEL, on_catalog_changed,
+            resync=PREREQUISITE_TABLES | PROGRAM_TABLES | GEN_ED_TABLES
+        ))
+    try:
+        yield
+    finally:
+        if listener:
+            listener.cancel()
+        await database.close_db()
+
+app = FastAPI(title="UNC Course API", lifespan=lifespan)
 
 # Add CORS for frontend
 app.add_middleware(
@@ -20,22 +76,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database connection helper
-def get_db_connection():
-    database_url = os.getenv('DATABASE_URL')
-    url = urlparse(database_url)
-    print(f"Connecting to database at {url.hostname}:{url.port}/{url.path[1:]} as user {url.username}")
-    conn_params = {
-        "host": url.hostname,
-        "port": url.port,
-        "database": url.path[1:],
-        "user": url.username,
-        "password": url.password,
-        "sslmode": "require",
-        "gssencmode": "disable"
-    }
-    
-    return psycopg2.connect(**conn_params)
+# Per-route latency, SQL time and response size for /metrics
+if config.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if config.ADMIN_TOKEN and x_admin_token != config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
 
 # Pydantic models
 class Course(BaseModel):
@@ -50,6 +101,16 @@ class PrerequisiteGroup(BaseModel):
     courses: List[dict]
     is_corequisite: bool
 
+class RequisiteGroup(BaseModel):
+    prereq_group: int
+    is_corequisite: bool
+    courses: List[dict]
+
+class CoursePrerequisites(BaseModel):
+    course_id: str
+    prerequisite_groups: List[RequisiteGroup]
+    corequisite_groups: List[RequisiteGroup]
+
 class Program(BaseModel):
     program_id: str
     name: str
@@ -69,313 +130,825 @@ class ProgramRequirement(BaseModel):
     other_restrictions: Optional[str]
     courses: Optional[List[dict]]
 
+class ProgramRequirements(BaseModel):
+    program_id: str
+    requirements_by_type: Dict[str, List[ProgramRequirement]]
+    all_requirements: List[ProgramRequirement]
+
 class PrerequisiteCheckRequest(BaseModel):
     course_id: str
     completed_courses: List[str]
 
+class CourseBatchRequest(BaseModel):
+    course_ids: List[str] = Field(min_length=1)
+    format: str = "json"  # 'json' or 'ndjson'
+
 class PrerequisiteCheckResponse(BaseModel):
     course_id: str
     can_take: bool
     missing_prerequisites: List[str]
     warnings: List[str]
 
+class SemesterCheck(BaseModel):
+    student_id: Optional[UUID] = None
+    semester_courses: List[str]
+    completed_courses: Optional[List[str]] = None  # Loaded from student_courses when omitted
+
+class BatchPrerequisiteCheckRequest(BaseModel):
+    checks: List[SemesterCheck] = Field(max_length=config.PLANNER_BATCH_MAX_CHECKS)
+
+class GeneratePlanRequest(BaseModel):
+    program_id: str
+    completed_courses: List[str] = []
+    max_credits_per_semester: int = Field(15, ge=1, le=30)
+    max_semesters: int = Field(8, ge=1, le=16)
+    time_budget_ms: int = Field(config.PLANNER_TIME_BUDGET_MS, ge=10, le=5000)
+
+class GenEdPlanRequest(BaseModel):
+    program_id: Optional[str] = None  # Count major requirements too when given
+    completed_courses: List[str] = []
+    planned_courses: List[str] = []
+    gen_ed_codes: Optional[List[str]] = None  # config.GEN_ED_REQUIRED_CODES when omitted
+    max_courses: int = Field(8, ge=1, le=20)
+    time_budget_ms: int = Field(config.GEN_ED_TIME_BUDGET_MS, ge=10, le=5000)
+
+class PlanSemester(BaseModel):
+    id: str
+    courses: List[str] = []
+
+class PlanEdit(BaseModel):
+    action: str  # 'add', 'remove' or 'move'
+    course_id: str
+    from_semester: Optional[str] = None  # for 'remove' and 'move'
+    to_semester: Optional[str] = None  # for 'add' and 'move'
+
+class PlanViolation(BaseModel):
+    course_id: str
+    semester_id: str
+    missing_prerequisites: List[str] = []
+    missing_corequisites: List[str] = []
+    scheduled_too_late: List[dict] = []
+    warnings: List[str] = []
+
+class ValidatePlanRequest(BaseModel):
+    completed_courses: List[str] = []
+    semesters: List[PlanSemester]  # The plan before the edits
+    edits: List[PlanEdit] = []
+    violations: Optional[List[PlanViolation]] = None  # From the previous response; everything is re-checked when omitted
+
+class AuditSubject(BaseModel):
+    student_id: Optional[UUID] = None
+    program_ids: Optional[List[str]] = None  # Declared programs (student_programs) when omitted
+    completed_courses: Optional[List[str]] = None  # Loaded from student_courses when omitted
+
+class AuditRequest(BaseModel):
+    students: List[AuditSubject] = Field(min_length=1, max_length=config.AUDIT_BATCH_MAX_STUDENTS)
+
+class ClosestProgramsRequest(BaseModel):
+    student_id: Optional[UUID] = None
+    completed_courses: Optional[List[str]] = None  # Loaded from student_courses when omitted
+    program_type: Optional[str] = None  # 'major', 'minor', 'certificate'
+    limit: int = Field(10, ge=1, le=config.AUDIT_CLOSEST_MAX_LIMIT)
+
 # API Endpoints
 ## Course Endpoints
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "UNC Course API", "version": "1.0"}
 
+@app.get("/api/health")
+async def health(db: Database = Depends(get_db)):
+    """Database connectivity and connection pool metrics"""
+    healthy = await db.check()
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={
+            "status": "ok" if healthy else "unavailable",
+            "pool": db.stats(),
+            "cache": response_cache.stats()
+        }
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(db: Database = Depends(get_db)):
+    """Request, query, connection pool and cache metrics in Prometheus text format"""
+    return PlainTextResponse(
+        metrics.render(pool=db.stats(), cache=response_cache.stats()),
+        media_type=metrics.CONTENT_TYPE
+    )
+
 @app.get("/api/courses/search")
-def search_courses(q: str, limit: int = 20):
+async def search_courses(
+    q: str,
+    limit: int = 20,
+    page_size: Optional[int] = Query(None, ge=1, le=config.LISTING_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    db: Database = Depends(get_db)
+):
+    """Full-text course search, falling back to substring matches; page_size/after return keyset pages"""
+    paged = page_size is not None
     if not q or len(q) < 1:
-        return []
-    
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Use the full-text search that we know works
-            cur.execute("""
-                SELECT c.*, d.code as department_code
-                FROM courses c
-                JOIN departments d ON c.department_id = d.id
-                WHERE c.search_vector @@ plainto_tsquery('english', %s)
-                ORDER BY ts_rank(c.search_vector, plainto_tsquery('english', %s)) DESC
-                LIMIT %s
-            """, (q, q, limit))
-            
-            results = cur.fetchall()
-            
-            # If no results with full-text, try simple ILIKE as fallback
-            if not results:
-                search_pattern = f"%{q}%"
-                cur.execute("""
-                    SELECT c.*, d.code as department_code
-                    FROM courses c
-                    JOIN departments d ON c.department_id = d.id
-                    WHERE 
-                        c.course_id ILIKE %s OR 
-                        c.name ILIKE %s OR 
-                        d.code ILIKE %s
-                    ORDER BY c.course_id
-                    LIMIT %s
-                """, (search_pattern, search_pattern, search_pattern, limit))
-                
-                results = cur.fetchall()
-            
-            return results if results else []
-
-@app.get("/api/courses/{course_id}", response_model=Course)
-def get_course(course_id: str):
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT c.*, d.code as department_code
-                FROM courses c
-                JOIN departments d ON c.department_id = d.id
-                WHERE c.course_id = %s
-            """, (course_id,))
-            
-            course = cur.fetchone()
-            if not course:
-                raise HTTPException(status_code=404, detail="Course not found")
-            
-            return course
-
-@app.get("/api/courses/{course_id}/prerequisites")
-def get_prerequisites(course_id: str):
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Get course ID
-            cur.execute("SELECT id FROM courses WHERE course_id = %s", (course_id,))
-            course = cur.fetchone()
-            if not course:
-                raise HTTPException(status_code=404, detail="Course not found")
-            
-            # Get prerequisites
-            cur.execute("""
-                SELECT 
-                    p.prereq_group,
-                    p.is_corequisite,
-                    json_agg(
-                        json_build_object(
-                            'course_id', pc.course_id,
-                            'name', pc.name
-                        )
-                    ) as courses
-                FROM prerequisites p
-                JOIN courses pc ON p.prereq_course_id = pc.id
-                WHERE p.course_id = %s
-                GROUP BY p.prereq_group, p.is_corequisite
-                ORDER BY p.prereq_group
-            """, (course['id'],))
-            
-            groups = cur.fetchall()
-            
-            return {
-                "course_id": course_id,
-                "prerequisite_groups": [g for g in groups if not g['is_corequisite']],
-                "corequisite_groups": [g for g in groups if g['is_corequisite']]
-            }
+        return {"items": [], "next_cursor": None} if paged else []
+    if after is not None and not paged:
+        raise HTTPException(status_code=422, detail="after requires page_size")
+    try:
+        # Cursor key: ('rank', rank, course_id) for full-text pages, ('match', None, course_id) for fallback pages
+        mode, last_rank, last_id = listing.decode_cursor(after, "search", 3) if after else (None, None, None)
+    except CursorError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    fetch = page_size + 1 if paged else limit
+    
+    results = []
+    if mode in (None, "rank"):
+        # Use the full-text search that we know works
+        query = f"""
+            SELECT {COURSE_COLUMNS}, d.code as department_code,
+                   ts_rank(c.search_vector, plainto_tsquery('english', %s)) as search_rank
+            FROM courses c
+            JOIN departments d ON c.department_id = d.id
+            WHERE c.search_vector @@ plainto_tsquery('english', %s)
+        """
+        params = [q, q]
+        if mode == "rank":
+            # Ranks are real; compare as real so the cursor's decimal round-trips exactly
+            query += """
+              AND (ts_rank(c.search_vector, plainto_tsquery('english', %s)) < %s::real
+                   OR (ts_rank(c.search_vector, plainto_tsquery('english', %s)) = %s::real AND c.course_id > %s))
+            """
+            params += [q, last_rank, q, last_rank, last_id]
+        query += " ORDER BY search_rank DESC, c.course_id LIMIT %s"
+        results = await db.fetch_all(query, params + [fetch])
+        if results or mode == "rank":
+            mode = "rank"
+    
+    # If no results with full-text, try simple ILIKE as fallback
+    if mode != "rank":
+        search_pattern = f"%{q}%"
+        query = f"""
+            SELECT {COURSE_COLUMNS}, d.code as department_code
+            FROM courses c
+            JOIN departments d ON c.department_id = d.id
+            WHERE 
+                (c.course_id ILIKE %s OR 
+                 c.name ILIKE %s OR 
+                 d.code ILIKE %s)
+        """
+        params = [search_pattern, search_pattern, search_pattern]
+        if mode == "match":
+            query += " AND c.course_id > %s"
+            params.append(last_id)
+        query += " ORDER BY c.course_id LIMIT %s"
+        results = await db.fetch_all(query, params + [fetch])
+        mode = "match"
+    
+    if paged:
+        results = listing.page(results, page_size, "search",
+                               lambda row: (mode, row.get("search_rank"), row["course_id"]))
+    for row in results["items"] if paged else results:
+        row.pop("search_rank", None)
+    return results
+
+@app.get("/api/courses/autocomplete")
+async def autocomplete_courses(
+    q: str,
+    limit: int = Query(10, ge=1, le=config.AUTOCOMPLETE_MAX_LIMIT),
+    index: AutocompleteIndex = Depends(autocomplete.get_index)
+):
+    """Typeahead suggestions by course code prefix or name words, served from memory"""
+    return index.search(q, limit)
+
+@app.get("/api/courses/semantic-search")
+async def semantic_search_courses(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    probes: int = Query(config.SEMANTIC_SEARCH_PROBES, ge=1, le=1000),
+    text_weight: float = Query(config.SEMANTIC_SEARCH_TEXT_WEIGHT, ge=0, le=1),
+    exact: bool = False,
+    db: Database = Depends(get_db)
+):
+    """Courses closest in meaning to the query, re-ranked with full-text relevance"""
+    if not q.strip():
+        return {"query": q, "results": []}
+    try:
+        return await embeddings.semantic_search(db, q, limit, probes, text_weight, exact)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+async def course_batch_response(course_ids: List[str], format: str, db: Database, request: Optional[Request] = None):
+    """Shared by GET and POST /api/courses/batch"""
+    if not course_ids:
+        raise HTTPException(status_code=422, detail="No course ids given")
+    if len(course_ids) > config.COURSE_BATCH_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {config.COURSE_BATCH_MAX_IDS} course ids per batch")
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=422, detail="format must be 'json' or 'ndjson'")
+    
+    if format == "ndjson":
+        return StreamingResponse(
+            courses.stream_courses(db, course_ids, config.COURSE_BATCH_STREAM_CHUNK),
+            media_type="application/x-ndjson"
+        )
+    
+    async def load():
+        found, missing = await courses.fetch_courses(db, course_ids)
+        return {"courses": found, "missing": missing}
+    
+    if request is not None:
+        return await response_cache.respond(request, load)
+    return await load()
+
+@app.get("/api/courses/batch")
+async def get_courses_batch(
+    request: Request,
+    ids: List[str] = Query(..., description="Course ids, repeated and/or comma-separated"),
+    format: str = "json",
+    db: Database = Depends(get_db)
+):
+    """Many courses with their prerequisite and corequisite groups in one round trip"""
+    return await course_batch_response(courses.parse_ids(ids), format, db, request)
+
+@app.post("/api/courses/batch")
+async def post_courses_batch(request: CourseBatchRequest, db: Database = Depends(get_db)):
+    """Same as GET /api/courses/batch, for id lists too long for a URL"""
+    return await course_batch_response(courses.parse_ids(request.course_ids), request.format, db)
+
+# Passthrough routes return Postgres-built JSON as is, so their models only document the shape
+@app.get("/api/courses/{course_id}", responses={200: {"model": Course}})
+async def get_course(course_id: str, db: Database = Depends(get_db)):
+    # Postgres builds the response document; its bytes go out unparsed
+    course = await db.fetch_json("""
+        SELECT row_to_json(r) FROM (
+            SELECT c.course_id, c.name, c.credits, c.description, d.code as department_code
+            FROM courses c
+            JOIN departments d ON c.department_id = d.id
+            WHERE c.course_id = %s
+        ) r
+    """, (course_id,))
+    
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    return Response(content=course, media_type="application/json")
+
+@app.get("/api/courses/{course_id}/prerequisites", responses={200: {"model": CoursePrerequisites}})
+async def get_prerequisites(course_id: str, db: Database = Depends(get_db)):
+    # One document per course, groups split by kind in SQL
+    body = await db.fetch_json("""
+        SELECT json_build_object(
+            'course_id', c.course_id,
+            'prerequisite_groups', COALESCE(
+                json_agg(g ORDER BY g.prereq_group) FILTER (WHERE NOT g.is_corequisite), '[]'::json),
+            'corequisite_groups', COALESCE(
+                json_agg(g ORDER BY g.prereq_group) FILTER (WHERE g.is_corequisite), '[]'::json)
+        )
+        FROM courses c
+        LEFT JOIN LATERAL (
+            SELECT 
+                p.prereq_group,
+                p.is_corequisite,
+                json_agg(
+                    json_build_object(
+                        'course_id', pc.course_id,
+                        'name', pc.name
+                    )
+                ) as courses
+            FROM prerequisites p
+            JOIN courses pc ON p.prereq_course_id = pc.id
+            WHERE p.course_id = c.id
+            GROUP BY p.prereq_group, p.is_corequisite
+        ) g ON true
+        WHERE c.course_id = %s
+        GROUP BY c.id
+    """, (course_id,))
+    if not body:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    return Response(content=body, media_type="application/json")
+
+@app.get("/api/courses/{course_id}/prerequisites/all")
+async def get_all_prerequisites(
+    course_id: str,
+    max_depth: Optional[int] = Query(None, ge=1, le=config.CLOSURE_MAX_DEPTH),
+    graph: PrerequisiteGraph = Depends(get_graph)
+):
+    """Every course in the prerequisite chain of a course, with the edges between them"""
+    course = graph.get(course_id)
+    if course is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    depths = graph.closure.prerequisites(course, max_depth)
+    nodes = {course, *depths}
+    edges = []
+    for node in nodes:
+        for is_corequisite, groups in ((False, graph.prereqs[node]), (True, graph.coreqs[node])):
+            for group_idx, group in enumerate(groups):
+                for option in group:
+                    if option in nodes:
+                        edges.append({
+                            "source": graph.course_ids[node],
+                            "target": graph.course_ids[option],
+                            "prereq_group": group_idx,
+                            "is_corequisite": is_corequisite
+                        })
+    
+    return {
+        "course_id": course_id,
+        "prerequisites": [
+            {"course_id": graph.course_ids[c], "name": graph.names[c], "depth": d}
+            for c, d in sorted(depths.items(), key=lambda item: (item[1], graph.course_ids[item[0]]))
+        ],
+        "edges": edges
+    }
+
+@app.get("/api/courses/{course_id}/unlocks")
+async def get_unlocked_courses(
+    course_id: str,
+    max_depth: Optional[int] = Query(None, ge=1, le=config.CLOSURE_MAX_DEPTH),
+    graph: PrerequisiteGraph = Depends(get_graph)
+):
+    """Every course that directly or transitively requires this course"""
+    course = graph.get(course_id)
+    if course is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    depths = graph.closure.unlocks(course, max_depth)
+    return {
+        "course_id": course_id,
+        "unlocks": [
+            {"course_id": graph.course_ids[c], "name": graph.names[c], "depth": d}
+            for c, d in sorted(depths.items(), key=lambda item: (item[1], graph.course_ids[item[0]]))
+        ]
+    }
+
+@app.get("/api/courses/{course_id}/paths")
+async def get_course_paths(
+    course_id: str,
+    to: str,
+    k: int = Query(1, ge=1, le=config.CLOSURE_MAX_PATHS),
+    max_length: Optional[int] = Query(None, ge=1, le=config.CLOSURE_MAX_DEPTH),
+    graph: PrerequisiteGraph = Depends(get_graph)
+):
+    """Shortest prerequisite chains leading from this course to another"""
+    source, target = graph.get(course_id), graph.get(to)
+    if source is None or target is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    paths = graph.closure.paths(source, target, k=k, max_length=max_length)
+    return {
+        "from": course_id,
+        "to": to,
+        "is_prerequisite": graph.closure.is_prerequisite(source, target),
+        "paths": [graph.codes(path) for path in paths]
+    }
+
+async def listing_response(
+    request: Request, db: Database, name: str, build, key, key_size: int,
+    format: str, stream: bool, page_size: Optional[int], after: Optional[str],
+    not_found: Optional[str] = None
+):
+    """Shared by the listing endpoints: the full list or a keyset page (both cached), or a stream.
+
+    build(after_key, limit) returns the (query, params) for rows after
+    the cursor's sort key; key(row) is that sort key for a row.
+    """
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=422, detail="format must be 'json' or 'ndjson'")
+    streaming = stream or format == "ndjson"
+    if streaming and (page_size is not None or after is not None):
+        raise HTTPException(status_code=422, detail="page_size and after can't be combined with streaming")
+    if after is not None and page_size is None:
+        raise HTTPException(status_code=422, detail="after requires page_size")
+    try:
+        after_key = listing.decode_cursor(after, name, key_size) if after else None
+    except CursorError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    if streaming:
+        # Read the first chunk up front so a missing listing can still be a 404
+        chunks = db.stream(*build(None, None))
+        first = await anext(chunks, None)
+        if first is None and not_found:
+            raise HTTPException(status_code=404, detail=not_found)
+        
+        async def rows():
+            if first is not None:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+        
+        return StreamingResponse(
+            listing.stream_json(rows(), format),
+            media_type="application/x-ndjson" if format == "ndjson" else "application/json"
+        )
+    
+    async def load():
+        rows = await db.fetch_all(*build(after_key, page_size + 1 if page_size else None))
+        if not rows and not_found and after_key is None:
+            raise HTTPException(status_code=404, detail=not_found)
+        return listing.page(rows, page_size, name, key) if page_size else rows
+    
+    return await response_cache.respond(request, load)
 
 @app.get("/api/departments")
-def get_departments():
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT d.*, COUNT(c.id) as course_count
-                FROM departments d
-                LEFT JOIN courses c ON d.id = c.department_id
-                GROUP BY d.id
-                ORDER BY d.code
-            """)
-            
-            return cur.fetchall()
+async def get_departments(
+    request: Request,
+    page_size: Optional[int] = Query(None, ge=1, le=config.LISTING_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    format: str = "json",
+    stream: bool = False,
+    db: Database = Depends(get_db)
+):
+    """Departments by code; page_size/after return keyset pages, format=ndjson or stream=true streams"""
+    def build(after_key, limit):
+        query = """
+            SELECT d.*, COUNT(c.id) as course_count
+            FROM departments d
+            LEFT JOIN courses c ON d.id = c.department_id
+        """
+        params = []
+        if after_key:
+            query += " WHERE d.code > %s"
+            params += after_key
+        query += " GROUP BY d.id ORDER BY d.code"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, params
+    
+    return await listing_response(request, db, "departments", build, lambda row: (row["code"],), 1,
+                                  format, stream, page_size, after)
 
 @app.get("/api/departments/{dept_code}/courses")
-def get_department_courses(dept_code: str):
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("""
-                SELECT c.*, d.code as department_code
-                FROM courses c
-                JOIN departments d ON c.department_id = d.id
-                WHERE d.code = %s
-                ORDER BY c.course_number
-            """, (dept_code.upper(),))
-            
-            courses = cur.fetchall()
-            if not courses:
-                raise HTTPException(status_code=404, detail=f"No courses found for department {dept_code}")
-            
-            return courses
+async def get_department_courses(
+    dept_code: str,
+    request: Request,
+    page_size: Optional[int] = Query(None, ge=1, le=config.LISTING_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    format: str = "json",
+    stream: bool = False,
+    db: Database = Depends(get_db)
+):
+    """A department's courses by number; page_size/after return keyset pages, format=ndjson or stream=true streams"""
+    def build(after_key, limit):
+        query = f"""
+            SELECT {COURSE_COLUMNS}, d.code as department_code
+            FROM courses c
+            JOIN departments d ON c.department_id = d.id
+            WHERE c.department_id = (SELECT id FROM departments WHERE code = %s)
+        """
+        params = [dept_code.upper()]
+        if after_key:
+            query += " AND (c.course_number, c.course_id) > (%s, %s)"
+            params += after_key
+        # course_id breaks ties so pages never overlap; with the department id
+        # as a constant, idx_course_dept_number serves both the seek and the order
+        query += " ORDER BY c.course_number, c.course_id"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, params
+    
+    return await listing_response(request, db, f"departments/{dept_code.upper()}/courses", build,
+                                  lambda row: (row["course_number"], row["course_id"]), 2,
+                                  format, stream, page_size, after,
+                                  not_found=f"No courses found for department {dept_code}")
 
 ## Program Endpoints
 @app.get("/api/programs")
-def get_programs(program_type: Optional[str] = None):
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            query = """
-                SELECT * FROM programs
-                WHERE 1=1
-            """
-            params = []
-            
-            if program_type:
-                query += " AND program_type = %s"
-                params.append(program_type)
-            
-            query += " ORDER BY name"
-            
-            cur.execute(query, params)
-            return cur.fetchall()
+async def get_programs(
+    request: Request,
+    program_type: Optional[str] = None,
+    page_size: Optional[int] = Query(None, ge=1, le=config.LISTING_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    format: str = "json",
+    stream: bool = False,
+    db: Database = Depends(get_db)
+):
+    """Programs by name; page_size/after return keyset pages, format=ndjson or stream=true streams"""
+    def build(after_key, limit):
+        query = """
+            SELECT * FROM programs
+            WHERE 1=1
+        """
+        params = []
+        
+        if program_type:
+            query += " AND program_type = %s"
+            params.append(program_type)
+        if after_key:
+            query += " AND (name, program_id) > (%s, %s)"
+            params += after_key
+        
+        query += " ORDER BY name, program_id"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, params
+    
+    return await listing_response(request, db, f"programs/{program_type or ''}", build,
+                                  lambda row: (row["name"], row["program_id"]), 2,
+                                  format, stream, page_size, after)
 
 @app.get("/api/programs/{program_id}")
-def get_program(program_id: str):
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Get program details
-            cur.execute("""
-                SELECT * FROM programs WHERE program_id = %s
-            """, (program_id,))
-            
-            program = cur.fetchone()
-            if not program:
-                raise HTTPException(status_code=404, detail="Program not found")
-            
-            return program
-
-@app.get("/api/programs/{program_id}/requirements")
-def get_program_requirements(program_id: str):
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Get program ID
-            cur.execute("SELECT id FROM programs WHERE program_id = %s", (program_id,))
-            program = cur.fetchone()
-            if not program:
-                raise HTTPException(status_code=404, detail="Program not found")
-            
-            # Get requirements with courses
-            cur.execute("""
-                SELECT 
-                    pr.*,
-                    COALESCE(
-                        json_agg(
-                            json_build_object(
-                                'course_id', c.course_id,
-                                'name', c.name,
-                                'credits', c.credits,
-                                'is_required', prc.is_required
-                            ) ORDER BY c.course_id
-                        ) FILTER (WHERE c.id IS NOT NULL),
-                        '[]'::json
-                    ) as courses
-                FROM program_requirements pr
-                LEFT JOIN program_requirement_courses prc ON pr.id = prc.requirement_id
-                LEFT JOIN courses c ON prc.course_id = c.id
-                WHERE pr.program_id = %s
-                GROUP BY pr.id
-                ORDER BY pr.display_order, pr.requirement_type
-            """, (program['id'],))
-            
-            requirements = cur.fetchall()
-            
-            # Group by requirement type
-            grouped = {}
-            for req in requirements:
-                req_type = req['requirement_type']
-                if req_type not in grouped:
-                    grouped[req_type] = []
-                grouped[req_type].append(req)
-            
-            return {
-                "program_id": program_id,
-                "requirements_by_type": grouped,
-                "all_requirements": requirements
-            }
+async def get_program(program_id: str, db: Database = Depends(get_db)):
+    # Get program details
+    program = await db.fetch_one("""
+        SELECT * FROM programs WHERE program_id = %s
+    """, (program_id,))
+    
+    if not program:
+        raise HTTPException(status_code=404, detail="Program not found")
+    
+    return program
+
+@app.get("/api/programs/{program_id}/requirements", responses={200: {"model": ProgramRequirements}})
+async def get_program_requirements(program_id: str, request: Request, db: Database = Depends(get_db)):
+    return await response_cache.respond(request, lambda: load_program_requirements(db, program_id))
+
+async def load_program_requirements(db: Database, program_id: str) -> bytes:
+    # Postgres builds the whole document, grouped by type in order of first appearance
+    body = await db.fetch_json("""
+        WITH reqs AS (
+            SELECT 
+                pr.*,
+                COALESCE(
+                    json_agg(
+                        json_build_object(
+                            'course_id', c.course_id,
+                            'name', c.name,
+                            'credits', c.credits,
+                            'is_required', prc.is_required
+                        ) ORDER BY c.course_id
+                    ) FILTER (WHERE c.id IS NOT NULL),
+                    '[]'::json
+                ) as courses
+            FROM program_requirements pr
+            JOIN programs p ON pr.program_id = p.id
+            LEFT JOIN program_requirement_courses prc ON pr.id = prc.requirement_id
+            LEFT JOIN courses c ON prc.course_id = c.id
+            WHERE p.program_id = %s
+            GROUP BY pr.id
+        ),
+        by_type AS (
+            SELECT requirement_type,
+                   json_agg(r ORDER BY r.display_order, r.id) as requirements,
+                   MIN(r.display_order) as first_order
+            FROM reqs r
+            GROUP BY requirement_type
+        )
+        SELECT json_build_object(
+            'program_id', p.program_id,
+            'requirements_by_type', COALESCE(
+                (SELECT json_object_agg(requirement_type, requirements ORDER BY first_order, requirement_type)
+                 FROM by_type),
+                '{}'::json),
+            'all_requirements', COALESCE(
+                (SELECT json_agg(r ORDER BY r.display_order, r.requirement_type, r.id) FROM reqs r),
+                '[]'::json)
+        )
+        FROM programs p
+        WHERE p.program_id = %s
+    """, (program_id, program_id))
+    if not body:
+        raise HTTPException(status_code=404, detail="Program not found")
+    
+    return body
 
 ## Planning Endpoints
 @app.post("/api/planner/check-prerequisites", response_model=PrerequisiteCheckResponse)
-def check_prerequisites(request: PrerequisiteCheckRequest):
-    with get_db_connection() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Get course ID from database
-            cur.execute("SELECT id FROM courses WHERE course_id = %s", (request.course_id,))
-            course = cur.fetchone()
-            
-            if not course:
-                raise HTTPException(status_code=404, detail="Course not found")
-            
-            # Get prerequisites for the course
-            cur.execute("""
-                SELECT 
-                    p.prereq_group,
-                    array_agg(pc.course_id) as required_courses
-                FROM prerequisites p
-                JOIN courses pc ON p.prereq_course_id = pc.id
-                WHERE p.course_id = %s AND NOT p.is_corequisite
-                GROUP BY p.prereq_group
-                ORDER BY p.prereq_group
-            """, (course['id'],))
-            
-            prereq_groups = cur.fetchall()
-            
-            # Check if prerequisites are met
-            can_take = True
-            missing_prerequisites = []
-            warnings = []
-            
-            # For each AND group
-            for group in prereq_groups:
-                # Check if at least one course in the OR group is completed
-                group_satisfied = False
-                for req_course in group['required_courses']:
-                    if req_course in request.completed_courses:
-                        group_satisfied = True
-                        break
-                
-                if not group_satisfied:
-                    can_take = False
-                    missing_prerequisites.extend(group['required_courses'])
-            
-            # Remove duplicates from missing prerequisites
-            missing_prerequisites = list(set(missing_prerequisites))
-            
-            # Add warnings for edge cases
-            if not prereq_groups:
-                warnings.append("No prerequisites found for this course")
-            
-            return PrerequisiteCheckResponse(
-                course_id=request.course_id,
-                can_take=can_take,
-                missing_prerequisites=missing_prerequisites,
-                warnings=warnings
-            )
+async def check_prerequisites(request: PrerequisiteCheckRequest, graph: PrerequisiteGraph = Depends(get_graph)):
+    # Answered entirely from the in-memory prerequisite graph
+    course = graph.get(request.course_id)
+    if course is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    completed = graph.indices(request.completed_courses)
+    warnings = []
+    
+    # Each AND group needs at least one completed course from its OR options
+    missing_groups = graph.missing_prerequisites(course, completed)
+    missing_prerequisites = sorted({cid for group in missing_groups for cid in graph.codes(group)})
+    
+    # Add warnings for edge cases
+    if not graph.prereqs[course]:
+        warnings.append("No prerequisites found for this course")
+    
+    return PrerequisiteCheckResponse(
+        course_id=request.course_id,
+        can_take=not missing_groups,
+        missing_prerequisites=missing_prerequisites,
+        warnings=warnings
+    )
 
 @app.post("/api/planner/validate-semester")
-def validate_semester(semester_courses: List[str], completed_courses: List[str]):
+async def validate_semester(semester_courses: List[str], completed_courses: List[str], graph: PrerequisiteGraph = Depends(get_graph)):
     """Validate all courses in a semester for prerequisites and corequisites"""
-    validation_results = []
-    
     for course_id in semester_courses:
-        # Check prerequisites (excluding courses in the same semester)
-        prereq_check = check_prerequisites(
-            PrerequisiteCheckRequest(
-                course_id=course_id,
-                completed_courses=completed_courses
-            )
+        if course_id not in graph:
+            raise HTTPException(status_code=404, detail="Course not found")
+    
+    # Prerequisites exclude courses in the same semester; corequisites may be taken alongside
+    checks = graph.validate_semester(semester_courses, graph.indices(completed_courses))
+    validation_results = [
+        {
+            "course_id": check["course_id"],
+            "valid": check["valid"],
+            "issues": check["missing_prerequisites"] + check["missing_corequisites"],
+            "warnings": check["warnings"]
+        }
+        for check in checks
+    ]
+    
+    return {
+        "semester_valid": all(r["valid"] for r in validation_results),
+        "course_validations": validation_results
+    }
+
+@app.post("/api/planner/validate-plan")
+async def validate_plan(request: ValidatePlanRequest, graph: PrerequisiteGraph = Depends(get_graph)):
+    """Apply schedule edits and re-check only the courses they can affect"""
+    try:
+        return plan_validation.validate_plan(
+            graph,
+            request.completed_courses,
+            [(semester.id, semester.courses) for semester in request.semesters],
+            [edit.model_dump() for edit in request.edits],
+            [v.model_dump() for v in request.violations] if request.violations is not None else None
         )
+    except plan_validation.PlanError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.post("/api/planner/check-prerequisites/batch")
+async def check_prerequisites_batch(
+    request: BatchPrerequisiteCheckRequest,
+    db: Database = Depends(get_db),
+    graph: PrerequisiteGraph = Depends(get_graph)
+):
+    """Validate many (student, semester, completed courses) tuples in one call"""
+    for check in request.checks:
+        if check.completed_courses is None and check.student_id is None:
+            raise HTTPException(status_code=422, detail="Each check needs completed_courses or a student_id")
+    
+    # Fetch history for every student that didn't send completed courses, in one query
+    student_ids = list({
+        str(check.student_id) for check in request.checks
+        if check.completed_courses is None and check.student_id is not None
+    })
+    history = await students.completed_courses(db, student_ids) if student_ids else {}
+    
+    results = []
+    for check in request.checks:
+        if check.completed_courses is not None:
+            completed = graph.indices(check.completed_courses)
+        else:
+            completed = graph.indices(history[str(check.student_id)])
         
-        validation_results.append({
-            "course_id": course_id,
-            "valid": prereq_check.can_take,
-            "issues": prereq_check.missing_prerequisites,
-            "warnings": prereq_check.warnings
+        course_validations = graph.validate_semester(check.semester_courses, completed)
+        results.append({
+            "student_id": check.student_id,
+            "semester_valid": all(v["valid"] for v in course_validations),
+            "course_validations": course_validations
         })
     
+    return {"results": results}
+
+@app.post("/api/planner/generate")
+async def generate_plan(
+    request: GeneratePlanRequest,
+    db: Database = Depends(get_db),
+    graph: PrerequisiteGraph = Depends(get_graph)
+):
+    """Build a semester-by-semester plan that satisfies a program's requirements"""
+    programs = await requirements.get_programs(db, [request.program_id], graph)
+    if request.program_id not in programs:
+        raise HTTPException(status_code=404, detail="Program not found")
+    
+    plan = planner.generate_plan(
+        graph,
+        programs[request.program_id].requirements,
+        request.completed_courses,
+        max_credits=request.max_credits_per_semester,
+        max_semesters=request.max_semesters,
+        time_budget_ms=request.time_budget_ms
+    )
+    return {"program_id": request.program_id, **plan}
+
+@app.post("/api/planner/gen-ed")
+async def optimize_gen_eds(
+    request: GenEdPlanRequest,
+    db: Database = Depends(get_db),
+    graph: PrerequisiteGraph = Depends(get_graph)
+):
+    """Suggest courses that cover the most remaining gen-ed codes, counting twice toward the major where possible"""
+    program = None
+    if request.program_id is not None:
+        programs = await requirements.get_programs(db, [request.program_id], graph)
+        if request.program_id not in programs:
+            raise HTTPException(status_code=404, detail="Program not found")
+        program = programs[request.program_id]
+    
+    index = await gen_ed.current_index(db, graph)
+    result = gen_ed.optimize(
+        index,
+        graph,
+        program,
+        request.completed_courses + request.planned_courses,
+        request.gen_ed_codes if request.gen_ed_codes is not None else config.GEN_ED_REQUIRED_CODES,
+        max_courses=request.max_courses,
+        time_budget_ms=request.time_budget_ms
+    )
+    return {"program_id": request.program_id, **result}
+
+@app.get("/api/students/{student_id}/eligible-courses")
+async def eligible_courses(
+    student_id: UUID,
+    department: Optional[str] = None,
+    unlocked_only: bool = False,
+    db: Database = Depends(get_db)
+):
+    """Courses a student can take next, honoring minimum grades on prerequisites"""
+    student = await db.fetch_one("SELECT id FROM students WHERE id = %s", (str(student_id),))
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    
+    courses = await students.eligible_courses(
+        db, str(student_id), department.upper() if department else None, unlocked_only
+    )
+    return {"student_id": student_id, "count": len(courses), "courses": courses}
+
+## Degree Audit Endpoints
+@app.post("/api/audit")
+async def audit_students(
+    request: AuditRequest,
+    db: Database = Depends(get_db),
+    graph: PrerequisiteGraph = Depends(get_graph)
+):
+    """Audit one student or a whole cohort against their programs' requirements"""
+    for subject in request.students:
+        if subject.student_id is None and (subject.completed_courses is None or subject.program_ids is None):
+            raise HTTPException(status_code=422, detail="Each student needs a student_id, or completed_courses and program_ids")
+    
+    # Course history and declared programs for every student that needs them, one query each
+    history_ids = list({str(s.student_id) for s in request.students if s.completed_courses is None})
+    program_ids = list({str(s.student_id) for s in request.students if s.program_ids is None})
+    history, declared = await asyncio.gather(
+        students.completed_courses(db, history_ids),
+        students.declared_programs(db, program_ids)
+    )
+    
+    subject_programs = [
+        s.program_ids if s.program_ids is not None else declared[str(s.student_id)]
+        for s in request.students
+    ]
+    compiled = await requirements.get_programs(db, list({pid for pids in subject_programs for pid in pids}), graph)
+    
+    results = []
+    for subject, pids in zip(request.students, subject_programs):
+        completed = subject.completed_courses if subject.completed_courses is not None else history[str(subject.student_id)]
+        results.append({
+            "student_id": subject.student_id,
+            **audit.audit_student([(pid, compiled.get(pid)) for pid in pids], completed, graph)
+        })
+    
+    return {"results": results}
+
+@app.post("/api/audit/closest-programs")
+async def closest_programs(
+    request: ClosestProgramsRequest,
+    db: Database = Depends(get_db),
+    graph: PrerequisiteGraph = Depends(get_graph)
+):
+    """Rank every program by how much of its requirements a course history already covers"""
+    if request.completed_courses is None and request.student_id is None:
+        raise HTTPException(status_code=422, detail="Send completed_courses or a student_id")
+    
+    start = time.monotonic()
+    completed_courses = request.completed_courses
+    if completed_courses is None:
+        completed_courses = list((await students.completed_courses(db, [str(request.student_id)]))[str(request.student_id)])
+    
+    index = await program_match.current_index(db, graph)
+    results = index.rank(sorted(graph.indices(completed_courses)), graph, request.limit, request.program_type)
     return {
-        "semester_valid": all(r["valid"] for r in validation_results),
-        "course_validations": validation_results
+        "student_id": request.student_id,
+        "programs_indexed": len(index.programs),
+        "results": results,
+        "elapsed_ms": round((time.monotonic() - start) * 1000, 2)
     }
 
+## Admin Endpoints
+@app.post("/api/admin/reload-prerequisites", dependencies=[Depends(require_admin)])
+async def reload_prerequisites(db: Database = Depends(get_db)):
+    """Rebuild the in-memory prerequisite graph, and the catalog snapshot if one is configured, from the database"""
+    graph = await prerequisite.reload_graph(db, rebuild_snapshot=True)
+    return graph.stats()
+
+@app.post("/api/admin/clear-cache", dependencies=[Depends(require_admin)])
+async def clear_cache():
+    """Drop every locally cached catalog response"""
+    await response_cache.local.clear()
+    return response_cache.stats()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,71 @@
+"""Compare two benchmarks.workload reports, operation by operation.
+
+Prints the relative change in p50/p95/p99 latency and throughput and exits
+non-zero when any operation's p95 grew by more than --threshold, so it can
+gate a commit in CI.
+
+Run from backend/:
+    python -m benchmarks.compare base.json new.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+# Operations with fewer samples than this are too noisy to fail a comparison on
+MIN_SAMPLES = 50
+
+
+def change(old: float, new: float) -> float:
+    return (new - old) / old if old else 0.0
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> Tuple[List[Dict], List[str]]:
+    """Per-operation changes, and the operations whose p95 regressed past the threshold."""
+    rows, regressions = [], []
+    for phase, report in new.get("phases", {}).items():
+        old_ops = base.get("phases", {}).get(phase, {}).get("operations", {})
+        for name, stats in report["operations"].items():
+            old = old_ops.get(name)
+            if old is None:
+                continue
+            row = {
+                "phase": phase,
+                "operation": name,
+                "count": stats["count"],
+                **{p: change(old["latency_ms"][p], stats["latency_ms"][p]) for p in ("p50", "p95", "p99")},
+                "throughput": change(old["throughput_rps"], stats["throughput_rps"]),
+            }
+            rows.append(row)
+            if row["p95"] > threshold and min(stats["count"], old["count"]) >= MIN_SAMPLES:
+                regressions.append(f"{phase}: {name}")
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative p95 growth")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    rows, regressions = compare(base, new, args.threshold)
+
+    print(f"base {base['meta'].get('commit')}  new {new['meta'].get('commit')}")
+    print(f"{'operation':<58} {'n':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8}")
+    for row in rows:
+        print(f"{row['phase'] + ': ' + row['operation']:<58} {row['count']:>7} "
+              + " ".join(f"{row[k]:>+8.1%}" for k in ("p50", "p95", "p99", "throughput")))
+    if regressions:
+        print(f"\np95 regressions over {args.threshold:.0%}:")
+        for name in regressions:
+            print(f"  {name}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
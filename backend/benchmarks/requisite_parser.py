@@ -0,0 +1,204 @@
+"""Accuracy/throughput benchmark for the local requisite grammar parser.
+
+Runs scraping.requisite_grammar over the saved requisite corpus
+(output/requisites.json) and reports:
+
+- coverage: statements parsed locally instead of going to the LLM
+- accuracy against requisite_gold.json, hand-checked parses of a sample of
+  the corpus; entries that are null there must be deferred to the LLM
+- agreement with the saved parses in output/unc_courses.json, split into
+  entries that came from the LLM and entries the regex fallback wrote when
+  the API call failed (recognizable by its canned note and one course per
+  group), since neither is a reliable reference on its own
+- throughput in statements per second
+
+Groups are compared as sets of sets, ignoring order and the LLM's
+occasional extra nesting. --show prints every disagreement.
+
+Run from backend/:
+    python -m benchmarks.requisite_parser [--show] [--repeat 200]
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, FrozenSet, Iterable, List
+
+from scraping.requisite_grammar import parse_requisites
+
+logger = logging.getLogger(__name__)
+
+# Default request rate of course_scraper.py, for the time-saved estimate
+LLM_CALLS_PER_SECOND = 2.0
+
+GOLD_PATH = os.path.join(os.path.dirname(__file__), "requisite_gold.json")
+FALLBACK_NOTE = "Permission of instructor may be required"
+FALLBACK_COURSE_RE = re.compile(r'\b[A-Z]{2,5}\s?\d{2,3}[A-Z]?\d?[A-Z]?\b')
+
+
+def normalize_code(code: str) -> str:
+    return " ".join(code.replace("\xa0", " ").split())
+
+
+def _codes(value) -> Iterable[str]:
+    if isinstance(value, str):
+        yield normalize_code(value)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _codes(item)
+
+
+def canonical_groups(groups: List) -> FrozenSet[FrozenSet[str]]:
+    """Order-insensitive form of an AND-list of OR-groups."""
+    return frozenset(frozenset(_codes(group)) for group in groups if list(_codes(group)))
+
+
+def canonical_grades(grades: Dict) -> Dict[str, str]:
+    return {normalize_code(code): grade for code, grade in (grades or {}).items()}
+
+
+def load_saved_courses(path: str) -> Dict[str, Dict]:
+    with open(path, encoding="utf-8") as f:
+        departments = json.load(f)
+    return {normalize_code(course["course_id"]): course
+            for courses in departments.values() for course in courses}
+
+
+def as_requisites(course: Dict) -> Dict:
+    """Saved course record -> parser result shape."""
+    requisites = course.get("requisites") or {}
+    return {
+        "prerequisites": requisites.get("prerequisites", []),
+        "corequisites": requisites.get("corequisites", []),
+        "grade_requirements": course.get("grade_requirements") or {},
+        "requisites_note": course.get("requisites_note"),
+    }
+
+
+def is_fallback_output(result: Dict, raw: str) -> bool:
+    """Whether a saved parse was written by the regex fallback rather than the LLM."""
+    if result["requisites_note"] == FALLBACK_NOTE:
+        return True
+    singletons = frozenset(frozenset([normalize_code(c)]) for c in FALLBACK_COURSE_RE.findall(raw.replace("\xa0", " ")))
+    return not result["corequisites"] and canonical_groups(result["prerequisites"]) == singletons
+
+
+def compare(ours: Dict, expected: Dict) -> Dict[str, bool]:
+    our_prereqs, our_coreqs = canonical_groups(ours["prerequisites"]), canonical_groups(ours["corequisites"])
+    prereqs, coreqs = canonical_groups(expected["prerequisites"]), canonical_groups(expected["corequisites"])
+    checks = {
+        "prerequisites": our_prereqs == prereqs,
+        "corequisites": our_coreqs == coreqs,
+        "grade_requirements": canonical_grades(ours["grade_requirements"]) == canonical_grades(expected["grade_requirements"]),
+        # Notes are free text (the LLM paraphrases), so only their presence is compared
+        "requisites_note": bool(ours["requisites_note"]) == bool(expected["requisites_note"]),
+        "courses": set().union(*our_prereqs, *our_coreqs) == set().union(*prereqs, *coreqs),
+    }
+    checks["all"] = all(checks.values())
+    return checks
+
+
+def _agreement(pairs: List[tuple], corpus: Dict[str, str], label: str, show: bool) -> Dict:
+    totals: Dict[str, int] = {}
+    for course_id, ours, expected in pairs:
+        checks = compare(ours, expected)
+        for field, agrees in checks.items():
+            totals[field] = totals.get(field, 0) + agrees
+        if show and not checks["all"]:
+            fields = ", ".join(field for field, agrees in checks.items() if not agrees and field != "all")
+            print(f"\n{course_id} disagrees with {label} on {fields}\n  text:     {corpus[course_id]!r}")
+            print(f"  local:    {json.dumps(ours)}")
+            print(f"  {label + ':':9} {json.dumps(expected, ensure_ascii=False)}")
+    result = {"compared": len(pairs)}
+    result.update({field: round(count / len(pairs), 4) for field, count in totals.items()} if pairs else {})
+    return result
+
+
+def accuracy(corpus: Dict[str, str], gold: Dict[str, Dict], saved: Dict[str, Dict], show: bool) -> Dict:
+    parsed = {course_id: parse_requisites(raw) for course_id, raw in corpus.items()}
+    local = {course_id: result for course_id, result in parsed.items() if result is not None}
+    deferred = sorted(course_id for course_id, result in parsed.items() if result is None)
+
+    gold_pairs = [(cid, local[cid], expected) for cid, expected in gold.items()
+                  if expected is not None and cid in local]
+    missed = sorted(cid for cid, expected in gold.items() if expected is not None and cid in corpus and cid not in local)
+    # Hard statements the parser should have left to the LLM
+    overconfident = sorted(cid for cid, expected in gold.items() if expected is None and cid in local)
+
+    llm_pairs, fallback_pairs = [], []
+    for course_id, ours in local.items():
+        course = saved.get(normalize_code(course_id))
+        if course is None:
+            continue
+        expected = as_requisites(course)
+        target = fallback_pairs if is_fallback_output(expected, corpus[course_id]) else llm_pairs
+        target.append((course_id, ours, expected))
+
+    return {
+        "statements": len(corpus),
+        "parsed_locally": len(local),
+        "coverage": round(len(local) / len(corpus), 4) if corpus else 0.0,
+        "deferred_to_llm": deferred,
+        "gold": {
+            **_agreement(gold_pairs, corpus, "gold", show),
+            "deferred_but_parseable": missed,
+            "parsed_but_should_defer": overconfident,
+        },
+        "saved_llm": _agreement(llm_pairs, corpus, "llm", show),
+        "saved_fallback": _agreement(fallback_pairs, corpus, "fallback", show),
+    }
+
+
+def throughput(statements: List[str], repeat: int) -> Dict:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for raw in statements:
+            parse_requisites(raw)
+    elapsed = time.perf_counter() - start
+    total = len(statements) * repeat
+    return {
+        "statements": total,
+        "seconds": round(elapsed, 4),
+        "statements_per_second": round(total / elapsed) if elapsed else None,
+        "us_per_statement": round(elapsed / total * 1e6, 2) if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local requisite parser accuracy and throughput")
+    parser.add_argument("--corpus", default="../output/requisites.json", help="course_id -> raw requisite text")
+    parser.add_argument("--saved", default="../output/unc_courses.json", help="previously scraped courses to compare with")
+    parser.add_argument("--gold", default=GOLD_PATH, help="hand-checked parses (null: must defer to the LLM)")
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the corpus for throughput")
+    parser.add_argument("--show", action="store_true", help="print statements where the parsers disagree")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+    with open(args.gold, encoding="utf-8") as f:
+        gold = json.load(f)
+    saved = load_saved_courses(args.saved)
+
+    report = accuracy(corpus, gold, saved, args.show)
+    report["throughput"] = throughput(list(corpus.values()), args.repeat)
+    avoided = report["parsed_locally"]
+    report["llm_calls_avoided"] = avoided
+    report["llm_seconds_avoided"] = round(avoided / LLM_CALLS_PER_SECOND, 1)
+    logger.info(f"Parsed {avoided}/{report['statements']} statements locally, "
+                f"{report['throughput']['statements_per_second']} statements/s; "
+                f"{report['gold'].get('all', 0):.1%} exact on {report['gold']['compared']} gold statements")
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Recall/latency benchmark for course semantic search.
+
+Compares pgvector ivfflat search at several `lists`/`probes` settings with
+exact NumPy brute force over the same embeddings, so index parameters can be
+picked for the actual catalog size. Queries are course embeddings with
+Gaussian noise added (no model needed), or real text with --text.
+
+--lists rebuilds idx_course_embedding for each value; run it against a
+development database. The last value is left in place.
+
+Run from backend/:
+    python -m benchmarks.semantic_search --probes 1,5,10,20 --lists 10,50
+"""
+import argparse
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import psycopg
+from psycopg.rows import dict_row
+
+from app import config
+from app.database import connection_params
+from app.services.embeddings import ExactIndex, encode, parse_vector, to_vector
+from scraping.embed_courses import rebuild_index
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    return float(np.percentile(samples, pct)) if samples else 0.0
+
+
+def load_index(conn: psycopg.Connection) -> ExactIndex:
+    rows = conn.execute(
+        "SELECT course_id, embedding::text AS embedding FROM courses WHERE embedding IS NOT NULL ORDER BY course_id"
+    ).fetchall()
+    if not rows:
+        raise SystemExit("No course embeddings; run python -m scraping.embed_courses first")
+    return ExactIndex([r["course_id"] for r in rows], np.stack([parse_vector(r["embedding"]) for r in rows]))
+
+
+def make_queries(index: ExactIndex, count: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(index), size=min(count, len(index)), replace=False)
+    queries = index.vectors[picks] + rng.normal(0, noise, (len(picks), index.vectors.shape[1])).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def run_ann(conn: psycopg.Connection, queries: np.ndarray, truth: List[set], k: int, probes: int) -> Dict:
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        with conn.transaction():
+            conn.execute("SELECT set_config('ivfflat.probes', %s, true)", (str(probes),))
+            rows = conn.execute("""
+                SELECT course_id FROM courses
+                WHERE embedding IS NOT NULL
+                ORDER BY embedding <=> %s::vector
+                LIMIT %s
+            """, (to_vector(query), k)).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected & {r["course_id"] for r in rows}) / len(expected))
+    return {
+        "probes": probes,
+        "recall": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+    }
+
+
+def run_exact(index: ExactIndex, queries: np.ndarray, k: int) -> Dict:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"recall": 1.0, "p50_ms": round(percentile(latencies, 50), 3), "p95_ms": round(percentile(latencies, 95), 3)}
+
+
+def benchmark(conn: psycopg.Connection, probes: List[int], lists: List[Optional[int]], k: int,
+              queries: int, noise: float, seed: int, text: List[str]) -> Dict:
+    index = load_index(conn)
+    vectors = encode(text) if text else make_queries(index, queries, noise, seed)
+    truth = [{cid for cid, _ in index.search(q, k)} for q in vectors]
+
+    report = {
+        "courses": len(index),
+        "dim": int(index.vectors.shape[1]),
+        "queries": len(vectors),
+        "k": k,
+        "exact": run_exact(index, vectors, k),
+        "ivfflat": [],
+    }
+    for n_lists in lists:
+        if n_lists is not None:
+            rebuild_index(conn, n_lists)
+        for p in probes:
+            result = run_ann(conn, vectors, truth, k, p)
+            result["lists"] = n_lists
+            report["ivfflat"].append(result)
+            logger.info(f"lists={n_lists or 'current'} probes={p}: recall@{k}={result['recall']:.3f} "
+                        f"p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms")
+    logger.info(f"exact: p50={report['exact']['p50_ms']:.2f}ms p95={report['exact']['p95_ms']:.2f}ms")
+    return report
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic search recall/latency benchmark")
+    parser.add_argument("--probes", type=_ints, default=[1, 2, 5, 10, 20, 50])
+    parser.add_argument("--lists", type=_ints, help="ivfflat lists values to rebuild and test (default: current index)")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.02, help="stddev of noise added to sampled course vectors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--text", nargs="*", default=[], help="embed these queries with the model instead")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with psycopg.connect(**connection_params(config.DATABASE_URL), autocommit=True, row_factory=dict_row) as conn:
+        report = benchmark(conn, args.probes, args.lists or [None], args.k,
+                           args.queries, args.noise, args.seed, args.text)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""CPU per request of the catalog read endpoints: Postgres-built JSON vs Python serialization.
+
+Each endpoint is timed two ways through the same in-process ASGI app:
+
+    python       the handler as it was before JSON passthrough: dict rows,
+                 json_agg parsed back into Python, then FastAPI encoding
+                 (and pydantic validation for response_model routes)
+    passthrough  the current handler: Postgres builds the document and the
+                 bytes are returned as they are
+
+The program requirements route is cached in the API, so both variants are
+mounted uncached here to time the work done on a cache miss. A second
+table times cache.serialize on listing rows with the json module and with
+orjson (when installed).
+
+CPU is this process's CPU time (client and server share it; the client
+side is identical for both variants) divided by requests. Work moved into
+Postgres shows up in the wall-clock column, not the CPU one.
+
+Run from backend/ against a loaded catalog (e.g. after benchmarks.synthetic --load):
+    python -m benchmarks.serialization --requests 1000 --rounds 3
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from fastapi import Depends, HTTPException
+
+import backend
+from app import database
+from app.database import Database, get_db
+from app.services import cache
+
+logger = logging.getLogger(__name__)
+
+WARMUP_REQUESTS = 50
+
+
+# Handlers as they were before JSON passthrough
+async def python_get_course(course_id: str, db: Database = Depends(get_db)):
+    course = await db.fetch_one("""
+        SELECT c.*, d.code as department_code
+        FROM courses c
+        JOIN departments d ON c.department_id = d.id
+        WHERE c.course_id = %s
+    """, (course_id,))
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return course
+
+
+async def python_get_prerequisites(course_id: str, db: Database = Depends(get_db)):
+    course, groups = await asyncio.gather(
+        db.fetch_one("SELECT id FROM courses WHERE course_id = %s", (course_id,)),
+        db.fetch_all("""
+            SELECT
+                p.prereq_group,
+                p.is_corequisite,
+                json_agg(
+                    json_build_object(
+                        'course_id', pc.course_id,
+                        'name', pc.name
+                    )
+                ) as courses
+            FROM prerequisites p
+            JOIN courses c ON p.course_id = c.id
+            JOIN courses pc ON p.prereq_course_id = pc.id
+            WHERE c.course_id = %s
+            GROUP BY p.prereq_group, p.is_corequisite
+            ORDER BY p.prereq_group
+        """, (course_id,))
+    )
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return {
+        "course_id": course_id,
+        "prerequisite_groups": [g for g in groups if not g['is_corequisite']],
+        "corequisite_groups": [g for g in groups if g['is_corequisite']]
+    }
+
+
+async def python_get_program_requirements(program_id: str, db: Database = Depends(get_db)):
+    program, requirements = await asyncio.gather(
+        db.fetch_one("SELECT id FROM programs WHERE program_id = %s", (program_id,)),
+        db.fetch_all("""
+            SELECT
+                pr.*,
+                COALESCE(
+                    json_agg(
+                        json_build_object(
+                            'course_id', c.course_id,
+                            'name', c.name,
+                            'credits', c.credits,
+                            'is_required', prc.is_required
+                        ) ORDER BY c.course_id
+                    ) FILTER (WHERE c.id IS NOT NULL),
+                    '[]'::json
+                ) as courses
+            FROM program_requirements pr
+            JOIN programs p ON pr.program_id = p.id
+            LEFT JOIN program_requirement_courses prc ON pr.id = prc.requirement_id
+            LEFT JOIN courses c ON prc.course_id = c.id
+            WHERE p.program_id = %s
+            GROUP BY pr.id
+            ORDER BY pr.display_order, pr.requirement_type
+        """, (program_id,))
+    )
+    if not program:
+        raise HTTPException(status_code=404, detail="Program not found")
+    grouped = {}
+    for req in requirements:
+        grouped.setdefault(req['requirement_type'], []).append(req)
+    return {"program_id": program_id, "requirements_by_type": grouped, "all_requirements": requirements}
+
+
+async def passthrough_get_program_requirements(program_id: str, db: Database = Depends(get_db)):
+    return backend.Response(content=await backend.load_program_requirements(db, program_id),
+                            media_type="application/json")
+
+
+def mount_routes():
+    app = backend.app
+    app.add_api_route("/bench/python/courses/{course_id}", python_get_course, response_model=backend.Course)
+    app.add_api_route("/bench/python/courses/{course_id}/prerequisites", python_get_prerequisites)
+    app.add_api_route("/bench/python/programs/{program_id}/requirements", python_get_program_requirements)
+    app.add_api_route("/bench/passthrough/programs/{program_id}/requirements", passthrough_get_program_requirements)
+
+
+def endpoints(course_ids: List[str], program_ids: List[str]) -> Dict[str, Dict[str, Callable[[int], str]]]:
+    """Endpoint -> variant -> path for the i-th request."""
+    def course(template):
+        return lambda i: template.format(course_ids[i % len(course_ids)])
+
+    def program(template):
+        return lambda i: template.format(program_ids[i % len(program_ids)])
+
+    return {
+        "GET /api/courses/{course_id}": {
+            "python": course("/bench/python/courses/{}"),
+            "passthrough": course("/api/courses/{}"),
+        },
+        "GET /api/courses/{course_id}/prerequisites": {
+            "python": course("/bench/python/courses/{}/prerequisites"),
+            "passthrough": course("/api/courses/{}/prerequisites"),
+        },
+        "GET /api/programs/{program_id}/requirements": {
+            "python": program("/bench/python/programs/{}/requirements"),
+            "passthrough": program("/bench/passthrough/programs/{}/requirements"),
+        },
+    }
+
+
+async def time_requests(client, path: Callable[[int], str], requests: int) -> Dict:
+    for i in range(WARMUP_REQUESTS):
+        (await client.get(path(i))).raise_for_status()
+    cpu, wall = time.process_time(), time.perf_counter()
+    size = 0
+    for i in range(requests):
+        response = await client.get(path(i))
+        response.raise_for_status()
+        size += len(response.content)
+    return {
+        "cpu_us": (time.process_time() - cpu) / requests * 1e6,
+        "wall_us": (time.perf_counter() - wall) / requests * 1e6,
+        "bytes": size / requests,
+    }
+
+
+def time_encoders(rows: List[Dict], repeat: int) -> Dict[str, float]:
+    """cache.serialize per listing response, with the json module and with orjson."""
+    results = {}
+    fast = cache.orjson
+    for name, encoder in (("json", None), ("orjson", fast)):
+        if name == "orjson" and fast is None:
+            continue
+        cache.orjson = encoder
+        try:
+            start = time.process_time()
+            for _ in range(repeat):
+                cache.serialize(rows)
+            results[name] = (time.process_time() - start) / repeat * 1e6
+        finally:
+            cache.orjson = fast
+    return results
+
+
+async def run(requests: int, rounds: int) -> Dict:
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError("This benchmark needs the httpx package installed")
+
+    mount_routes()
+    async with backend.lifespan(backend.app):
+        db = database.get_db()
+        course_ids = [r["course_id"] for r in await db.fetch_all("SELECT course_id FROM courses ORDER BY course_id")]
+        program_ids = [r["program_id"] for r in await db.fetch_all("SELECT program_id FROM programs ORDER BY program_id")]
+        if not course_ids or not program_ids:
+            raise RuntimeError("No catalog loaded; run benchmarks.synthetic --load first")
+        listing_rows = await db.fetch_all(f"""
+            SELECT {backend.COURSE_COLUMNS}, d.code as department_code
+            FROM courses c JOIN departments d ON c.department_id = d.id
+            WHERE d.code = (SELECT code FROM departments ORDER BY code LIMIT 1)
+            ORDER BY c.course_number, c.course_id
+        """)
+
+        results: Dict[str, Dict[str, List[Dict]]] = {}
+        transport = httpx.ASGITransport(app=backend.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            # Alternate variants round by round so drift affects both alike
+            for r in range(rounds):
+                for name, variants in endpoints(course_ids, program_ids).items():
+                    for variant, path in variants.items():
+                        sample = await time_requests(client, path, requests)
+                        results.setdefault(name, {}).setdefault(variant, []).append(sample)
+                        logger.info(f"round {r + 1}: {name} [{variant}] {sample['cpu_us']:.0f} us CPU")
+
+    summary = {}
+    for name, variants in results.items():
+        summary[name] = {
+            variant: {k: statistics.median(s[k] for s in samples) for k in ("cpu_us", "wall_us", "bytes")}
+            for variant, samples in variants.items()
+        }
+        python, passthrough = summary[name]["python"]["cpu_us"], summary[name]["passthrough"]["cpu_us"]
+        summary[name]["cpu_reduction"] = 1 - passthrough / python if python else 0.0
+    return {
+        "requests": requests,
+        "rounds": rounds,
+        "endpoints": summary,
+        "listing_serialize_us": {"rows": len(listing_rows), **time_encoders(listing_rows, max(requests // 10, 10))},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CPU per request of Postgres-built JSON and Python serialization")
+    parser.add_argument("--requests", type=int, default=1000, help="timed requests per endpoint, variant and round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON results here as well")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = asyncio.run(run(args.requests, args.rounds))
+
+    print(f"{'endpoint':<46} {'variant':<12} {'CPU us/req':>11} {'wall us/req':>12} {'bytes':>8}")
+    for name, variants in results["endpoints"].items():
+        for variant in ("python", "passthrough"):
+            v = variants[variant]
+            print(f"{name:<46} {variant:<12} {v['cpu_us']:>11.0f} {v['wall_us']:>12.0f} {v['bytes']:>8.0f}")
+        print(f"{'':<46} {'CPU saved':<12} {variants['cpu_reduction']:>11.0%}")
+    encoders = results["listing_serialize_us"]
+    print(f"\ncache.serialize, {encoders['rows']} listing rows: "
+          + ", ".join(f"{name} {us:.0f} us" for name, us in encoders.items() if name != "rows"))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""Generate a synthetic catalog shaped like the scraped one, and load it.
+
+The shape (prerequisite groups per course, options per group, credits,
+course levels, grade requirement and gen ed rates, description lengths) is
+measured from the real course_scraper JSON and sampled from, so the
+benchmark catalog has the same fan-in as the real one at any size. Scale 1
+is one department per department in the sample file (COMP, 109 courses);
+scale 100 is roughly a full undergraduate catalog.
+
+Prerequisites only point at courses generated earlier (lower numbers,
+earlier departments), so the prerequisite graph is a layered DAG like the
+real one. Programs use the section-list format of program_scraping.ipynb;
+students get declared programs and histories that respect prerequisites.
+
+Files are written in the scraper formats, so loading goes through
+scraping.load_catalog like a real catalog; students are COPYed in after.
+Synthetic department codes start with 'Z' and students use
+@bench.invalid emails, so they never collide with scraped data.
+
+Run from backend/:
+    python -m benchmarks.synthetic --scale 10 --out bench_data
+    python -m benchmarks.synthetic --scale 10 --out bench_data --load --reset
+"""
+import argparse
+import bisect
+import json
+import logging
+import os
+import random
+import string
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import psycopg
+from psycopg.rows import dict_row
+
+from app import config
+from app.database import connection_params
+from scraping.load_catalog import load as load_catalog, normalize_code
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE = os.path.join(os.path.dirname(__file__), "..", "..", "output", "unc_courses.json")
+
+GEN_ED_CODES = ["FC-AESTH", "FC-CREATE", "FC-GLOBAL", "FC-KNOWING", "FC-LAB", "FC-NATSCI", "FC-PAST",
+                "FC-POWER", "FC-QUANT", "FC-VALUES", "FY-SEMINAR", "FY-LAUNCH", "COMMBEYOND", "RESEARCH"]
+GRADES = ["A", "A-", "B+", "B", "B-", "C+", "C", "C-", "D", "F", "P"]
+GRADE_WEIGHTS = [18, 14, 12, 14, 10, 8, 8, 5, 4, 4, 3]
+WORDS = ("analysis data systems theory methods introduction advanced topics design research seminar "
+         "applications principles structures modeling computation history culture society language "
+         "practice laboratory studies foundations networks statistics algorithms policy ethics").split()
+
+# Students per department at every scale, and their history length range
+STUDENTS_PER_DEPARTMENT = 50
+HISTORY_COURSES = (4, 32)
+# Share of prerequisite options taken from earlier departments rather than the course's own
+CROSS_DEPARTMENT_RATE = 0.2
+
+TABLES = ["student_courses", "student_programs", "students", "program_requirement_courses",
+          "program_requirements", "programs", "gen_ed_fulfillments", "grade_requirements",
+          "prerequisites", "courses", "departments"]
+
+
+class Profile:
+    """Empirical distributions measured from a course_scraper JSON file."""
+
+    def __init__(self, departments: Dict[str, List[Dict]]):
+        courses = [c for items in departments.values() for c in items]
+        self.department_sizes = [len(items) for items in departments.values()]
+        self.group_counts = Counter(len(self._groups(c, "prerequisites")) for c in courses)
+        self.options_per_group = Counter(len(g) for c in courses for g in self._groups(c, "prerequisites"))
+        self.corequisite_rate = sum(1 for c in courses if self._groups(c, "corequisites")) / len(courses)
+        self.credits = Counter(c.get("credits") or "3" for c in courses)
+        self.levels = Counter(int(c["course_number"][0]) for c in courses if c["course_number"][:1].isdigit())
+        self.grade_requirement_rate = sum(1 for c in courses if c.get("grade_requirements")) / len(courses)
+        self.gen_ed_rate = max(sum(1 for c in courses if c.get("gen_ed")) / len(courses), 0.15)
+        self.description_words = [len((c.get("description") or "").split()) for c in courses]
+
+    @staticmethod
+    def _groups(course: Dict, key: str) -> List:
+        return (course.get("requisites") or {}).get(key) or []
+
+    def stats(self) -> Dict:
+        return {
+            "department_sizes": self.department_sizes,
+            "prerequisite_groups": dict(sorted(self.group_counts.items())),
+            "options_per_group": dict(sorted(self.options_per_group.items())),
+            "corequisite_rate": round(self.corequisite_rate, 3),
+            "grade_requirement_rate": round(self.grade_requirement_rate, 3),
+        }
+
+
+def pick(rng: random.Random, counter: Counter):
+    values, weights = zip(*counter.items())
+    return rng.choices(values, weights)[0]
+
+
+def department_code(i: int) -> str:
+    letters = string.ascii_uppercase
+    return "Z" + letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26]
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(max(words, 1))).capitalize() + "."
+
+
+def generate_courses(profile: Profile, scale: int, rng: random.Random) -> Dict[str, List[Dict]]:
+    departments: Dict[str, List[Dict]] = {}
+    # Every course generated so far, ordered by level, for prerequisite picks
+    earlier: List[Tuple[int, str]] = []
+    n_departments = scale * len(profile.department_sizes)
+    for d in range(n_departments):
+        code = department_code(d)
+        size = profile.department_sizes[d % len(profile.department_sizes)]
+        numbers = set()
+        while len(numbers) < size:
+            numbers.add(pick(rng, profile.levels) * 100 + rng.randrange(100))
+        own: List[Tuple[int, str]] = []
+        items = []
+        for number in sorted(numbers):
+            course_id = f"{code} {number}"
+            groups = []
+            for _ in range(pick(rng, profile.group_counts)):
+                if own and rng.random() >= CROSS_DEPARTMENT_RATE:
+                    # Lower-numbered courses of the same department
+                    below = own
+                else:
+                    # Earlier departments' courses at or below this course's number
+                    below = earlier[:bisect.bisect_right(earlier, (number, "~"))]
+                if not below:
+                    continue
+                options = rng.sample(below, min(pick(rng, profile.options_per_group), len(below)))
+                groups.append([[opt] for _, opt in options])
+            corequisites = []
+            if own and rng.random() < profile.corequisite_rate:
+                corequisites.append([[rng.choice(own)[1]]])
+            grades = {}
+            if groups and rng.random() < profile.grade_requirement_rate:
+                grades = {opt[0]: "C" for opt in rng.choice(groups)}
+            gen_ed = None
+            if rng.random() < profile.gen_ed_rate:
+                codes = rng.sample(GEN_ED_CODES, rng.choice([1, 1, 2, 3]))
+                gen_ed = [[codes[0]]] + ([codes[1:]] if len(codes) > 1 else [])
+            items.append({
+                "department": code,
+                "course_number": str(number),
+                "course_id": course_id,
+                "course_name": sentence(rng, rng.randint(2, 5)),
+                "credits": pick(rng, profile.credits),
+                "description": sentence(rng, rng.choice(profile.description_words)),
+                "requisites": {"prerequisites": groups, "corequisites": corequisites},
+                "grade_requirements": grades,
+                "requisites_note": None,
+                "gen_ed": gen_ed,
+                "grading_status": "Letter grade.",
+            })
+            own.append((number, course_id))
+        departments[code] = items
+        earlier.extend(own)
+        earlier.sort()
+    return departments
+
+
+def generate_programs(departments: Dict[str, List[Dict]], rng: random.Random) -> List[Dict]:
+    programs = []
+    for code, items in departments.items():
+        course_ids = [c["course_id"] for c in items]
+        for kind, core, electives, select in (("major", 8, 14, 5), ("minor", 3, 8, 2)):
+            if len(course_ids) < core + electives:
+                continue
+            chosen = rng.sample(course_ids, core + electives)
+            programs.append({
+                "program_id": f"bench-{code.lower()}-{kind}",
+                "program_name": f"{code} Synthetic {kind.title()}",
+                "program_type": kind,
+                "degree_type": "BS" if kind == "major" else None,
+                "total_hours": 120 if kind == "major" else 15,
+                "url": None,
+                "requirements": [
+                    {"section_name": "Core Requirements", "section_type": "required",
+                     "courses": [{"course_code": cid} for cid in chosen[:core]]},
+                    {"section_name": "Electives", "section_type": "select", "selection_count": select,
+                     "courses": [{"course_code": cid} for cid in chosen[core:]]},
+                ],
+            })
+    return programs
+
+
+def generate_students(departments: Dict[str, List[Dict]], programs: List[Dict], rng: random.Random) -> List[Dict]:
+    """Students whose completed courses always satisfy their prerequisites."""
+    prereqs = {c["course_id"]: [[normalize_code(o[0]) for o in g] for g in c["requisites"]["prerequisites"]]
+               for items in departments.values() for c in items}
+    by_department = {code: [c["course_id"] for c in items] for code, items in departments.items()}
+    codes = list(departments)
+    program_ids = [p["program_id"] for p in programs]
+    students = []
+    for _ in range(len(departments) * STUDENTS_PER_DEPARTMENT):
+        home = rng.choice(codes)
+        pool = by_department[home] + rng.sample(by_department[rng.choice(codes)], 10)
+        completed: Dict[str, str] = {}
+        target = rng.randint(*HISTORY_COURSES)
+        for _ in range(target * 4):
+            if len(completed) >= target:
+                break
+            course = rng.choice(pool)
+            if course in completed:
+                continue
+            if all(any(o in completed and completed[o] != "F" for o in g) for g in prereqs[course]):
+                completed[course] = rng.choices(GRADES, GRADE_WEIGHTS)[0]
+        own = [pid for pid in program_ids if pid.startswith(f"bench-{home.lower()}-")]
+        students.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "graduation_year": rng.randint(2025, 2030),
+            "programs": own[:rng.randint(1, len(own))] if own else [],
+            "courses": [{"course_id": cid, "grade": grade, "status": "completed"} for cid, grade in completed.items()]
+            + [{"course_id": cid, "grade": None, "status": "planned"}
+               for cid in rng.sample(pool, 3) if cid not in completed],
+        })
+    return students
+
+
+def generate(sample_path: str, scale: int, seed: int, out_dir: str) -> Dict:
+    """Write courses.json, programs.json, students.json and manifest.json into out_dir."""
+    start = time.monotonic()
+    rng = random.Random(seed)
+    with open(sample_path, encoding="utf-8") as f:
+        profile = Profile(json.load(f))
+
+    departments = generate_courses(profile, scale, rng)
+    programs = generate_programs(departments, rng)
+    students = generate_students(departments, programs, rng)
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, content in (("courses", departments), ("programs", programs), ("students", students)):
+        with open(os.path.join(out_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(content, f)
+
+    course_ids = [c["course_id"] for items in departments.values() for c in items]
+    manifest = {
+        "scale": scale,
+        "seed": seed,
+        "sample": os.path.basename(sample_path),
+        "profile": profile.stats(),
+        "counts": {
+            "departments": len(departments),
+            "courses": len(course_ids),
+            "prerequisite_links": sum(len(g) for items in departments.values() for c in items
+                                      for g in c["requisites"]["prerequisites"]),
+            "programs": len(programs),
+            "students": len(students),
+            "student_courses": sum(len(s["courses"]) for s in students),
+        },
+        "generate_seconds": round(time.monotonic() - start, 3),
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def copy_students(cur: psycopg.Cursor, students: List[Dict]) -> Dict:
+    """COPY students, their declared programs and their course history."""
+    cur.execute("""
+        CREATE TEMP TABLE stage_students (id UUID, graduation_year INTEGER) ON COMMIT DROP;
+        CREATE TEMP TABLE stage_student_programs (student_id UUID, program_id TEXT, is_primary BOOLEAN) ON COMMIT DROP;
+        CREATE TEMP TABLE stage_student_courses (
+            student_id UUID, course_id TEXT, grade TEXT, status TEXT, semester TEXT
+        ) ON COMMIT DROP;
+    """)
+    with cur.copy("COPY stage_students (id, graduation_year) FROM STDIN") as copy:
+        for s in students:
+            copy.write_row((s["id"], s["graduation_year"]))
+    with cur.copy("COPY stage_student_programs (student_id, program_id, is_primary) FROM STDIN") as copy:
+        for s in students:
+            for i, program_id in enumerate(s["programs"]):
+                copy.write_row((s["id"], program_id, i == 0))
+    with cur.copy("COPY stage_student_courses (student_id, course_id, grade, status, semester) FROM STDIN") as copy:
+        for s in students:
+            for i, course in enumerate(s["courses"]):
+                # One course per term slot keeps (student, course, semester) unique
+                copy.write_row((s["id"], course["course_id"], course["grade"], course["status"], f"Term {i // 5}"))
+
+    cur.execute("""
+        INSERT INTO students (id, email, name, graduation_year)
+        SELECT id, 'bench-' || id || '@bench.invalid', 'Benchmark Student', graduation_year FROM stage_students
+        ON CONFLICT (id) DO NOTHING
+    """)
+    students_inserted = cur.rowcount
+    cur.execute("""
+        INSERT INTO student_programs (student_id, program_id, is_primary)
+        SELECT s.student_id, p.id, s.is_primary
+        FROM stage_student_programs s JOIN programs p ON p.program_id = s.program_id
+    """)
+    programs_inserted = cur.rowcount
+    cur.execute("""
+        INSERT INTO student_courses (student_id, course_id, grade, status, semester)
+        SELECT s.student_id, c.id, s.grade, s.status, s.semester
+        FROM stage_student_courses s JOIN courses c ON c.course_id = s.course_id
+        ON CONFLICT (student_id, course_id, semester) DO NOTHING
+    """)
+    return {"students": students_inserted, "student_programs": programs_inserted, "student_courses": cur.rowcount}
+
+
+def load(conn: psycopg.Connection, data_dir: str, reset: bool = False) -> Dict:
+    """Load a generated data directory; reset empties the catalog and student tables first."""
+    start = time.monotonic()
+    if reset:
+        with conn.transaction():
+            conn.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+    catalog = load_catalog(conn, [os.path.join(data_dir, "courses.json")], [os.path.join(data_dir, "programs.json")])
+
+    with open(os.path.join(data_dir, "students.json"), encoding="utf-8") as f:
+        students = json.load(f)
+    with conn.transaction(), conn.cursor() as cur:
+        student_report = copy_students(cur, students)
+    with conn.cursor() as cur:
+        # Fresh bulk loads have no statistics yet; plans during the run would be off
+        for table in TABLES:
+            cur.execute(f"ANALYZE {table}")
+    return {"catalog": catalog, "students": student_report, "seconds": round(time.monotonic() - start, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate (and optionally load) a synthetic benchmark catalog")
+    parser.add_argument("--scale", type=int, default=10, help="departments per department in the sample file")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sample", default=DEFAULT_SAMPLE, help="course_scraper JSON whose shape is copied")
+    parser.add_argument("--out", default="bench_data", help="directory for the generated files")
+    parser.add_argument("--skip-generate", action="store_true", help="load an existing --out directory")
+    parser.add_argument("--load", action="store_true", help="load into DATABASE_URL after generating")
+    parser.add_argument("--reset", action="store_true",
+                        help="TRUNCATE catalog and student tables before loading (local benchmark databases only)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.skip_generate:
+        manifest = generate(args.sample, args.scale, args.seed, args.out)
+        logger.info(f"Generated {manifest['counts']} in {manifest['generate_seconds']}s into {args.out}")
+    if args.load or args.skip_generate:
+        # autocommit: load_catalog and load() manage their own transactions
+        with psycopg.connect(**connection_params(config.DATABASE_URL), row_factory=dict_row, autocommit=True) as conn:
+            report = load(conn, args.out, reset=args.reset)
+        logger.info(f"Loaded {args.out} in {report['seconds']}s")
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
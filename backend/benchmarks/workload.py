@@ -0,0 +1,435 @@
+"""Drive the API and CourseDatabase with a mixed workload over a synthetic catalog.
+
+Every backend.py endpoint has a request builder that picks realistic
+arguments from the generated data (real course ids, prerequisite pairs,
+student histories, programs). Workers draw operations by weight for a fixed
+duration; each phase reports per-operation p50/p95/p99 latency, throughput
+and error counts as JSON, so runs can be diffed with benchmarks.compare.
+
+Phases:
+    http      every endpoint, in-process through the ASGI app (default) or
+              against a running server with --url
+    database  every CourseDatabase query method, one connection per thread
+
+In-process runs share one event loop between client and server, so their
+absolute numbers include client overhead; use --url against uvicorn for
+deployment-like figures and in-process runs for commit-to-commit comparison.
+
+Run from backend/ after benchmarks.synthetic --load:
+    python -m benchmarks.workload --data bench_data --duration 30 --output bench_results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from benchmarks.synthetic import WORDS
+
+logger = logging.getLogger(__name__)
+
+# (method, path, query params, JSON body)
+Request = Tuple[str, str, Optional[Dict], Optional[object]]
+
+# Relative request rates; semantic search needs the embedding model and the admin
+# endpoints drop in-memory state, so they are off unless enabled with --weight
+HTTP_WEIGHTS = {
+    "GET /": 0.5,
+    "GET /api/health": 1,
+    "GET /api/courses/search": 8,
+    "GET /api/courses/autocomplete": 15,
+    "GET /api/courses/semantic-search": 0,
+    "GET /api/courses/batch": 3,
+    "POST /api/courses/batch": 2,
+    "POST /api/courses/batch (ndjson)": 1,
+    "GET /api/courses/{course_id}": 15,
+    "GET /api/courses/{course_id}/prerequisites": 10,
+    "GET /api/courses/{course_id}/prerequisites/all": 3,
+    "GET /api/courses/{course_id}/unlocks": 3,
+    "GET /api/courses/{course_id}/paths": 2,
+    "GET /api/departments": 2,
+    "GET /api/departments/{dept_code}/courses": 4,
+    "GET /api/programs": 2,
+    "GET /api/programs/{program_id}": 2,
+    "GET /api/programs/{program_id}/requirements": 4,
+    "POST /api/planner/check-prerequisites": 8,
+    "POST /api/planner/validate-semester": 4,
+    "POST /api/planner/validate-plan": 6,
+    "POST /api/planner/check-prerequisites/batch": 2,
+    "POST /api/planner/generate": 1,
+    "POST /api/planner/gen-ed": 1,
+    "GET /api/students/{student_id}/eligible-courses": 2,
+    "POST /api/audit": 2,
+    "POST /api/audit/closest-programs": 1,
+    "POST /api/admin/reload-prerequisites": 0,
+    "POST /api/admin/clear-cache": 0,
+}
+
+DATABASE_WEIGHTS = {
+    "get_course": 15,
+    "search_courses": 8,
+    "get_department_courses": 4,
+    "get_course_prerequisites": 10,
+    "check_prerequisites_met": 8,
+    "check_prerequisites_batch": 2,
+    "get_program": 2,
+    "get_program_requirements": 4,
+    "search_programs": 2,
+    "get_database_stats": 0.5,
+    "get_course_graph_data": 2,
+    "find_course_paths": 1,
+}
+
+
+class Dataset:
+    """The generated catalog, indexed for picking request arguments."""
+
+    def __init__(self, data_dir: str):
+        def read(name):
+            with open(os.path.join(data_dir, f"{name}.json"), encoding="utf-8") as f:
+                return json.load(f)
+
+        self.manifest = read("manifest")
+        departments = read("courses")
+        self.departments = list(departments)
+        self.courses = {c["course_id"]: c for items in departments.values() for c in items}
+        self.course_ids = list(self.courses)
+        # (prerequisite, course) pairs, for path queries
+        self.edges = [(group[0][0], cid) for cid, c in self.courses.items()
+                      for group in c["requisites"]["prerequisites"] if group]
+        self.with_prereqs = [cid for cid, c in self.courses.items() if c["requisites"]["prerequisites"]]
+        self.program_ids = [p["program_id"] for p in read("programs")]
+        self.students = [s for s in read("students") if s["courses"]]
+
+    def student(self, rng: random.Random) -> Dict:
+        return rng.choice(self.students)
+
+    def completed(self, student: Dict) -> List[str]:
+        return [c["course_id"] for c in student["courses"] if c["status"] == "completed"]
+
+
+def http_requests(data: Dataset) -> Dict[str, Callable[[random.Random], Request]]:
+    """Request builder per HTTP_WEIGHTS operation."""
+    def course(rng):
+        return quote(rng.choice(data.course_ids))
+
+    def plan(rng):
+        student = data.student(rng)
+        semesters = [{"id": f"term-{i}", "courses": rng.sample(data.course_ids, 5)} for i in range(8)]
+        moved = semesters[2]["courses"][0]
+        edit = {"action": "move", "course_id": moved, "from_semester": "term-2", "to_semester": "term-5"}
+        return {"completed_courses": data.completed(student), "semesters": semesters, "edits": [edit]}
+
+    def paths(rng):
+        prereq, target = rng.choice(data.edges)
+        return "GET", f"/api/courses/{quote(prereq)}/paths", {"to": target, "k": 3}, None
+
+    def gen_ed(rng):
+        student = data.student(rng)
+        body = {"program_id": (student["programs"] or [None])[0], "completed_courses": data.completed(student)}
+        return "POST", "/api/planner/gen-ed", None, body
+
+    return {
+        "GET /": lambda rng: ("GET", "/", None, None),
+        "GET /api/health": lambda rng: ("GET", "/api/health", None, None),
+        "GET /api/courses/search": lambda rng: ("GET", "/api/courses/search", {"q": rng.choice(WORDS)}, None),
+        "GET /api/courses/autocomplete": lambda rng: (
+            "GET", "/api/courses/autocomplete",
+            {"q": rng.choice([rng.choice(data.course_ids)[:rng.randint(2, 7)], rng.choice(WORDS)[:4]])}, None),
+        "GET /api/courses/semantic-search": lambda rng: (
+            "GET", "/api/courses/semantic-search", {"q": " ".join(rng.sample(WORDS, 3))}, None),
+        "GET /api/courses/batch": lambda rng: (
+            "GET", "/api/courses/batch", {"ids": ",".join(rng.sample(data.course_ids, 20))}, None),
+        "POST /api/courses/batch": lambda rng: (
+            "POST", "/api/courses/batch", None, {"course_ids": rng.sample(data.course_ids, 40)}),
+        "POST /api/courses/batch (ndjson)": lambda rng: (
+            "POST", "/api/courses/batch", None, {"course_ids": rng.sample(data.course_ids, 200), "format": "ndjson"}),
+        "GET /api/courses/{course_id}": lambda rng: ("GET", f"/api/courses/{course(rng)}", None, None),
+        "GET /api/courses/{course_id}/prerequisites": lambda rng: (
+            "GET", f"/api/courses/{quote(rng.choice(data.with_prereqs))}/prerequisites", None, None),
+        "GET /api/courses/{course_id}/prerequisites/all": lambda rng: (
+            "GET", f"/api/courses/{quote(rng.choice(data.with_prereqs))}/prerequisites/all", None, None),
+        "GET /api/courses/{course_id}/unlocks": lambda rng: ("GET", f"/api/courses/{course(rng)}/unlocks", None, None),
+        "GET /api/courses/{course_id}/paths": paths,
+        "GET /api/departments": lambda rng: ("GET", "/api/departments", None, None),
+        "GET /api/departments/{dept_code}/courses": lambda rng: (
+            "GET", f"/api/departments/{rng.choice(data.departments)}/courses", None, None),
+        "GET /api/programs": lambda rng: ("GET", "/api/programs", {"program_type": rng.choice(["major", "minor"])}, None),
+        "GET /api/programs/{program_id}": lambda rng: ("GET", f"/api/programs/{rng.choice(data.program_ids)}", None, None),
+        "GET /api/programs/{program_id}/requirements": lambda rng: (
+            "GET", f"/api/programs/{rng.choice(data.program_ids)}/requirements", None, None),
+        "POST /api/planner/check-prerequisites": lambda rng: (
+            "POST", "/api/planner/check-prerequisites", None,
+            {"course_id": rng.choice(data.with_prereqs), "completed_courses": data.completed(data.student(rng))}),
+        "POST /api/planner/validate-semester": lambda rng: (
+            "POST", "/api/planner/validate-semester", None,
+            {"semester_courses": rng.sample(data.course_ids, 5), "completed_courses": data.completed(data.student(rng))}),
+        "POST /api/planner/validate-plan": lambda rng: ("POST", "/api/planner/validate-plan", None, plan(rng)),
+        "POST /api/planner/check-prerequisites/batch": lambda rng: (
+            "POST", "/api/planner/check-prerequisites/batch", None,
+            {"checks": [{"student_id": data.student(rng)["id"], "semester_courses": rng.sample(data.course_ids, 5)}
+                        for _ in range(20)]}),
+        "POST /api/planner/generate": lambda rng: (
+            "POST", "/api/planner/generate", None,
+            {"program_id": rng.choice(data.program_ids), "completed_courses": data.completed(data.student(rng)),
+             "time_budget_ms": 100}),
+        "POST /api/planner/gen-ed": gen_ed,
+        "GET /api/students/{student_id}/eligible-courses": lambda rng: (
+            "GET", f"/api/students/{data.student(rng)['id']}/eligible-courses", {"unlocked_only": "true"}, None),
+        "POST /api/audit": lambda rng: (
+            "POST", "/api/audit", None, {"students": [{"student_id": data.student(rng)["id"]} for _ in range(5)]}),
+        "POST /api/audit/closest-programs": lambda rng: (
+            "POST", "/api/audit/closest-programs", None, {"student_id": data.student(rng)["id"]}),
+        "POST /api/admin/reload-prerequisites": lambda rng: ("POST", "/api/admin/reload-prerequisites", None, None),
+        "POST /api/admin/clear-cache": lambda rng: ("POST", "/api/admin/clear-cache", None, None),
+    }
+
+
+def database_calls(data: Dataset) -> Dict[str, Callable]:
+    """CourseDatabase call per DATABASE_WEIGHTS operation: fn(db, rng)."""
+    return {
+        "get_course": lambda db, rng: db.get_course(rng.choice(data.course_ids)),
+        "search_courses": lambda db, rng: db.search_courses(rng.choice(WORDS)),
+        "get_department_courses": lambda db, rng: db.get_department_courses(rng.choice(data.departments)),
+        "get_course_prerequisites": lambda db, rng: db.get_course_prerequisites(rng.choice(data.with_prereqs)),
+        "check_prerequisites_met": lambda db, rng: db.check_prerequisites_met(
+            data.student(rng)["id"], rng.choice(data.with_prereqs)),
+        "check_prerequisites_batch": lambda db, rng: db.check_prerequisites_batch(
+            [data.student(rng)["id"] for _ in range(10)], rng.sample(data.course_ids, 50)),
+        "get_program": lambda db, rng: db.get_program(rng.choice(data.program_ids)),
+        "get_program_requirements": lambda db, rng: db.get_program_requirements(rng.choice(data.program_ids)),
+        "search_programs": lambda db, rng: db.search_programs(rng.choice(["major", "minor", "Synthetic"])),
+        "get_database_stats": lambda db, rng: db.get_database_stats(),
+        "get_course_graph_data": lambda db, rng: db.get_course_graph_data(rng.choice(data.with_prereqs)),
+        "find_course_paths": lambda db, rng: db.find_course_paths(*rng.choice(data.edges), 4),
+    }
+
+
+class Recorder:
+    """Latencies and outcomes per operation."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, ok: bool, status: Optional[str] = None):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            if status is not None:
+                counts = self.statuses.setdefault(name, {})
+                counts[status] = counts.get(status, 0) + 1
+
+    def report(self, elapsed: float) -> Dict:
+        operations = {}
+        for name, samples in sorted(self.latencies.items()):
+            operations[name] = {
+                "count": len(samples),
+                "errors": self.errors.get(name, 0),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "latency_ms": latency_summary(samples),
+            }
+            if name in self.statuses:
+                operations[name]["status"] = self.statuses[name]
+        everything = [s for samples in self.latencies.values() for s in samples]
+        return {
+            "duration_s": round(elapsed, 3),
+            "requests": len(everything),
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(len(everything) / elapsed, 2) if elapsed else 0,
+            "latency_ms": latency_summary(everything),
+            "operations": operations,
+        }
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    rank = max(int(round(p / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def latency_summary(samples: List[float]) -> Dict:
+    ordered = sorted(samples)
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "p50": ms(percentile(ordered, 50)),
+        "p95": ms(percentile(ordered, 95)),
+        "p99": ms(percentile(ordered, 99)),
+        "mean": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "max": ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+def choose(rng: random.Random, weights: Dict[str, float]) -> str:
+    names = [name for name, w in weights.items() if w > 0]
+    return rng.choices(names, [weights[n] for n in names])[0]
+
+
+async def run_http(data: Dataset, weights: Dict[str, float], duration: float, concurrency: int,
+                   seed: int, url: Optional[str] = None, warmup: float = 0) -> Dict:
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError("The http phase needs the httpx package installed")
+
+    builders = http_requests(data)
+    unknown = set(weights) - set(builders)
+    if unknown:
+        raise ValueError(f"Unknown operations: {sorted(unknown)}")
+    recorder = Recorder()
+
+    async def worker(client, worker_id: int, until: float, record: bool):
+        rng = random.Random(seed * 1000 + worker_id + (0 if record else 500))
+        while time.monotonic() < until:
+            name = choose(rng, weights)
+            method, path, params, body = builders[name](rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, params=params, json=body)
+                await response.aread()
+                ok, status = response.status_code < 400, str(response.status_code)
+            except httpx.HTTPError as e:
+                ok, status = False, type(e).__name__
+            if record:
+                recorder.record(name, time.perf_counter() - start, ok, status)
+
+    async def drive(client):
+        if warmup:
+            until = time.monotonic() + warmup
+            await asyncio.gather(*(worker(client, i, until, False) for i in range(concurrency)))
+        start = time.monotonic()
+        await asyncio.gather(*(worker(client, i, start + duration, True) for i in range(concurrency)))
+        return time.monotonic() - start
+
+    limits = httpx.Limits(max_connections=concurrency)
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+            elapsed = await drive(client)
+    else:
+        import backend
+        async with backend.lifespan(backend.app):
+            transport = httpx.ASGITransport(app=backend.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+                elapsed = await drive(client)
+
+    report = recorder.report(elapsed)
+    report.update({"concurrency": concurrency, "target": url or "in-process"})
+    return report
+
+
+def run_database(data: Dataset, weights: Dict[str, float], duration: float, concurrency: int, seed: int) -> Dict:
+    from scraping.db_queries import CourseDatabase
+
+    calls = database_calls(data)
+    unknown = set(weights) - set(calls)
+    if unknown:
+        raise ValueError(f"Unknown operations: {sorted(unknown)}")
+    recorder = Recorder()
+    start = time.monotonic()
+    until = start + duration
+
+    def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        with CourseDatabase() as db:
+            while time.monotonic() < until:
+                name = choose(rng, weights)
+                began = time.perf_counter()
+                try:
+                    calls[name](db, rng)
+                    ok = True
+                except Exception as e:
+                    logger.debug(f"{name} failed: {e}")
+                    db.conn.rollback()
+                    ok = False
+                recorder.record(name, time.perf_counter() - began, ok)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, i) for i in range(concurrency)]:
+            future.result()
+
+    report = recorder.report(time.monotonic() - start)
+    report["concurrency"] = concurrency
+    return report
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_weights(overrides: List[str]) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Apply NAME=WEIGHT overrides to the HTTP or database weights, by which one has NAME."""
+    http, database = dict(HTTP_WEIGHTS), dict(DATABASE_WEIGHTS)
+    for override in overrides:
+        name, _, weight = override.rpartition("=")
+        target = http if name in http else database if name in database else None
+        if target is None:
+            raise ValueError(f"Unknown operation: {name}")
+        target[name] = float(weight)
+    return http, database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the mixed benchmark workload and write JSON results")
+    parser.add_argument("--data", default="bench_data", help="directory written by benchmarks.synthetic")
+    parser.add_argument("--phase", choices=["http", "database", "all"], default="all")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per phase")
+    parser.add_argument("--warmup", type=float, default=3, help="unrecorded seconds before the http phase")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--db-concurrency", type=int, default=4, help="CourseDatabase threads")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--weight", action="append", default=[], metavar="OPERATION=WEIGHT",
+                        help='override an operation weight, e.g. "GET /api/courses/semantic-search=1"')
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    http_weights, database_weights = parse_weights(args.weight)
+    data = Dataset(args.data)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "dataset": {k: data.manifest[k] for k in ("scale", "seed", "counts")},
+            "weights": {"http": http_weights, "database": database_weights},
+        },
+        "phases": {},
+    }
+    if args.phase in ("http", "all"):
+        logger.info(f"http phase: {args.duration}s, {args.concurrency} workers")
+        report["phases"]["http"] = asyncio.run(run_http(
+            data, http_weights, args.duration, args.concurrency, args.seed, args.url, args.warmup))
+    if args.phase in ("database", "all"):
+        logger.info(f"database phase: {args.duration}s, {args.db_concurrency} threads")
+        report["phases"]["database"] = run_database(
+            data, database_weights, args.duration, args.db_concurrency, args.seed)
+
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(body)
+    print(body)
+
+
+if __name__ == "__main__":
+    main()
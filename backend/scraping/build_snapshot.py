@@ -0,0 +1,42 @@
+"""Build the memory-mapped catalog snapshot the API workers share.
+
+API workers rebuild a stale snapshot themselves when the catalog changes,
+so this is for deploys: run it after a scrape (or before starting the
+workers) and every worker's cold start is just mapping the file.
+
+Run from backend/:
+    python -m scraping.build_snapshot [--out /var/lib/pathfinder/catalog.snap] [--force]
+"""
+import argparse
+import asyncio
+import logging
+
+from app import config
+from app.database import Database
+from app.services import prerequisite
+
+
+async def build(path: str, force: bool):
+    db = Database(config.DATABASE_URL, min_size=1, max_size=3)
+    await db.open()
+    try:
+        snap = await prerequisite.refresh_snapshot(db, path, force)
+    finally:
+        await db.close()
+    print(f"{path}: {len(snap)} courses, catalog v{snap.catalog_version}, {snap.size / 1024:.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the shared catalog snapshot")
+    parser.add_argument("--out", default=config.CATALOG_SNAPSHOT_PATH, help="snapshot path (default: CATALOG_SNAPSHOT_PATH)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the snapshot matches the catalog version")
+    args = parser.parse_args()
+    if not args.out:
+        parser.error("--out is required when CATALOG_SNAPSHOT_PATH is not set")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(build(args.out, args.force))
+
+
+if __name__ == "__main__":
+    main()
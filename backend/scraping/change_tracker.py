@@ -0,0 +1,245 @@
+"""Change detection for incremental catalog scrapes.
+
+A state file remembers, per department, the page's ETag/Last-Modified and
+content hash, and for each course a fingerprint of its catalog fields and of
+its raw requisite text. On the next scrape:
+
+- department pages are fetched with conditional GETs; a 304 or an identical
+  page hash skips the department without parsing it
+- a changed page is parsed and its courses are diffed against the stored
+  fingerprints; only added and modified courses go to the requisite parser
+  and get saved
+- every difference is recorded in a change log (added/removed/modified
+  courses, and whether their requisites changed), so caches and graph
+  indexes downstream can invalidate exactly what moved
+
+State for a department is committed only after its courses were saved (to
+the database, or to the JSON file once it is written), so a failed
+department is retried in full next time. Courses that disappear are
+logged as removed but not deleted from the database. Requisites naming a
+course that did not exist yet are only re-resolved when the requiring course
+itself changes; run with --full now and then to rebuild everything.
+
+Inspect from backend/:
+    python -m scraping.change_tracker [--state .scrape_state.json] [--log changes.jsonl]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from scraping.parse_cache import fingerprint, normalize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = ".scrape_state.json"
+STATE_VERSION = 1
+
+# Filled in from the raw requisite text, which is fingerprinted separately
+REQUISITE_FIELDS = ("requisites", "grade_requirements", "requisites_note")
+
+
+class Page:
+    """A fetched department page; text is None when the server answered 304 Not Modified."""
+
+    def __init__(self, text: Optional[str], etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def page_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def course_fingerprint(data: Dict, raw_requisites: Optional[str]) -> Dict[str, str]:
+    """Fingerprints of a parsed course block: catalog fields and raw requisite text."""
+    content = {key: value for key, value in data.items() if key not in REQUISITE_FIELDS}
+    return {
+        "content": fingerprint(json.dumps(content, sort_keys=True, ensure_ascii=False)),
+        "requisites": fingerprint(normalize(raw_requisites or "")),
+    }
+
+
+class ChangeTracker:
+    """Scrape state plus the change log of the current run.
+
+    Not thread-safe; scrape_all_courses only calls it from its coordinating
+    thread.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH, full: bool = False):
+        self.path = path
+        self.full = full
+        self.departments: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == STATE_VERSION:
+                self.departments = state["departments"]
+            else:
+                logger.warning(f"Ignoring scrape state {path} from an older version")
+
+        # Department -> (page, course fingerprints) awaiting a successful save
+        self._pending: Dict[str, Tuple[Page, Dict[str, Dict]]] = {}
+        # Departments parsed for JSON output, committed once the file is written
+        self._unwritten: List[str] = []
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self.department_status: Dict[str, List[str]] = {
+            "not_modified": [], "unchanged": [], "changed": [], "removed": [],
+        }
+        self.course_changes: List[Dict] = []
+
+    def validators(self, dept_code: str) -> Dict[str, Optional[str]]:
+        """Conditional GET headers for a department page (none on a full scrape)."""
+        stored = self.departments.get(dept_code)
+        if self.full or not stored:
+            return {}
+        return {"etag": stored.get("etag"), "last_modified": stored.get("last_modified")}
+
+    def page_changed(self, dept_code: str, page: Page) -> bool:
+        """Whether a fetched page needs parsing."""
+        stored = self.departments.get(dept_code)
+        if page.text is None:
+            self.department_status["not_modified"].append(dept_code)
+            return False
+        if not self.full and stored and stored.get("page_hash") == page_hash(page.text):
+            # Same content, new validators (e.g. the server regenerated the page)
+            stored.update(etag=page.etag, last_modified=page.last_modified)
+            self.department_status["unchanged"].append(dept_code)
+            return False
+        self._pending[dept_code] = (page, {})
+        return True
+
+    def diff_department(self, dept_code: str, parsed: Iterable[Tuple[Dict, Optional[str]]]) -> List[Tuple[Dict, Optional[str]]]:
+        """Added and modified courses of a parsed page (every course on a full scrape); logs each change."""
+        previous = self.departments.get(dept_code, {}).get("courses", {})
+        fingerprints: Dict[str, Dict] = {}
+        changed, keep = [], []
+        for data, raw in parsed:
+            course_id = data.get("course_id")
+            if not course_id:
+                continue
+            current = course_fingerprint(data, raw)
+            fingerprints[course_id] = current
+            before = previous.get(course_id)
+            if self.full:
+                keep.append((data, raw))
+            if before == current:
+                continue
+            changed.append((data, raw))
+            self.course_changes.append({
+                "course_id": course_id,
+                "department": dept_code,
+                "change": "modified" if before else "added",
+                "content_changed": before is None or before["content"] != current["content"],
+                "requisites_changed": (before["requisites"] if before else fingerprint("")) != current["requisites"],
+            })
+        for course_id in previous.keys() - fingerprints.keys():
+            self.course_changes.append(self._removed(course_id, dept_code, previous[course_id]))
+
+        page, _ = self._pending[dept_code]
+        self._pending[dept_code] = (page, fingerprints)
+        if changed or previous.keys() != fingerprints.keys():
+            self.department_status["changed"].append(dept_code)
+        else:
+            self.department_status["unchanged"].append(dept_code)
+        return keep if self.full else changed
+
+    @staticmethod
+    def _removed(course_id: str, dept_code: str, before: Dict) -> Dict:
+        return {
+            "course_id": course_id,
+            "department": dept_code,
+            "change": "removed",
+            "content_changed": True,
+            "requisites_changed": before["requisites"] != fingerprint(""),
+        }
+
+    def commit_department(self, dept_code: str):
+        """Record a department's page and fingerprints once its courses are saved."""
+        page, fingerprints = self._pending.pop(dept_code)
+        self.departments[dept_code] = {
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "page_hash": page_hash(page.text),
+            "courses": fingerprints,
+        }
+
+    def defer_department(self, dept_code: str):
+        """Commit a department later, with commit_written(), once its output is on disk."""
+        self._unwritten.append(dept_code)
+
+    def commit_written(self):
+        """Commit every deferred department; call after the JSON output was written."""
+        for dept_code in self._unwritten:
+            self.commit_department(dept_code)
+        self._unwritten = []
+
+    def removed_courses(self) -> List[Tuple[str, str]]:
+        """(department, course_id) of every course logged as removed this run."""
+        return [(c["department"], c["course_id"]) for c in self.course_changes if c["change"] == "removed"]
+
+    def finish(self, seen: Iterable[str]):
+        """Log departments that vanished from a complete index as removed."""
+        for dept_code in sorted(self.departments.keys() - set(seen)):
+            for course_id, before in self.departments.pop(dept_code).get("courses", {}).items():
+                self.course_changes.append(self._removed(course_id, dept_code, before))
+            self.department_status["removed"].append(dept_code)
+
+    def save(self):
+        """Atomically write the state file."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": STATE_VERSION, "departments": self.departments}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def summary(self) -> Dict[str, int]:
+        counts = {f"departments_{status}": len(depts) for status, depts in self.department_status.items()}
+        for change in ("added", "modified", "removed"):
+            counts[f"courses_{change}"] = sum(1 for c in self.course_changes if c["change"] == change)
+        counts["requisites_changed"] = sum(1 for c in self.course_changes if c["requisites_changed"])
+        return counts
+
+    def change_log(self) -> Dict:
+        return {
+            "started_at": self.started_at,
+            "full": self.full,
+            "summary": self.summary(),
+            "departments": self.department_status,
+            "courses": self.course_changes,
+        }
+
+    def append_change_log(self, path: str):
+        """Append this run's changes as one JSON line."""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.change_log(), ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show scrape state and recent changes")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH)
+    parser.add_argument("--log", help="change log written by course_scraper.py --change-log")
+    parser.add_argument("--runs", type=int, default=5, help="recent runs to show from the change log")
+    args = parser.parse_args()
+
+    tracker = ChangeTracker(args.state)
+    courses = sum(len(d.get("courses", {})) for d in tracker.departments.values())
+    with_validators = sum(1 for d in tracker.departments.values() if d.get("etag") or d.get("last_modified"))
+    print(f"{args.state}: {len(tracker.departments)} departments ({with_validators} with HTTP validators), "
+          f"{courses} courses")
+
+    if args.log and os.path.exists(args.log):
+        with open(args.log, encoding="utf-8") as f:
+            runs = [json.loads(line) for line in f if line.strip()]
+        for run in runs[-args.runs:]:
+            print(f"{run['started_at']}{' (full)' if run['full'] else ''}: {run['summary']}")
+
+
+if __name__ == "__main__":
+    main()
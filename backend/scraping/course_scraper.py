@@ -0,0 +1,1054 @@
+"""Course catalog scraper.
+
+Pipeline: department pages are fetched concurrently over one shared HTTP
+session, course blocks are parsed out of the HTML in a process pool, and
+requisite text goes through a bounded queue of parser threads gated by a
+token-bucket rate limiter. Departments are still saved and committed one
+at a time, in index order, so a failure only rolls back that department.
+
+Run from backend/ (or import from the notebook):
+    python -m scraping.course_scraper --only COMP,MATH --mode both --output unc_courses.json
+
+Offline, against saved pages and the local grammar parser (regex fallback for
+the statements it defers):
+    python -m scraping.course_scraper --fixtures scraping/fixtures/ --parser stub --mode json --dry-run
+Record fixtures with --save-fixtures DIR on a live run.
+
+Re-scrapes: --incremental uses conditional GETs and stored fingerprints
+(change_tracker.py) to parse and save only courses that changed, and appends
+a change log to scrape_changes.jsonl. In json/both mode the changes are
+merged into the existing --output file.
+
+For a full catalog, --mode json and then load_catalog.py (COPY into staging
+tables, one transaction) is much faster than --mode database.
+"""
+import argparse
+import email.utils
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import psycopg2
+import requests
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+from psycopg2.extras import RealDictCursor
+from requests.adapters import HTTPAdapter
+
+from scraping.change_tracker import ChangeTracker, Page
+from scraping.parse_cache import ParseCache, fingerprint
+from scraping.requisite_grammar import parse_requisites as parse_locally
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://catalog.unc.edu"
+COURSE_INDEX_URL = f"{BASE_URL}/courses/#text"
+
+EMPTY_REQUISITES = {
+    "prerequisites": [],
+    "corequisites": [],
+    "grade_requirements": {},
+    "requisites_note": None
+}
+
+
+class DatabaseManager:
+    def __init__(self, db_url: str):
+        """Initialize database connection and caches."""
+        url = urlparse(db_url)
+
+        conn_params = {
+            "host": url.hostname,
+            "port": url.port,
+            "database": url.path[1:],
+            "user": url.username,
+            "password": url.password,
+            "sslmode": os.getenv("DB_SSLMODE", "require"),
+            "gssencmode": "disable"
+        }
+
+        self.conn = psycopg2.connect(**conn_params)
+        self.conn.autocommit = False
+        self.cur = self.conn.cursor(cursor_factory=RealDictCursor)
+
+        # Cache for lookups
+        self.department_cache = {}
+        self.course_id_cache = {}
+
+        # Load existing data into cache
+        self._load_cache()
+
+    def _load_cache(self):
+        """Load existing departments and courses into cache."""
+        self.cur.execute("SELECT id, code FROM departments")
+        for row in self.cur.fetchall():
+            self.department_cache[row['code']] = row['id']
+
+        self.cur.execute("SELECT id, course_id FROM courses")
+        for row in self.cur.fetchall():
+            self.course_id_cache[row['course_id']] = row['id']
+
+        logger.info(f"Loaded {len(self.department_cache)} departments and {len(self.course_id_cache)} courses into cache")
+
+    def get_or_create_department(self, dept_code: str) -> int:
+        """Get or create a department, returning its ID."""
+        if dept_code in self.department_cache:
+            return self.department_cache[dept_code]
+
+        self.cur.execute("""
+            INSERT INTO departments (code)
+            VALUES (%s)
+            ON CONFLICT (code) DO UPDATE SET code = EXCLUDED.code
+            RETURNING id
+        """, (dept_code,))
+
+        dept_id = self.cur.fetchone()['id']
+        self.department_cache[dept_code] = dept_id
+        return dept_id
+
+    def save_course(self, course_data: Dict) -> Optional[int]:
+        """Save a course to the database."""
+        try:
+            dept_id = self.get_or_create_department(course_data['department'])
+
+            # Extract repeat rules if present
+            repeatable = False
+            max_repeat_credits = None
+            max_repeat_completions = None
+
+            if course_data.get('repeat_rules'):
+                repeat_rules = course_data['repeat_rules']
+                repeatable = repeat_rules.get('repeatable', False)
+                max_repeat_credits = repeat_rules.get('max_credits')
+                max_repeat_completions = repeat_rules.get('max_completions')
+
+            # Insert or update course
+            self.cur.execute("""
+                INSERT INTO courses
+                (course_id, department_id, course_number, name, description,
+                 credits, grading_status, requisites_note, repeatable,
+                 max_repeat_credits, max_repeat_completions)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (course_id) DO UPDATE SET
+                    name = EXCLUDED.name,
+                    description = EXCLUDED.description,
+                    credits = EXCLUDED.credits,
+                    grading_status = EXCLUDED.grading_status,
+                    requisites_note = EXCLUDED.requisites_note,
+                    repeatable = EXCLUDED.repeatable,
+                    max_repeat_credits = EXCLUDED.max_repeat_credits,
+                    max_repeat_completions = EXCLUDED.max_repeat_completions,
+                    updated_at = NOW()
+                RETURNING id
+            """, (
+                course_data['course_id'],
+                dept_id,
+                course_data['course_number'],
+                course_data['course_name'],
+                course_data.get('description'),
+                course_data.get('credits'),
+                course_data.get('grading_status'),
+                course_data.get('requisites_note'),
+                repeatable,
+                max_repeat_credits,
+                max_repeat_completions
+            ))
+
+            course_db_id = self.cur.fetchone()['id']
+            self.course_id_cache[course_data['course_id']] = course_db_id
+
+            # Save prerequisites if present
+            if course_data.get('requisites'):
+                self._save_prerequisites(course_db_id, course_data['requisites'])
+
+            # Save grade requirements if present
+            if course_data.get('grade_requirements'):
+                self._save_grade_requirements(course_db_id, course_data['grade_requirements'])
+
+            # Save gen ed fulfillments to normalized table
+            if course_data.get('gen_ed'):
+                self._save_gen_ed_fulfillments(course_db_id, course_data['gen_ed'])
+
+            return course_db_id
+
+        except Exception as e:
+            logger.error(f"Error saving course {course_data.get('course_id')}: {e}")
+            raise
+
+    def _save_gen_ed_fulfillments(self, course_db_id: int, gen_ed_groups: List[List[str]]):
+        """Save gen ed fulfillments to normalized table."""
+        self.cur.execute("DELETE FROM gen_ed_fulfillments WHERE course_id = %s", (course_db_id,))
+
+        for group_idx, group in enumerate(gen_ed_groups):
+            for gen_ed_code in group:
+                if gen_ed_code:  # Skip empty codes
+                    self.cur.execute("""
+                        INSERT INTO gen_ed_fulfillments (course_id, gen_ed_code, requirement_group)
+                        VALUES (%s, %s, %s)
+                        ON CONFLICT (course_id, gen_ed_code) DO NOTHING
+                    """, (course_db_id, gen_ed_code.strip(), group_idx))
+
+    def _save_prerequisites(self, course_db_id: int, requisites: Dict):
+        """Save prerequisites for a course."""
+        self.cur.execute("DELETE FROM prerequisites WHERE course_id = %s", (course_db_id,))
+
+        # Save prerequisites (AND groups)
+        for group_idx, prereq_group in enumerate(requisites.get('prerequisites', [])):
+            for prereq_course_code in prereq_group:
+                prereq_db_id = self.course_id_cache.get(prereq_course_code.strip())
+                if prereq_db_id:
+                    self.cur.execute("""
+                        INSERT INTO prerequisites
+                        (course_id, prereq_group, prereq_course_id, is_corequisite)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT DO NOTHING
+                    """, (course_db_id, group_idx, prereq_db_id, False))
+
+        # Save corequisites
+        for group_idx, coreq_group in enumerate(requisites.get('corequisites', [])):
+            for coreq_course_code in coreq_group:
+                coreq_db_id = self.course_id_cache.get(coreq_course_code.strip())
+                if coreq_db_id:
+                    self.cur.execute("""
+                        INSERT INTO prerequisites
+                        (course_id, prereq_group, prereq_course_id, is_corequisite)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT DO NOTHING
+                    """, (course_db_id, group_idx + 1000, coreq_db_id, True))
+
+    def _save_grade_requirements(self, course_db_id: int, grade_requirements: Dict):
+        """Save grade requirements for a course."""
+        self.cur.execute("DELETE FROM grade_requirements WHERE course_id = %s", (course_db_id,))
+
+        for req_course_code, min_grade in grade_requirements.items():
+            # Try different formats
+            req_course_code = req_course_code.replace(' ', '')
+            req_db_id = None
+            for possible_code in [req_course_code, f"{req_course_code[:4]} {req_course_code[4:]}"]:
+                req_db_id = self.course_id_cache.get(possible_code)
+                if req_db_id:
+                    break
+
+            if req_db_id:
+                self.cur.execute("""
+                    INSERT INTO grade_requirements
+                    (course_id, required_course_id, minimum_grade)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT DO NOTHING
+                """, (course_db_id, req_db_id, min_grade))
+
+    def commit(self):
+        """Commit the current transaction."""
+        self.conn.commit()
+
+    def rollback(self):
+        """Rollback the current transaction."""
+        self.conn.rollback()
+
+    def close(self):
+        """Close database connection."""
+        self.cur.close()
+        self.conn.close()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` acquisitions per second, bursting up to `burst`.
+
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+def fallback_parse(raw: str) -> dict:
+    """Basic regex parser, used when the API fails and as the offline stub."""
+    # The catalog separates department and number with non-breaking spaces
+    raw = raw.replace('\xa0', ' ')
+    course_pattern = re.compile(r'\b[A-Z]{2,5}\s?\d{2,3}[A-Z]?\d?[A-Z]?\b')
+    courses = course_pattern.findall(raw)
+
+    normalized_courses = []
+    for course in courses:
+        if ' ' not in course:
+            course = re.sub(r'([A-Z]+)(\d)', r'\1 \2', course)
+        normalized_courses.append(course)
+
+    prerequisites = [[course] for course in normalized_courses]
+
+    grade_requirements = {}
+    if 'C or better' in raw or 'grade of C' in raw:
+        for course in normalized_courses:
+            grade_requirements[course.replace(' ', '')] = 'C'
+
+    note = None
+    if 'permission' in raw.lower() or 'instructor' in raw.lower():
+        note = "Permission of instructor may be required"
+
+    return {
+        "prerequisites": prerequisites,
+        "corequisites": [],
+        "grade_requirements": grade_requirements,
+        "requisites_note": note
+    }
+
+
+class RequisiteParser:
+    """Parses requisite text with Gemini.
+
+    Safe to call from several threads; pass a shared TokenBucket to keep the
+    combined request rate under the API quota. Statements the local grammar
+    parser (requisite_grammar.py) understands never reach the API; with
+    local_first=False every statement goes to the model. With a cache,
+    requisite text parsed before by the same model and prompt is answered
+    from disk without an API call.
+    """
+
+    def __init__(self, model="gemini-2.5-flash", limiter: Optional[TokenBucket] = None,
+                 cache_dir: Optional[str] = None, local_first: bool = True):
+        """Initialize the parser with Gemini API."""
+        import google.generativeai as genai
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in .env file")
+        genai.configure(api_key=api_key)
+
+        self.model = genai.GenerativeModel(model)
+        self.limiter = limiter or TokenBucket(rate=2.0)
+        self.cache = None
+        if cache_dir:
+            self.cache = ParseCache("requisites", fingerprint(model, requisite_prompt("{raw}")), cache_dir)
+        self.local_first = local_first
+        self.local_parses = 0
+        self.api_calls = 0
+        self.failed_parses = []
+        self._lock = threading.Lock()
+
+    def parse_requisites(self, raw: str, course_id: str = None) -> dict:
+        """Parse requisites using Gemini API."""
+        if not raw or not raw.strip():
+            return dict(EMPTY_REQUISITES)
+
+        if self.local_first:
+            result = parse_locally(raw)
+            if result is not None:
+                with self._lock:
+                    self.local_parses += 1
+                return result
+
+        if self.cache:
+            cached = self.cache.get(raw)
+            if cached is not None:
+                return cached
+
+        self.limiter.acquire()
+        with self._lock:
+            self.api_calls += 1
+
+        prompt = requisite_prompt(raw)
+
+        try:
+            response = self.model.generate_content(prompt)
+            json_text = response.text.strip()
+            json_text = re.sub(r'^```json\s*', '', json_text)
+            json_text = re.sub(r'\s*```$', '', json_text)
+
+            result = self._validate_result(json.loads(json_text))
+            if self.cache:
+                self.cache.set(raw, result)
+            return result
+
+        except Exception as e:
+            if course_id:
+                self.failed_parses.append((course_id, str(e)))
+            return fallback_parse(raw)
+
+    def _validate_result(self, result: dict) -> dict:
+        """Validate and clean the parsed result."""
+        validated = {
+            "prerequisites": result.get("prerequisites", []),
+            "corequisites": result.get("corequisites", []),
+            "grade_requirements": result.get("grade_requirements", {}),
+            "requisites_note": result.get("requisites_note", None)
+        }
+
+        # Ensure prerequisites and corequisites are lists of lists
+        for key in ["prerequisites", "corequisites"]:
+            if not isinstance(validated[key], list):
+                validated[key] = []
+            else:
+                cleaned_list = []
+                for item in validated[key]:
+                    if isinstance(item, list):
+                        cleaned_list.append(item)
+                    elif isinstance(item, str):
+                        cleaned_list.append([item])
+                validated[key] = cleaned_list
+
+        if not isinstance(validated["grade_requirements"], dict):
+            validated["grade_requirements"] = {}
+
+        return validated
+
+
+class StubRequisiteParser:
+    """Offline stand-in for RequisiteParser: the local grammar parser, with the
+    regex fallback (behind the rate limiter, as an API call would be) for the
+    statements it defers."""
+
+    def __init__(self, limiter: Optional[TokenBucket] = None):
+        self.limiter = limiter or TokenBucket(rate=0)
+        self.local_parses = 0
+        self.api_calls = 0
+        self.failed_parses = []
+        self._lock = threading.Lock()
+
+    def parse_requisites(self, raw: str, course_id: str = None) -> dict:
+        if not raw or not raw.strip():
+            return dict(EMPTY_REQUISITES)
+        result = parse_locally(raw)
+        if result is not None:
+            with self._lock:
+                self.local_parses += 1
+            return result
+        self.limiter.acquire()
+        return fallback_parse(raw)
+
+
+def requisite_prompt(raw: str) -> str:
+    return f"""Parse the following course requisite statement and return a JSON object with this exact structure:
+
+{{
+    "prerequisites": [
+        // List of AND-groups, where each group is a list of courses that can be taken as alternatives (OR)
+        // Example: [["COMP 110"], ["MATH 231", "MATH 241"]] means COMP 110 AND (MATH 231 OR MATH 241)
+    ],
+    "corequisites": [
+        // Same structure as prerequisites but for co-requisites
+    ],
+    "grade_requirements": {{
+        // Map of course to required grade
+        // Example: {{"COMP 110": "C", "MATH 231": "C+"}}
+    }},
+    "requisites_note": // String with any additional requirements like "permission of instructor" or null if none
+}}
+
+CRITICAL PARSING RULES:
+
+1. AND relationships (all required):
+   - Separated by "and", semicolons (;), or commas in a list
+   - Example: "COMP 110 and MATH 231" → [["COMP 110"], ["MATH 231"]]
+   - Example: "COMP 210; COMP 211; COMP 301" → [["COMP 210"], ["COMP 211"], ["COMP 301"]]
+
+2. OR relationships (choose one):
+   - Separated by "or"
+   - Example: "COMP 283 or MATH 381 or STOR 315" → [["COMP 283", "MATH 381", "STOR 315"]]
+
+3. Mixed AND/OR:
+   - Example: "MATH 231 or 241; COMP 210, COMP 211, and COMP 301"
+   - Parse as: [["MATH 231", "MATH 241"], ["COMP 210"], ["COMP 211"], ["COMP 301"]]
+   - The semicolon separates AND groups, "or" creates OR options within a group
+
+4. Pre- or corequisites:
+   - Add the SAME courses to BOTH prerequisites and corequisites arrays
+   - Example: "Pre- or corequisites, COMP 283 or MATH 381"
+   - Prerequisites: [["COMP 283", "MATH 381"]]
+   - Corequisites: [["COMP 283", "MATH 381"]]
+
+5. Grade requirements:
+   - Look for "grade of X or better", "C or better", etc.
+   - Apply to ALL courses mentioned in the same clause
+   - Example: "COMP 211 and COMP 301; a grade of C or better is required in both"
+   - grade_requirements: {{"COMP 211": "C", "COMP 301": "C"}}
+
+6. Course code format:
+   - Always format as "DEPT ###" with a space (e.g., "COMP 110", not "COMP110")
+   - Include letter suffixes if present (e.g., "BIOL 101L")
+
+7. Special requirements (put in requisites_note):
+   - "Permission of the instructor" → Include exact text
+   - "May be repeated for credit" → Include this note
+   - "Not open to students who have credit for X" → Include full restriction
+   - "for students lacking the prerequisite" → Include context
+   - Any GPA requirements → Include exact GPA needed
+   - Class standing restrictions (e.g., "Juniors and seniors only")
+
+Common patterns to recognize:
+- "Prerequisites, X and Y" → both required
+- "Prerequisite, X or Y" → choose one
+- "Prerequisites, X; Y or Z" → X is required AND (Y OR Z)
+- "one of the following" → all listed courses are OR options
+- "all of the following" → all listed courses are AND requirements
+- "permission of the instructor for students lacking the prerequisite" → courses are still required, but add note about permission option
+
+Example complex requisite:
+"Prerequisites, COMP 211 and 301, or COMP 401, 410, and 411; a grade of C or better is required in all prerequisite courses; permission of the instructor for students lacking the prerequisites; may be repeated for credit."
+
+Should parse to:
+{{
+    "prerequisites": [["COMP 211", "COMP 301"], ["COMP 401", "COMP 410", "COMP 411"]],
+    "corequisites": [],
+    "grade_requirements": {{"COMP 211": "C", "COMP 301": "C", "COMP 401": "C", "COMP 410": "C", "COMP 411": "C"}},
+    "requisites_note": "permission of the instructor for students lacking the prerequisites; may be repeated for credit"
+}}
+
+Requisite statement to parse:
+{raw}
+
+Return ONLY the JSON object, no explanation or markdown."""
+
+
+# Fetching
+class HttpFetcher:
+    """Fetches catalog pages over one pooled session, optionally saving them as fixtures."""
+
+    def __init__(self, pool_size: int = 8, timeout: float = 30, save_dir: Optional[str] = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=3)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = timeout
+        self.save_dir = save_dir
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+
+    def get(self, url: str) -> str:
+        return self.get_page(url).text
+
+    def get_page(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Page:
+        """Conditional GET: Page.text is None if the page hasn't changed since etag/last_modified."""
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = self.session.get(url, timeout=self.timeout, headers=headers)
+        if response.status_code == 304:
+            return Page(None, etag, last_modified)
+        response.raise_for_status()
+        if self.save_dir:
+            with open(os.path.join(self.save_dir, fixture_name(url)), "w", encoding="utf-8") as f:
+                f.write(response.text)
+        return Page(response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+class FixtureFetcher:
+    """Serves pages saved by HttpFetcher(save_dir=...) for offline runs."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def get(self, url: str) -> str:
+        with open(os.path.join(self.directory, fixture_name(url)), encoding="utf-8") as f:
+            return f.read()
+
+    def get_page(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Page:
+        """Like HttpFetcher.get_page, with the file's mtime standing in for Last-Modified."""
+        path = os.path.join(self.directory, fixture_name(url))
+        modified = email.utils.formatdate(os.path.getmtime(path), usegmt=True)
+        if last_modified == modified:
+            return Page(None, etag, last_modified)
+        return Page(self.get(url), None, modified)
+
+
+def fixture_name(url: str) -> str:
+    """File name for a saved page: 'index.html' or '<dept>.html'."""
+    parts = [p for p in urlparse(url).path.split("/") if p]
+    return f"{parts[-1].lower()}.html" if len(parts) > 1 else "index.html"
+
+
+# Parsing
+def get_department_links(fetcher, only=None) -> List[Tuple[str, str]]:
+    """Scrape all department links from the main courses page."""
+    soup = BeautifulSoup(fetcher.get(COURSE_INDEX_URL), "html.parser")
+    index_div = soup.find("div", {"id": "atozindex"})
+    links = []
+
+    for a in index_div.find_all("a", href=True):
+        dept_code = a['href'].split("/")[-2].upper()
+        if only is None or dept_code in only:
+            links.append((dept_code, urljoin(BASE_URL, a['href'])))
+
+    return links
+
+
+def parse_course_block(block) -> Tuple[Dict, Optional[str]]:
+    """Parse a course block from the HTML.
+
+    Returns the course data and its raw requisite text, which is parsed
+    separately so the slow API calls can run concurrently.
+    """
+    data = {
+        "department": None,
+        "course_number": None,
+        "course_name": None,
+        "credits": None,
+        "description": None,
+        "requisites": {"prerequisites": [], "corequisites": []},
+        "grade_requirements": {},
+        "requisites_note": None,
+        "gen_ed": None,
+        "grading_status": None,
+        "repeat_rules": None
+    }
+
+    # Header line
+    header = block.find("div", class_="cols noindent")
+    if header:
+        strong_tags = header.find_all("strong")
+        if len(strong_tags) >= 3:
+            code = strong_tags[0].text.strip()
+            if " " in code:
+                data["department"], data["course_number"] = code.split(" ", 1)
+                data["course_number"] = data["course_number"].rstrip(".")
+            data["course_id"] = f"{data['department']} {data['course_number']}"
+            data["course_name"] = strong_tags[1].text.strip()
+            data["credits"] = strong_tags[2].text.strip().replace(" Credits.", "")
+
+    # Description
+    desc_block = block.find("p", class_="courseblockextra")
+    if desc_block:
+        data["description"] = desc_block.text.strip()
+
+    # Requisites, parsed later
+    req_span = block.find("span", class_="text detail-requisites margin--default")
+    raw_requisites = req_span.text if req_span else None
+
+    # Gen Ed - parse structured format
+    idea_span = block.find("span", class_="text detail-idea_action margin--default")
+    if idea_span:
+        gen_ed_text = idea_span.text.strip().replace("IDEAs in Action Gen Ed:", "").strip()
+        data["gen_ed"] = parse_gen_ed_requirements(gen_ed_text)
+
+    # Grading
+    grading_span = block.find("span", class_="text detail-grading_status margin--default")
+    if grading_span:
+        data["grading_status"] = grading_span.text.strip().replace("Grading Status: ", "").replace(".", "")
+
+    # Repeat Rules - parse repeat information
+    repeat_span = block.find("span", class_="text detail-repeat_rules margin--default")
+    if repeat_span:
+        data["repeat_rules"] = parse_repeat_rules(repeat_span.text.strip())
+
+    return data, raw_requisites
+
+
+def apply_requisites(data: Dict, req_data: Dict):
+    """Merge parsed requisites into course data."""
+    data["requisites"] = {
+        "prerequisites": req_data["prerequisites"],
+        "corequisites": req_data["corequisites"]
+    }
+    data["grade_requirements"] = req_data["grade_requirements"]
+    data["requisites_note"] = req_data["requisites_note"]
+
+
+def parse_department_html(html: str) -> List[Tuple[Dict, Optional[str]]]:
+    """Parse every course block on a department page (runs in a worker process)."""
+    soup = BeautifulSoup(html, "html.parser")
+    return [parse_course_block(cb) for cb in soup.find_all("div", class_="courseblock")]
+
+
+def parse_repeat_rules(repeat_text: str) -> Dict[str, any]:
+    """
+    Parse repeat rules text into structured format.
+
+    Example inputs:
+    - "Repeat Rules: May be repeated for credit. 9 total credits. 3 total completions."
+    - "Repeat Rules: May be repeated for credit."
+
+    Returns dict with:
+    - repeatable: bool
+    - max_credits: int or None
+    - max_completions: int or None
+    """
+    if not repeat_text:
+        return None
+
+    # Remove "Repeat Rules:" prefix if present
+    repeat_text = repeat_text.replace("Repeat Rules:", "").strip()
+
+    result = {
+        "repeatable": False,
+        "max_credits": None,
+        "max_completions": None,
+        "raw_text": repeat_text
+    }
+
+    # Check if repeatable
+    if "may be repeated" in repeat_text.lower():
+        result["repeatable"] = True
+
+        # Extract max credits
+        credits_match = re.search(r'(\d+)\s*total\s*credits?', repeat_text, re.IGNORECASE)
+        if credits_match:
+            result["max_credits"] = int(credits_match.group(1))
+
+        # Extract max completions
+        completions_match = re.search(r'(\d+)\s*total\s*completions?', repeat_text, re.IGNORECASE)
+        if completions_match:
+            result["max_completions"] = int(completions_match.group(1))
+
+    return result
+
+
+def parse_gen_ed_requirements(gen_ed_text: str):
+    """
+    Parse gen ed requirements with AND/OR logic.
+
+    Examples:
+    - "FY-SEMINAR, FC-PAST or FC-POWER." -> [["FY-SEMINAR"], ["FC-PAST", "FC-POWER"]]
+    - "FY-SEMINAR." -> [["FY-SEMINAR"]]
+    - "FC-PAST or FC-POWER." -> [["FC-PAST", "FC-POWER"]]
+
+    Returns a list of lists where:
+    - Outer list items are AND'ed (all required)
+    - Inner list items are OR'ed (choose one)
+    """
+    if not gen_ed_text:
+        return []
+
+    gen_ed_text = gen_ed_text.replace("(only designated sections)", "")
+    # Split by commas for AND groups
+    and_groups = [group.strip() for group in gen_ed_text.split(',')]
+
+    result = []
+    for group in and_groups:
+        # Remove any periods
+        group = group.replace('.', '')
+
+        # Check if this group has OR options
+        if re.search(r'\bor\b', group, flags=re.IGNORECASE):
+            # Split by 'or' for OR options
+            or_options = [
+                opt.strip().replace('.', '')
+                for opt in re.split(r'\s+or\s+', group, flags=re.IGNORECASE)
+            ]
+            result.append(or_options)
+        else:
+            result.append([group])
+
+    return result
+
+
+# Pipeline
+class _InlineExecutor(Executor):
+    """Runs submitted work immediately; used for parse_workers=0."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def save_department(db_manager: DatabaseManager, dept_code: str, courses: List[Dict]) -> int:
+    """Save one department's courses in a single transaction."""
+    saved = 0
+    try:
+        for course_data in courses:
+            try:
+                db_manager.save_course(course_data)
+                saved += 1
+            except Exception as e:
+                logger.error(f"Failed to save {course_data.get('course_id')}: {e}")
+                raise
+        db_manager.commit()
+    except Exception as e:
+        logger.error(f"Rolled back {dept_code}: {e}")
+        db_manager.rollback()
+        return 0
+    return saved
+
+
+def scrape_all_courses(parser, db_manager: Optional[DatabaseManager] = None, only=None,
+                       mode='database', dry_run=False, fetcher=None, fetch_workers: int = 8,
+                       parse_workers: Optional[int] = None, requisite_workers: int = 4,
+                       queue_size: Optional[int] = None,
+                       tracker: Optional[ChangeTracker] = None) -> Dict[str, List[Dict]]:
+    """
+    Scrape all courses with flexible output options.
+
+    Args:
+        parser: RequisiteParser (or StubRequisiteParser) instance
+        db_manager: DatabaseManager instance (required for database mode)
+        only: Set of department codes to scrape (None for all)
+        mode: 'database', 'json', or 'both'
+        dry_run: If True, don't actually save anything
+        fetcher: HttpFetcher or FixtureFetcher (default: a new HttpFetcher)
+        fetch_workers: Concurrent page downloads
+        parse_workers: Processes for HTML parsing (None: CPU count, 0: inline)
+        requisite_workers: Concurrent requisite parser calls
+        queue_size: Requisite jobs in flight at once (default: 2 per worker)
+        tracker: ChangeTracker for incremental scrapes; only changed courses are
+            parsed, saved and returned. In json/both mode, departments are
+            committed to it by tracker.commit_written() after the output is written
+    """
+    fetcher = fetcher or HttpFetcher(pool_size=fetch_workers)
+    department_links = get_department_links(fetcher, only=only)
+    order = [dept_code for dept_code, _ in department_links]
+    queue_size = queue_size or requisite_workers * 2
+    save = db_manager is not None and not dry_run and mode in ['database', 'both']
+
+    logger.info(f"Starting scrape of {len(department_links)} departments (mode={mode}, dry_run={dry_run})")
+    overall_start_time = time.time()
+
+    all_courses: Dict[str, List[Dict]] = {}
+    finished: Dict[str, Optional[List[Dict]]] = {}
+    parsed: Dict[str, List[Dict]] = {}
+    outstanding: Dict[str, int] = {}
+    backlog = deque()  # (dept_code, course_data, raw_requisites) waiting for a parser slot
+    pending: Dict[Future, tuple] = {}
+    in_flight = 0
+    next_to_save = 0
+
+    parse_pool = _InlineExecutor() if parse_workers == 0 else ProcessPoolExecutor(parse_workers)
+    with ThreadPoolExecutor(fetch_workers) as fetch_pool, \
+            ThreadPoolExecutor(requisite_workers) as requisite_pool, parse_pool:
+
+        def fill_requisite_queue():
+            nonlocal in_flight
+            while backlog and in_flight < queue_size:
+                dept_code, course_data, raw = backlog.popleft()
+                future = requisite_pool.submit(parser.parse_requisites, raw, course_data.get("course_id"))
+                pending[future] = ('requisites', dept_code, course_data, raw)
+                in_flight += 1
+
+        def flush():
+            # Save finished departments in index order, same as a sequential run
+            nonlocal next_to_save
+            while next_to_save < len(order) and order[next_to_save] in finished:
+                dept_code = order[next_to_save]
+                courses = finished.pop(dept_code)
+                next_to_save += 1
+                if courses is None:
+                    continue
+                saved = save_department(db_manager, dept_code, courses) if save else 0
+                if tracker and (not save or saved == len(courses)):
+                    if mode == 'database':
+                        tracker.commit_department(dept_code)
+                    else:
+                        tracker.defer_department(dept_code)
+                if mode in ['json', 'both']:
+                    all_courses[dept_code] = courses
+                logger.info(f"Completed {len(courses)} courses in {dept_code} (saved {saved} to database)")
+
+        for dept_code, url in department_links:
+            validators = tracker.validators(dept_code) if tracker else {}
+            pending[fetch_pool.submit(fetcher.get_page, url, **validators)] = ('fetch', dept_code)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, dept_code, *rest = pending.pop(future)
+                if stage == 'requisites':
+                    in_flight -= 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if stage == 'requisites':
+                        # Parsers handle API errors themselves; anything else gets the regex fallback
+                        logger.warning(f"Requisite parser failed for {rest[0].get('course_id')}: {e}")
+                        result = fallback_parse(rest[1])
+                    else:
+                        logger.error(f"Error scraping {dept_code} ({stage}): {e}")
+                        finished[dept_code] = None
+                        continue
+
+                if stage == 'fetch':
+                    if tracker and not tracker.page_changed(dept_code, result):
+                        finished[dept_code] = None
+                        continue
+                    pending[parse_pool.submit(parse_department_html, result.text)] = ('parse', dept_code)
+                elif stage == 'parse':
+                    if tracker:
+                        result = tracker.diff_department(dept_code, result)
+                    parsed[dept_code] = [data for data, _ in result]
+                    outstanding[dept_code] = 0
+                    for data, raw in result:
+                        if raw and raw.strip():
+                            backlog.append((dept_code, data, raw))
+                            outstanding[dept_code] += 1
+                    logger.info(f"Parsed {dept_code}: {len(result)} courses, {outstanding[dept_code]} with requisites")
+                else:
+                    apply_requisites(rest[0], result)
+                    outstanding[dept_code] -= 1
+
+                if stage != 'fetch' and outstanding.get(dept_code) == 0 and dept_code in parsed:
+                    finished[dept_code] = parsed.pop(dept_code)
+
+            fill_requisite_queue()
+            flush()
+
+    if tracker and only is None:
+        tracker.finish(order)
+
+    overall_elapsed = time.time() - overall_start_time
+    logger.info(f"Total scraping time: {overall_elapsed/60:.1f} minutes")
+
+    return all_courses
+
+
+def save_to_json(data, filename="unc_courses.json"):
+    """Save course data to JSON file."""
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    logger.info(f"Saved to {filename}")
+
+
+def merge_into_json(changes: Dict[str, List[Dict]], removed: List[Tuple[str, str]], filename="unc_courses.json"):
+    """Apply an incremental scrape to a JSON file holding the full catalog.
+
+    Changed courses replace their previous entry (new ones are appended to
+    their department) and removed courses are dropped; departments this
+    run skipped as unchanged are left as they are.
+    """
+    catalog: Dict[str, List[Dict]] = {}
+    if os.path.exists(filename):
+        with open(filename, encoding="utf-8") as f:
+            catalog = json.load(f)
+
+    for dept_code, courses in changes.items():
+        existing = catalog.setdefault(dept_code, [])
+        index = {course.get("course_id"): i for i, course in enumerate(existing)}
+        for course in courses:
+            i = index.get(course.get("course_id"))
+            if i is None:
+                existing.append(course)
+            else:
+                existing[i] = course
+    gone = set(removed)
+    for dept_code in {dept_code for dept_code, _ in removed}:
+        if dept_code in catalog:
+            catalog[dept_code] = [c for c in catalog[dept_code] if (dept_code, c.get("course_id")) not in gone]
+            if not catalog[dept_code]:
+                del catalog[dept_code]
+    save_to_json(catalog, filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the UNC course catalog")
+    parser.add_argument("--only", help="comma-separated department codes (default: all)")
+    parser.add_argument("--mode", choices=["database", "json", "both"], default="database")
+    parser.add_argument("--output", default="unc_courses.json", help="JSON output file for json/both modes")
+    parser.add_argument("--dry-run", action="store_true", help="scrape and parse without writing to the database")
+    parser.add_argument("--parser", choices=["gemini", "stub"], default="gemini")
+    parser.add_argument("--model", default="gemini-2.5-flash")
+    parser.add_argument("--cache-dir", default=".parse_cache", help="parse result cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="call the parser for every course")
+    parser.add_argument("--no-local", action="store_true",
+                        help="send every requisite statement to the model, skipping the grammar parser")
+    parser.add_argument("--rate", type=float, default=2.0, help="requisite parser calls per second (0: unlimited)")
+    parser.add_argument("--burst", type=int, default=4)
+    parser.add_argument("--fetch-workers", type=int, default=8)
+    parser.add_argument("--parse-workers", type=int, default=None, help="HTML parsing processes (0: inline)")
+    parser.add_argument("--requisite-workers", type=int, default=4)
+    parser.add_argument("--fixtures", help="read pages from this directory instead of the network")
+    parser.add_argument("--save-fixtures", help="also save fetched pages to this directory")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip unchanged departments and courses, using the scrape state file")
+    parser.add_argument("--full", action="store_true", help="scrape everything but still record state and changes")
+    parser.add_argument("--state", default=".scrape_state.json", help="scrape state file for --incremental/--full")
+    parser.add_argument("--change-log", default="scrape_changes.jsonl",
+                        help="append each run's changes here (with --incremental/--full)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    limiter = TokenBucket(args.rate, args.burst)
+    if args.parser == "stub":
+        requisite_parser = StubRequisiteParser(limiter)
+    else:
+        requisite_parser = RequisiteParser(model=args.model, limiter=limiter,
+                                           cache_dir=None if args.no_cache else args.cache_dir,
+                                           local_first=not args.no_local)
+
+    if args.fixtures:
+        fetcher = FixtureFetcher(args.fixtures)
+    else:
+        fetcher = HttpFetcher(pool_size=args.fetch_workers, save_dir=args.save_fixtures)
+
+    tracker = ChangeTracker(args.state, full=args.full) if args.incremental or args.full else None
+    if tracker and tracker.departments and not args.full and args.mode in ["json", "both"] \
+            and not os.path.exists(args.output):
+        logger.warning(f"{args.output} does not exist; it will only hold changed courses (run --full to rebuild it)")
+
+    db_manager = None
+    if args.mode in ["database", "both"] and not args.dry_run:
+        database_url = os.getenv("DATABASE_URL")
+        if not database_url:
+            raise ValueError("DATABASE_URL not found in .env file")
+        db_manager = DatabaseManager(database_url)
+
+    try:
+        only = {d.strip().upper() for d in args.only.split(",")} if args.only else None
+        courses = scrape_all_courses(
+            requisite_parser,
+            db_manager,
+            only=only,
+            mode=args.mode,
+            dry_run=args.dry_run,
+            fetcher=fetcher,
+            fetch_workers=args.fetch_workers,
+            parse_workers=args.parse_workers,
+            requisite_workers=args.requisite_workers,
+            tracker=tracker,
+        )
+    finally:
+        if db_manager:
+            db_manager.close()
+
+    if args.mode in ["json", "both"]:
+        if tracker:
+            # Only changed courses were scraped; fold them into the existing catalog file
+            merge_into_json(courses, tracker.removed_courses(), args.output)
+            tracker.commit_written()
+        elif courses:
+            save_to_json(courses, args.output)
+
+    if tracker:
+        logger.info(f"Changes: {tracker.summary()}")
+        if not args.dry_run:
+            tracker.save()
+            tracker.append_change_log(args.change_log)
+
+    logger.info(f"Parsed locally: {requisite_parser.local_parses}, total API calls: {requisite_parser.api_calls}, "
+                f"failed parses: {len(requisite_parser.failed_parses)}")
+    if getattr(requisite_parser, "cache", None):
+        logger.info(f"Parse cache: {requisite_parser.cache.stats()}")
+    for course_id, error in requisite_parser.failed_parses[:5]:
+        logger.warning(f"Failed to parse requisites for {course_id}: {error[:50]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,16 @@ import json
 
 load_dotenv()
 
+# Course columns for list and search results; leaves out embedding (a ~4 KB vector
+# literal once embed_courses.py has run) and search_vector
+COURSE_COLUMNS = """c.id, c.course_id, c.department_id, c.course_number, c.name, c.description, c.credits,
+    c.grading_status, c.requisites_note, c.repeatable, c.max_repeat_credits, c.max_repeat_completions,
+    c.created_at, c.updated_at"""
+
 class CourseDatabase:
     def __init__(self, db_url: str = None):
         """Initialize database connection."""
-        self.db_url = os.getenv('DATABASE_URL')
+        self.db_url = db_url or os.getenv('DATABASE_URL')
 
         if not self.db_url:
             raise ValueError("Database URL must be provided via db_url param or DATABASE_URL env var")
@@ -24,7 +30,7 @@ class CourseDatabase:
             "database": url.path[1:],
             "user": url.username,
             "password": url.password,
-            "sslmode": "require",
+            "sslmode": os.getenv('DB_SSLMODE', 'require'),
             "gssencmode": "disable"
         }
         
@@ -41,8 +47,8 @@ class CourseDatabase:
     # Course queries
     def get_course(self, course_id: str) -> Optional[Dict]:
         """Get a single course by ID (e.g., 'COMP 110')."""
-        self.cur.execute("""
-            SELECT c.*, d.code as department_code
+        self.cur.execute(f"""
+            SELECT {COURSE_COLUMNS}, d.code as department_code
             FROM courses c
             JOIN departments d ON c.department_id = d.id
             WHERE c.course_id = %s
@@ -51,8 +57,8 @@ class CourseDatabase:
     
     def search_courses(self, query: str, limit: int = 20) -> List[Dict]:
         """Full-text search for courses."""
-        self.cur.execute("""
-            SELECT c.*, d.code as department_code,
+        self.cur.execute(f"""
+            SELECT {COURSE_COLUMNS}, d.code as department_code,
                    ts_rank(c.search_vector, plainto_tsquery('english', %s)) AS rank
             FROM courses c
             JOIN departments d ON c.department_id = d.id
@@ -64,8 +70,8 @@ class CourseDatabase:
     
     def get_department_courses(self, dept_code: str) -> List[Dict]:
         """Get all courses for a department."""
-        self.cur.execute("""
-            SELECT c.*, d.code as department_code
+        self.cur.execute(f"""
+            SELECT {COURSE_COLUMNS}, d.code as department_code
             FROM courses c
             JOIN departments d ON c.department_id = d.id
             WHERE d.code = %s
@@ -137,6 +143,25 @@ class CourseDatabase:
         
         result = self.cur.fetchone()
         return {'prerequisites_met': result['check_prerequisites_met']}
+
+    def check_prerequisites_batch(self, student_ids: List[str], course_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Check prerequisites for every (student, course) pair in one query.
+
+        course_ids None checks the whole catalog. Minimum grades from
+        grade_requirements are honored (migration 005).
+        """
+        self.cur.execute("""
+            SELECT e.student_id::text as student_id, c.course_id,
+                   e.prerequisites_met, e.missing_groups
+            FROM prerequisite_eligibility(
+                %s::uuid[],
+                CASE WHEN %s::text[] IS NULL THEN NULL
+                     ELSE ARRAY(SELECT id FROM courses WHERE course_id = ANY(%s::text[])) END
+            ) e
+            JOIN courses c ON c.id = e.course_id
+            ORDER BY e.student_id, c.course_id
+        """, (list(student_ids), course_ids, course_ids))
+        return self.cur.fetchall()
     
     # Program queries
     def get_program(self, program_id: str) -> Optional[Dict]:
@@ -283,7 +308,7 @@ class CourseDatabase:
                 SELECT 
                     c.id,
                     c.course_id,
-                    ARRAY[c.course_id] as path,
+                    ARRAY[c.course_id::text] as path,
                     0 as depth
                 FROM courses c
                 WHERE c.course_id = %s
@@ -294,7 +319,7 @@ class CourseDatabase:
                 SELECT 
                     c.id,
                     c.course_id,
-                    cp.path || c.course_id,
+                    cp.path || c.course_id::text,
                     cp.depth + 1
                 FROM course_paths cp
                 JOIN prerequisites p ON cp.id = p.prereq_course_id
@@ -0,0 +1,95 @@
+"""Compute course embeddings for semantic search.
+
+Embeds every course whose embedding is NULL, committing after each batch,
+so an interrupted run picks up where it stopped. Editing a course's name or
+description clears its embedding (see migration 003), so rerunning after a
+scrape only embeds what changed.
+
+Run from backend/:
+    python -m scraping.embed_courses [--all] [--batch-size 64] [--reindex]
+"""
+import argparse
+import logging
+import math
+import time
+
+import psycopg
+from psycopg.rows import dict_row
+
+from app import config
+from app.database import connection_params
+from app.services.embeddings import course_text, encode, load_model, to_vector
+
+logger = logging.getLogger(__name__)
+
+
+def embed_pending(conn: psycopg.Connection, batch_size: int) -> int:
+    """Embed courses without an embedding, one committed batch at a time."""
+    total = conn.execute("SELECT COUNT(*) AS n FROM courses WHERE embedding IS NULL").fetchone()["n"]
+    logger.info(f"{total} courses need embeddings")
+    done = 0
+    last_id = 0
+    start = time.monotonic()
+    while True:
+        # Keyset by id so each batch is an index range scan, not a rescan
+        rows = conn.execute("""
+            SELECT id, course_id, name, description
+            FROM courses
+            WHERE embedding IS NULL AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        vectors = encode([course_text(r) for r in rows], batch_size=batch_size)
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.executemany(
+                    "UPDATE courses SET embedding = %s::vector WHERE id = %s",
+                    [(to_vector(v), r["id"]) for r, v in zip(rows, vectors)]
+                )
+        done += len(rows)
+        last_id = rows[-1]["id"]
+        rate = done / (time.monotonic() - start)
+        logger.info(f"Embedded {done}/{total} courses ({rate:.0f}/s)")
+    return done
+
+
+def rebuild_index(conn: psycopg.Connection, lists: int = None):
+    """Recreate the ivfflat index now that the column is populated.
+
+    ivfflat picks its cluster centroids at build time, so an index built on
+    an empty or partial column has poor recall until rebuilt.
+    """
+    if lists is None:
+        count = conn.execute("SELECT COUNT(*) AS n FROM courses WHERE embedding IS NOT NULL").fetchone()["n"]
+        # pgvector's guidance: rows / 1000 lists up to 1M rows
+        lists = max(1, count // 1000) if count < 1_000_000 else int(math.sqrt(count))
+    start = time.monotonic()
+    with conn.transaction():
+        conn.execute("DROP INDEX IF EXISTS idx_course_embedding")
+        conn.execute(f"CREATE INDEX idx_course_embedding ON courses "
+                     f"USING ivfflat (embedding vector_cosine_ops) WITH (lists = {int(lists)})")
+    logger.info(f"Rebuilt idx_course_embedding with lists={lists} in {time.monotonic() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute course embeddings for semantic search")
+    parser.add_argument("--all", action="store_true", help="clear and recompute every embedding")
+    parser.add_argument("--batch-size", type=int, default=config.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--reindex", action="store_true", help="rebuild the ivfflat index afterwards")
+    parser.add_argument("--lists", type=int, help="ivfflat lists for --reindex (default: rows / 1000)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_model()
+    with psycopg.connect(**connection_params(config.DATABASE_URL), autocommit=True, row_factory=dict_row) as conn:
+        if args.all:
+            conn.execute("UPDATE courses SET embedding = NULL")
+        embed_pending(conn, args.batch_size)
+        if args.reindex:
+            rebuild_index(conn, args.lists)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Content-addressed on-disk cache for LLM parse results.
+
+Entries are keyed by a hash of the normalized input text, stored under a
+version directory derived from the model and prompt template. Editing a
+prompt therefore starts a fresh cache automatically, and `prune` removes
+the entries left behind by old versions. The cache is bounded by total
+bytes, evicting least recently used entries (by file mtime, which hits
+refresh).
+
+Inspect or clean up from backend/:
+    python -m scraping.parse_cache stats|prune|clear [--dir .parse_cache]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unicodedata
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = os.getenv("PARSE_CACHE_DIR", ".parse_cache")
+DEFAULT_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+
+def normalize(text: str) -> str:
+    """Canonical form of parser input: NFKC (folds non-breaking spaces) with collapsed whitespace."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def fingerprint(*parts: str) -> str:
+    """Short stable hash of the given strings, used as a cache version."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class ParseCache:
+    """Persistent map from (namespace, version, input text) to parsed JSON.
+
+    Thread-safe within a process; concurrent processes may share a directory
+    since writes are atomic renames.
+    """
+
+    def __init__(self, namespace: str, version: str, directory: str = DEFAULT_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = os.path.join(directory, namespace)
+        self.path = os.path.join(self.root, version)
+        self.namespace = namespace
+        self.version = version
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+        os.utime(self.path)  # newest version directory is the current one for the CLI
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._bytes = self._scan_size()
+
+    def _scan_size(self) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def get(self, text: str) -> Optional[Dict]:
+        """Cached result for this input, or None."""
+        path = self._file(self.key(text))
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, text: str, value: Dict):
+        """Store a successful parse result for this input."""
+        path = self._file(self.key(text))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        os.replace(tmp, path)
+        with self._lock:
+            self.writes += 1
+            self._bytes += len(data) - previous
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries (any version) down to 90% of max_bytes."""
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._bytes = total
+            self.evictions += evicted
+        logger.info(f"Parse cache {self.namespace}: evicted {evicted} entries")
+
+    def prune(self) -> int:
+        """Remove entries from every version but the current one."""
+        removed = 0
+        for name in os.listdir(self.root):
+            if name != self.version:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                removed += 1
+        self._bytes = self._scan_size()
+        return removed
+
+    def clear(self):
+        """Remove every entry in this namespace."""
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+        self._bytes = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clean the LLM parse cache")
+    parser.add_argument("command", choices=["stats", "prune", "clear"])
+    parser.add_argument("--dir", default=DEFAULT_DIR)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dir):
+        print(f"No cache at {args.dir}")
+        return
+    for namespace in sorted(os.listdir(args.dir)):
+        root = os.path.join(args.dir, namespace)
+        versions = sorted(os.listdir(root), key=lambda v: os.path.getmtime(os.path.join(root, v)))
+        if not versions:
+            continue
+        if args.command == "clear":
+            shutil.rmtree(root)
+            print(f"{namespace}: cleared")
+            continue
+        # The most recently written version is treated as current
+        cache = ParseCache(namespace, versions[-1], args.dir)
+        if args.command == "prune":
+            print(f"{namespace}: removed {cache.prune()} old versions, kept {cache.version}")
+        else:
+            entries = sum(len(files) for _, _, files in os.walk(cache.path))
+            print(f"{namespace}: {len(versions)} versions, current {cache.version} "
+                  f"with {entries} entries, {cache.stats()['bytes'] / 1024:.0f} KiB total")
+
+
+if __name__ == "__main__":
+    main()
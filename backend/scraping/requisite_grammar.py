@@ -0,0 +1,357 @@
+"""Deterministic parser for catalog requisite statements.
+
+Handles the fixed phrasings most catalog entries use, e.g.
+
+    Prerequisites, COMP 210, 211, and 301; or COMP 401, 410, and 411;
+    a grade of C or better is required in all prerequisite courses.
+
+and returns the same structure the LLM parser does: prerequisites and
+corequisites as AND-lists of OR-groups, grade_requirements and a
+requisites_note. Department-less numbers ("MATH 130, 152") take the most
+recent department. "X or Y" binds tighter than "and" inside a phrase,
+"; or" joins whole clauses, and alternatives of several courses are
+distributed into groups, e.g. "A and B, or C" becomes [[A, C], [B, C]].
+
+Anything ambiguous or outside the grammar ("at least two chosen from",
+"one 200-level BIOL course", lists whose conjunctions don't line up) makes
+parse_requisites return None so the caller can hand the text to the LLM.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Alternatives are distributed into CNF; beyond this many groups the result is too
+# far from how the statement reads, so it goes to the LLM instead
+MAX_GROUPS = 16
+
+COURSE_RE = re.compile(r"\b([A-Z]{2,5}) ?(\d{2,3}[A-Z]{0,2})\b")
+HEADER_RE = re.compile(r"^(pre- or co-?requisites?|pre-?requisites?|co-?requisites?)\s*,\s*(.*)$", re.IGNORECASE)
+GRADE_RE = re.compile(
+    r"^(?:with )?(?:a )?(?:grade of )?(?P<grade>[A-D][+-]?) or (?:better|higher)"
+    r"(?: is required)?(?: in (?P<scope>.+?))?(?: is)?(?: required)?$",
+    re.IGNORECASE,
+)
+INLINE_GRADE_RE = re.compile(r"\b([A-Z]{2,5} \d{2,3}[A-Z]{0,2}) with (?:a )?(?:grade of )?([A-D][+-]?) or better\b")
+ALL_PREREQS_RE = re.compile(r"^(?:both|all) (?:the )?(?:pre-?requisites?|prerequisite courses?)$", re.IGNORECASE)
+ONE_OF_RE = re.compile(r"^one of the following(?: courses)?:?\s*", re.IGNORECASE)
+PERMISSION_RE = re.compile(r",?\s*\b(?:and |or )?(permission of (?:the )?(?:instructor|course director)\b.*)$",
+                           re.IGNORECASE)
+NOTE_RE = re.compile(r"^not open to\b", re.IGNORECASE)
+RECOMMENDED_RE = re.compile(r"(?:^|,\s*)([^,]+ recommended)$", re.IGNORECASE)
+
+TOKEN_RE = re.compile(r"\s*(?:([A-Z]{2,5}) ?(\d{2,3}[A-Z]{0,2})\b|(\d{2,3}[A-Z]{0,2})\b|([(),/])|([A-Za-z-]+))")
+CONJUNCTIONS = {"and": "and", "or": "or"}
+FILLER = {"either", "both"}
+
+
+class Unparseable(ValueError):
+    """The statement is outside the grammar or ambiguous."""
+
+
+def normalize_text(raw: str) -> str:
+    # The catalog separates department and number with non-breaking spaces
+    text = re.sub(r"\s+", " ", raw.replace("\xa0", " ")).strip()
+    text = re.sub(r"^(?:Requisites:\s*)+", "", text)
+    return text.rstrip(". ")
+
+
+class _Clause:
+    """Tokenizes and parses one comma/and/or phrase into an expression tree.
+
+    Expressions are ("course", code), ("and", [expr, ...]) or ("or", [expr, ...]).
+    """
+
+    def __init__(self, text: str, department: Optional[str]):
+        self.department = department
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+
+    def _tokenize(self, text: str) -> List[Tuple[str, str, bool]]:
+        tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            match = TOKEN_RE.match(text, pos)
+            if not match or match.end() == pos:
+                raise Unparseable(f"unexpected text at {text[pos:pos + 20]!r}")
+            pos = match.end()
+            dept, number, bare, punct, word = match.groups()
+            if dept:
+                self.department = dept
+                tokens.append(("course", f"{dept} {number}", True))
+            elif bare:
+                if not self.department:
+                    raise Unparseable(f"course number {bare} without a department")
+                tokens.append(("course", f"{self.department} {bare}", False))
+            elif punct:
+                tokens.append((punct, punct, False))
+            elif word.lower() in CONJUNCTIONS:
+                tokens.append((CONJUNCTIONS[word.lower()], word, False))
+            elif word.lower() not in FILLER:
+                raise Unparseable(f"unknown word {word!r}")
+        return tokens
+
+    def parse(self, one_of: bool = False):
+        items = self._items()
+        if one_of:
+            if any(token[0] == "and" for _, item in items for token in item):
+                raise Unparseable("'one of' list containing 'and'")
+            return ("or", [self._item(item) for _, item in items])
+        if len(items) == 1:
+            return self._item(items[0][1])
+        return self._list(items)
+
+    def _items(self) -> List[Tuple[Optional[str], List]]:
+        """Split on top-level commas into (leading conjunction, tokens) items."""
+        items, current, depth = [], [], 0
+        for token in self.tokens:
+            if token[0] == "(":
+                depth += 1
+            elif token[0] == ")":
+                depth -= 1
+                if depth < 0:
+                    raise Unparseable("unbalanced parentheses")
+            if token[0] == "," and depth == 0:
+                items.append(current)
+                current = []
+            else:
+                current.append(token)
+        if depth:
+            raise Unparseable("unbalanced parentheses")
+        items.append(current)
+
+        result = []
+        for item in items:
+            marker = None
+            if item and item[0][0] in ("and", "or"):
+                marker = item[0][0]
+                item = item[1:]
+            if not item:
+                raise Unparseable("empty list item")
+            result.append((marker, item))
+        return result
+
+    def _list(self, items):
+        """Combine comma-separated items by their conjunctions.
+
+        "A, B, and C" and "A, and B, and C" are homogeneous lists. A conjunction
+        other than the final one splits the list: "A and B, or C, D, and E" is
+        (A and B) or (C and D and E).
+        """
+        if items[-1][0] is None:
+            # "A, B and C": the conjunction sits inside the last item
+            tokens = items[-1][1]
+            split = next((j for j, token in enumerate(tokens) if token[0] in ("and", "or")), None)
+            if split and "(" not in [token[0] for token in tokens[:split]]:
+                items = items[:-1] + [(None, tokens[:split]), (tokens[split][0], tokens[split + 1:])]
+        markers = [marker for marker, _ in items]
+        final = markers[-1]
+        if markers[0] is not None or final is None:
+            raise Unparseable("list without a final conjunction")
+        splits = [i for i in range(1, len(items) - 1) if markers[i] not in (None, final)]
+        for i in splits:
+            # "MATH 347, or 577, and STOR 435" could group either way
+            if not items[i][1][0][2]:
+                raise Unparseable("list split at a department-less number")
+        segments, start = [], 0
+        for i in splits + [len(items)]:
+            segments.append(items[start:i])
+            start = i
+        parsed = []
+        for segment in segments:
+            inner = [None] + [marker for marker, _ in segment[1:]]
+            if len(segment) > 1 and not (inner[1:] == [final] * (len(segment) - 1)
+                                         or inner[1:] == [None] * (len(segment) - 2) + [final]):
+                raise Unparseable("conjunctions in a list don't line up")
+            exprs = [self._item(tokens) for _, tokens in segment]
+            parsed.append(exprs[0] if len(exprs) == 1 else (final, exprs))
+        if len(parsed) == 1:
+            return parsed[0]
+        return ("and" if final == "or" else "or", parsed)
+
+    def _item(self, tokens):
+        self.pos, self.item = 0, tokens
+        expr = self._and()
+        if self.pos != len(tokens):
+            raise Unparseable(f"unexpected {tokens[self.pos][1]!r}")
+        return expr
+
+    def _peek(self):
+        return self.item[self.pos][0] if self.pos < len(self.item) else None
+
+    def _and(self):
+        terms = [self._or()]
+        while self._peek() == "and":
+            self.pos += 1
+            terms.append(self._or())
+        return terms[0] if len(terms) == 1 else ("and", terms)
+
+    def _or(self):
+        terms = [self._primary()]
+        while self._peek() in ("or", "/"):
+            self.pos += 1
+            terms.append(self._primary())
+        return terms[0] if len(terms) == 1 else ("or", terms)
+
+    def _primary(self):
+        kind = self._peek()
+        if kind == "course":
+            self.pos += 1
+            return ("course", self.item[self.pos - 1][1])
+        if kind == "(":
+            self.pos += 1
+            expr = self._and()
+            if self._peek() != ")":
+                raise Unparseable("unbalanced parentheses")
+            self.pos += 1
+            return expr
+        raise Unparseable("expected a course")
+
+
+def to_cnf(expr) -> List[List[str]]:
+    """AND-list of OR-groups equivalent to the expression."""
+    kind, value = expr
+    if kind == "course":
+        return [[value]]
+    if kind == "and":
+        return [group for term in value for group in to_cnf(term)]
+    groups = [[]]
+    for term in value:
+        groups = [a + b for a in groups for b in to_cnf(term)]
+        if len(groups) > MAX_GROUPS:
+            raise Unparseable("too many alternatives to distribute")
+    return groups
+
+
+def simplify(groups: List[List[str]]) -> List[List[str]]:
+    """Deduplicate courses and drop groups implied by a smaller group."""
+    deduped = [list(dict.fromkeys(group)) for group in groups]
+    kept = []
+    for i, group in enumerate(deduped):
+        members = set(group)
+        if any(set(other) < members or (set(other) == members and j < i)
+               for j, other in enumerate(deduped) if j != i):
+            continue
+        kept.append(group)
+    return kept
+
+
+def courses_in(expr) -> List[str]:
+    kind, value = expr
+    if kind == "course":
+        return [value]
+    return [code for term in value for code in courses_in(term)]
+
+
+def parse_requisites(raw: str) -> Optional[Dict]:
+    """Parse a requisite statement, or None if it needs the LLM."""
+    try:
+        return _parse(raw)
+    except Unparseable:
+        return None
+
+
+def _parse(raw: str) -> Dict:
+    text = normalize_text(raw)
+    result = {"prerequisites": [], "corequisites": [], "grade_requirements": {}, "requisites_note": None}
+    if not text:
+        return result
+
+    notes = []
+    grades: Dict[str, str] = {}
+    department = None
+    section = None
+    # section -> list of OR-joined runs of clause expressions; runs are AND'ed
+    sections: Dict[str, List[List]] = {}
+
+    def add_grade(grade: str, codes: List[str]):
+        for code in codes:
+            grades[code] = grade.upper()
+
+    for clause in (c.strip() for c in text.split(";")):
+        header = HEADER_RE.match(clause)
+        if header:
+            name = header.group(1).lower().replace("-", "")
+            section = "both" if name.startswith("pre or") else "co" if name.startswith("co") else "pre"
+            sections.setdefault(section, [])
+            clause = header.group(2).strip()
+        elif section is None:
+            raise Unparseable("statement does not start with a requisite type")
+        if not clause:
+            raise Unparseable("empty clause")
+
+        permission = PERMISSION_RE.search(clause)
+        if permission:
+            notes.append(permission.group(1))
+            clause = clause[:permission.start()].strip()
+            if not clause:
+                continue
+        if NOTE_RE.match(clause):
+            notes.append(clause)
+            continue
+        recommended = RECOMMENDED_RE.search(clause)
+        if recommended:
+            notes.append(recommended.group(1))
+            clause = clause[:recommended.start()].strip()
+            if not clause:
+                continue
+
+        connector = "and"
+        for prefix, kind in (("or ", "or"), ("and ", "and"), ("as well as ", "and")):
+            if clause.lower().startswith(prefix):
+                connector, clause = kind, clause[len(prefix):]
+                break
+
+        for code, grade in INLINE_GRADE_RE.findall(clause):
+            add_grade(grade, [code])
+        clause = INLINE_GRADE_RE.sub(r"\1", clause)
+
+        runs = sections[section]
+        grade = GRADE_RE.match(clause)
+        if grade:
+            scope = grade.group("scope")
+            if scope is None or ALL_PREREQS_RE.match(scope):
+                codes = [code for run in runs for expr in run for code in courses_in(expr)]
+                if not codes:
+                    raise Unparseable("grade requirement without prerequisite courses")
+                add_grade(grade.group("grade"), codes)
+                continue
+            one_of = ONE_OF_RE.match(scope)
+            parser = _Clause(scope[one_of.end():] if one_of else scope, department)
+            expr = parser.parse(one_of=bool(one_of))
+            department = parser.department
+            add_grade(grade.group("grade"), courses_in(expr))
+            if runs:
+                # Names courses already required earlier in the section
+                continue
+        else:
+            if re.search(r"\bor (?:better|higher)\b", clause):
+                raise Unparseable("unrecognized grade phrasing")
+            parser = _Clause(clause, department)
+            expr = parser.parse()
+            department = parser.department
+
+        if connector == "or" and runs:
+            runs[-1].append(expr)
+        else:
+            runs.append([expr])
+
+    for name, runs in sections.items():
+        expr = ("and", [run[0] if len(run) == 1 else ("or", run) for run in runs])
+        groups = simplify(to_cnf(expr))
+        if name in ("pre", "both"):
+            result["prerequisites"].extend(groups)
+        if name in ("co", "both"):
+            result["corequisites"].extend(groups)
+    if len(result["prerequisites"]) > MAX_GROUPS or len(result["corequisites"]) > MAX_GROUPS:
+        raise Unparseable("too many groups")
+
+    # Every course in the text must have landed somewhere
+    mentioned = {f"{d} {n}" for d, n in COURSE_RE.findall(text)}
+    placed = {code for key in ("prerequisites", "corequisites") for group in result[key] for code in group}
+    note_text = " ".join(notes)
+    if any(code not in placed and code not in grades and code not in note_text for code in mentioned):
+        raise Unparseable("course dropped while parsing")
+
+    result["grade_requirements"] = grades
+    result["requisites_note"] = "; ".join(notes) or None
+    return result
@@ -0,0 +1,63 @@
+"""Offline scraper run against the saved pages in scraping/fixtures.
+
+Run from backend/:
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+
+from scraping import course_scraper
+from scraping.course_scraper import FixtureFetcher, StubRequisiteParser, scrape_all_courses
+
+FIXTURES = os.path.join(os.path.dirname(__file__), os.pardir, "scraping", "fixtures")
+
+
+def scrape(tmp_path, *args):
+    argv = ["course_scraper.py", "--fixtures", FIXTURES, "--parser", "stub", "--mode", "json",
+            "--parse-workers", "0", "--output", str(tmp_path / "courses.json"),
+            "--state", str(tmp_path / "state.json"), "--change-log", str(tmp_path / "changes.jsonl"), *args]
+    old_argv, sys.argv = sys.argv, argv
+    try:
+        course_scraper.main()
+    finally:
+        sys.argv = old_argv
+    with open(tmp_path / "courses.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_scrape_fixtures():
+    parser = StubRequisiteParser()
+    courses = scrape_all_courses(parser, None, mode="json", fetcher=FixtureFetcher(FIXTURES), parse_workers=0)
+
+    assert list(courses) == ["COMP", "MATH"]
+    by_id = {c["course_id"]: c for dept in courses.values() for c in dept}
+    assert sorted(by_id) == ["COMP 110", "COMP 210", "COMP 211", "COMP 283", "MATH 231", "MATH 232", "MATH 381"]
+    assert by_id["COMP 210"]["credits"] == "3"
+    assert by_id["COMP 110"]["requisites"] == {"prerequisites": [], "corequisites": []}
+    assert by_id["COMP 210"]["requisites"]["prerequisites"] == [["COMP 110"], ["MATH 231"]]
+    assert by_id["COMP 210"]["grade_requirements"] == {"COMP 110": "C", "MATH 231": "C"}
+    # "Pre- or corequisite" groups are stored as both
+    assert by_id["COMP 211"]["requisites"] == {
+        "prerequisites": [["COMP 210"], ["COMP 283", "MATH 381"]],
+        "corequisites": [["COMP 283", "MATH 381"]],
+    }
+    assert by_id["MATH 232"]["grade_requirements"] == {"MATH 231": "C-"}
+    assert by_id["MATH 381"]["repeat_rules"]["max_completions"] == 2
+    assert parser.local_parses == 5 and parser.api_calls == 0
+
+
+def test_incremental_rescrape(tmp_path):
+    first = scrape(tmp_path, "--incremental")
+    assert sum(len(dept) for dept in first.values()) == 7
+
+    # Nothing changed: both departments are skipped and the catalog file is kept whole
+    second = scrape(tmp_path, "--incremental")
+    assert second == first
+    with open(tmp_path / "changes.jsonl", encoding="utf-8") as f:
+        runs = [json.loads(line) for line in f]
+    assert runs[0]["summary"]["courses_added"] == 7
+    summary = runs[1]["summary"]
+    assert summary["departments_not_modified"] + summary["departments_unchanged"] == 2
+    assert summary["departments_changed"] == 0
+    assert summary["courses_added"] == summary["courses_modified"] == summary["courses_removed"] == 0
@@ -0,0 +1,47 @@
+-- Catalog change notifications for databases created before notify_catalog_changed
+-- Run with: psql "$DATABASE_URL" -f db_setup/migrations/001_catalog_notify.sql
+
+-- Notify API workers when catalog data changes so in-memory indexes reload.
+-- Statement-level, so a bulk scrape commit sends one notification per table.
+CREATE OR REPLACE FUNCTION notify_catalog_changed()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('catalog_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notify_departments_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON departments
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+-- Only catalog columns; embedding and search_vector updates don't count
+CREATE TRIGGER notify_courses_changed
+AFTER INSERT OR DELETE OR TRUNCATE
+    OR UPDATE OF course_id, department_id, course_number, name, description, credits, grading_status, requisites_note
+ON courses
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_prerequisites_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON prerequisites
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_grade_requirements_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON grade_requirements
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_gen_ed_fulfillments_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON gen_ed_fulfillments
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_programs_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON programs
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_program_requirements_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON program_requirements
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_program_requirement_courses_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON program_requirement_courses
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
@@ -0,0 +1,20 @@
+-- Shared catalog version for API response caches
+-- Run with: psql "$DATABASE_URL" -f db_setup/migrations/002_catalog_version.sql
+
+-- Single-row counter bumped on every catalog write; API caches key on it
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO catalog_version DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION notify_catalog_changed()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = NOW();
+    PERFORM pg_notify('catalog_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
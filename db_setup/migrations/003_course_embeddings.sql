@@ -0,0 +1,26 @@
+-- Resize course embeddings for the local sentence-transformers model
+-- Run with: psql "$DATABASE_URL" -f db_setup/migrations/003_course_embeddings.sql
+-- Then fill them: cd backend && python -m scraping.embed_courses --reindex
+
+-- all-MiniLM-L6-v2 produces 384-d vectors (EMBEDDING_DIM). The column was
+-- never populated, so existing values are dropped rather than converted.
+DROP INDEX IF EXISTS idx_course_embedding;
+ALTER TABLE courses ALTER COLUMN embedding TYPE vector(384) USING NULL;
+CREATE INDEX idx_course_embedding ON courses USING ivfflat (embedding vector_cosine_ops);
+
+-- Clear embeddings whose source text changed so embed_courses.py recomputes them
+CREATE OR REPLACE FUNCTION clear_stale_course_embedding()
+RETURNS trigger AS $$
+BEGIN
+    IF NEW.name IS DISTINCT FROM OLD.name OR NEW.description IS DISTINCT FROM OLD.description THEN
+        NEW.embedding := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS clear_stale_course_embedding_trigger ON courses;
+CREATE TRIGGER clear_stale_course_embedding_trigger
+BEFORE UPDATE OF name, description ON courses
+FOR EACH ROW
+EXECUTE FUNCTION clear_stale_course_embedding();
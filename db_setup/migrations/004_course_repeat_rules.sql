@@ -0,0 +1,7 @@
+-- Repeat-rule columns written by scraping/course_scraper.py
+-- Run with: psql "$DATABASE_URL" -f db_setup/migrations/004_course_repeat_rules.sql
+
+ALTER TABLE courses
+    ADD COLUMN IF NOT EXISTS repeatable BOOLEAN DEFAULT FALSE,
+    ADD COLUMN IF NOT EXISTS max_repeat_credits INTEGER,
+    ADD COLUMN IF NOT EXISTS max_repeat_completions INTEGER;
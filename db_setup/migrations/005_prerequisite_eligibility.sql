@@ -0,0 +1,87 @@
+-- Set-based prerequisite eligibility that honors grade_requirements
+-- Run with: psql "$DATABASE_URL" -f db_setup/migrations/005_prerequisite_eligibility.sql
+
+-- Letter grades on a comparable scale; anything else (P, transfer credit, ...) is NULL
+CREATE OR REPLACE FUNCTION grade_rank(p_grade TEXT)
+RETURNS INTEGER AS $$
+    SELECT CASE upper(trim(p_grade))
+        WHEN 'A' THEN 12 WHEN 'A-' THEN 11
+        WHEN 'B+' THEN 10 WHEN 'B' THEN 9 WHEN 'B-' THEN 8
+        WHEN 'C+' THEN 7 WHEN 'C' THEN 6 WHEN 'C-' THEN 5
+        WHEN 'D+' THEN 4 WHEN 'D' THEN 3 WHEN 'D-' THEN 2
+        WHEN 'F' THEN 0
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Eligibility of every (student, course) pair in one statement.
+-- p_course_ids NULL checks the whole catalog. A prerequisite group is met
+-- when some option was completed with a passing grade at or above its
+-- grade_requirements minimum; missing_groups lists the prereq_group values
+-- no completed course satisfies (one anti-join per pair, not one query per group).
+CREATE OR REPLACE FUNCTION prerequisite_eligibility(
+    p_student_ids UUID[],
+    p_course_ids INTEGER[] DEFAULT NULL
+) RETURNS TABLE (
+    student_id UUID,
+    course_id INTEGER,
+    prerequisites_met BOOLEAN,
+    missing_groups INTEGER[]
+) AS $$
+    WITH passed AS (
+        SELECT sc.student_id, sc.course_id, sc.grade
+        FROM student_courses sc
+        WHERE sc.student_id = ANY(p_student_ids)
+            AND sc.status = 'completed'
+            AND sc.grade NOT IN ('F', 'FA', 'AB')
+    ),
+    pairs AS (
+        SELECT s.student_id, c.id AS course_id
+        FROM unnest(p_student_ids) AS s(student_id)
+        CROSS JOIN courses c
+        WHERE p_course_ids IS NULL OR c.id = ANY(p_course_ids)
+    ),
+    groups AS (
+        SELECT DISTINCT p.course_id, p.prereq_group
+        FROM prerequisites p
+        WHERE NOT p.is_corequisite
+            AND (p_course_ids IS NULL OR p.course_id = ANY(p_course_ids))
+    ),
+    missing AS (
+        SELECT pr.student_id, pr.course_id, array_agg(g.prereq_group ORDER BY g.prereq_group) AS missing_groups
+        FROM pairs pr
+        JOIN groups g ON g.course_id = pr.course_id
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM prerequisites p
+            JOIN passed ps ON ps.course_id = p.prereq_course_id AND ps.student_id = pr.student_id
+            WHERE p.course_id = g.course_id
+                AND p.prereq_group = g.prereq_group
+                AND NOT p.is_corequisite
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM grade_requirements gr
+                    WHERE gr.course_id = p.course_id
+                        AND gr.required_course_id = p.prereq_course_id
+                        AND grade_rank(gr.minimum_grade) IS NOT NULL
+                        AND COALESCE(grade_rank(ps.grade) < grade_rank(gr.minimum_grade), TRUE)
+                )
+        )
+        GROUP BY pr.student_id, pr.course_id
+    )
+    SELECT pr.student_id, pr.course_id, m.missing_groups IS NULL, COALESCE(m.missing_groups, '{}')
+    FROM pairs pr
+    LEFT JOIN missing m ON m.student_id = pr.student_id AND m.course_id = pr.course_id
+$$ LANGUAGE sql STABLE;
+
+-- The single-pair check now delegates to the set-based version
+CREATE OR REPLACE FUNCTION check_prerequisites_met(
+    p_student_id UUID,
+    p_course_id INTEGER
+) RETURNS BOOLEAN AS $$
+    SELECT COALESCE(
+        (SELECT prerequisites_met FROM prerequisite_eligibility(ARRAY[p_student_id], ARRAY[p_course_id])),
+        TRUE
+    )
+$$ LANGUAGE sql STABLE;
+
+CREATE INDEX IF NOT EXISTS idx_grade_requirements_pair ON grade_requirements(course_id, required_course_id);
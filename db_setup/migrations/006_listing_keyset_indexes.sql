@@ -0,0 +1,9 @@
+-- Indexes matching the keyset order of the paginated listing endpoints,
+-- so each page is an index range scan starting at the cursor
+-- Run with: psql "$DATABASE_URL" -f db_setup/migrations/006_listing_keyset_indexes.sql
+
+-- /api/departments/{dept_code}/courses: ORDER BY course_number, course_id within a department
+CREATE INDEX IF NOT EXISTS idx_course_dept_number ON courses(department_id, course_number, course_id);
+
+-- /api/programs: ORDER BY name, program_id
+CREATE INDEX IF NOT EXISTS idx_programs_name ON programs(name, program_id);
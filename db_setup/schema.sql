@@ -25,8 +25,11 @@ CREATE TABLE courses (
     credits VARCHAR(10), -- Some are ranges like '3-6'
     grading_status TEXT,
     requisites_note TEXT, -- For "permission of instructor", "may be repeated", etc.
+    repeatable BOOLEAN DEFAULT FALSE,
+    max_repeat_credits INTEGER,
+    max_repeat_completions INTEGER,
     -- For semantic search
-    embedding vector(1536),
+    embedding vector(384), -- EMBEDDING_DIM; filled by scraping/embed_courses.py
     search_vector tsvector,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
@@ -36,6 +39,7 @@ CREATE TABLE courses (
 CREATE INDEX idx_course_id ON courses(course_id);
 CREATE INDEX idx_course_dept ON courses(department_id);
 CREATE INDEX idx_course_number ON courses(course_number);
+CREATE INDEX idx_course_dept_number ON courses(department_id, course_number, course_id);
 CREATE INDEX idx_course_search ON courses USING GIN(search_vector);
 CREATE INDEX idx_course_embedding ON courses USING ivfflat (embedding vector_cosine_ops);
 
@@ -56,6 +60,22 @@ BEFORE INSERT OR UPDATE ON courses
 FOR EACH ROW
 EXECUTE FUNCTION update_course_search_vector();
 
+-- Clear embeddings whose source text changed so embed_courses.py recomputes them
+CREATE OR REPLACE FUNCTION clear_stale_course_embedding()
+RETURNS trigger AS $$
+BEGIN
+    IF NEW.name IS DISTINCT FROM OLD.name OR NEW.description IS DISTINCT FROM OLD.description THEN
+        NEW.embedding := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER clear_stale_course_embedding_trigger
+BEFORE UPDATE OF name, description ON courses
+FOR EACH ROW
+EXECUTE FUNCTION clear_stale_course_embedding();
+
 -- Gen Ed Fulfillments table (NEW)
 CREATE TABLE gen_ed_fulfillments (
     id SERIAL PRIMARY KEY,
@@ -89,6 +109,8 @@ CREATE TABLE grade_requirements (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+CREATE INDEX idx_grade_requirements_pair ON grade_requirements(course_id, required_course_id);
+
 -- Programs table (majors, minors, etc.)
 CREATE TABLE programs (
     id SERIAL PRIMARY KEY,
@@ -102,6 +124,8 @@ CREATE TABLE programs (
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
+CREATE INDEX idx_programs_name ON programs(name, program_id);
+
 -- Program requirements (flexible structure for various requirement types)
 CREATE TABLE program_requirements (
     id SERIAL PRIMARY KEY,
@@ -214,41 +238,88 @@ FROM gen_ed_fulfillments g
 JOIN courses c ON g.course_id = c.id
 ORDER BY g.gen_ed_code, g.requirement_group, c.course_id;
 
--- Function to check if prerequisites are met
+-- Letter grades on a comparable scale; anything else (P, transfer credit, ...) is NULL
+CREATE OR REPLACE FUNCTION grade_rank(p_grade TEXT)
+RETURNS INTEGER AS $
+    SELECT CASE upper(trim(p_grade))
+        WHEN 'A' THEN 12 WHEN 'A-' THEN 11
+        WHEN 'B+' THEN 10 WHEN 'B' THEN 9 WHEN 'B-' THEN 8
+        WHEN 'C+' THEN 7 WHEN 'C' THEN 6 WHEN 'C-' THEN 5
+        WHEN 'D+' THEN 4 WHEN 'D' THEN 3 WHEN 'D-' THEN 2
+        WHEN 'F' THEN 0
+    END
+$ LANGUAGE sql IMMUTABLE;
+
+-- Eligibility of every (student, course) pair in one statement.
+-- p_course_ids NULL checks the whole catalog. A prerequisite group is met
+-- when some option was completed with a passing grade at or above its
+-- grade_requirements minimum; missing_groups lists the prereq_group values
+-- no completed course satisfies (one anti-join per pair, not one query per group).
+CREATE OR REPLACE FUNCTION prerequisite_eligibility(
+    p_student_ids UUID[],
+    p_course_ids INTEGER[] DEFAULT NULL
+) RETURNS TABLE (
+    student_id UUID,
+    course_id INTEGER,
+    prerequisites_met BOOLEAN,
+    missing_groups INTEGER[]
+) AS $
+    WITH passed AS (
+        SELECT sc.student_id, sc.course_id, sc.grade
+        FROM student_courses sc
+        WHERE sc.student_id = ANY(p_student_ids)
+            AND sc.status = 'completed'
+            AND sc.grade NOT IN ('F', 'FA', 'AB')
+    ),
+    pairs AS (
+        SELECT s.student_id, c.id AS course_id
+        FROM unnest(p_student_ids) AS s(student_id)
+        CROSS JOIN courses c
+        WHERE p_course_ids IS NULL OR c.id = ANY(p_course_ids)
+    ),
+    groups AS (
+        SELECT DISTINCT p.course_id, p.prereq_group
+        FROM prerequisites p
+        WHERE NOT p.is_corequisite
+            AND (p_course_ids IS NULL OR p.course_id = ANY(p_course_ids))
+    ),
+    missing AS (
+        SELECT pr.student_id, pr.course_id, array_agg(g.prereq_group ORDER BY g.prereq_group) AS missing_groups
+        FROM pairs pr
+        JOIN groups g ON g.course_id = pr.course_id
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM prerequisites p
+            JOIN passed ps ON ps.course_id = p.prereq_course_id AND ps.student_id = pr.student_id
+            WHERE p.course_id = g.course_id
+                AND p.prereq_group = g.prereq_group
+                AND NOT p.is_corequisite
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM grade_requirements gr
+                    WHERE gr.course_id = p.course_id
+                        AND gr.required_course_id = p.prereq_course_id
+                        AND grade_rank(gr.minimum_grade) IS NOT NULL
+                        AND COALESCE(grade_rank(ps.grade) < grade_rank(gr.minimum_grade), TRUE)
+                )
+        )
+        GROUP BY pr.student_id, pr.course_id
+    )
+    SELECT pr.student_id, pr.course_id, m.missing_groups IS NULL, COALESCE(m.missing_groups, '{}')
+    FROM pairs pr
+    LEFT JOIN missing m ON m.student_id = pr.student_id AND m.course_id = pr.course_id
+$ LANGUAGE sql STABLE;
+
+-- The single-pair check now delegates to the set-based version
 CREATE OR REPLACE FUNCTION check_prerequisites_met(
     p_student_id UUID,
     p_course_id INTEGER
 ) RETURNS BOOLEAN AS $
-DECLARE
-    prereq_group RECORD;
-    group_met BOOLEAN;
-BEGIN
-    -- Check each prerequisite group (groups are AND'ed)
-    FOR prereq_group IN 
-        SELECT DISTINCT prereq_group 
-        FROM prerequisites 
-        WHERE course_id = p_course_id AND NOT is_corequisite
-    LOOP
-        -- Check if at least one course in the group is completed (OR within group)
-        SELECT EXISTS(
-            SELECT 1
-            FROM prerequisites p
-            JOIN student_courses sc ON sc.course_id = p.prereq_course_id
-            WHERE p.course_id = p_course_id 
-            AND p.prereq_group = prereq_group.prereq_group
-            AND sc.student_id = p_student_id
-            AND sc.status = 'completed'
-            AND sc.grade NOT IN ('F', 'FA', 'AB')
-        ) INTO group_met;
-        
-        IF NOT group_met THEN
-            RETURN FALSE;
-        END IF;
-    END LOOP;
-    
-    RETURN TRUE;
-END;
-$ LANGUAGE plpgsql;
+    SELECT COALESCE(
+        (SELECT prerequisites_met FROM prerequisite_eligibility(ARRAY[p_student_id], ARRAY[p_course_id])),
+        TRUE
+    )
+$ LANGUAGE sql STABLE;
 
 -- Add updated_at triggers
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -266,4 +337,59 @@ CREATE TRIGGER update_programs_updated_at BEFORE UPDATE ON programs
 FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 CREATE TRIGGER update_students_updated_at BEFORE UPDATE ON students
-FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
\ No newline at end of file
+FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Single-row counter bumped on every catalog write; API caches key on it
+CREATE TABLE catalog_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+INSERT INTO catalog_version DEFAULT VALUES;
+
+-- Notify API workers when catalog data changes so in-memory indexes reload.
+-- Statement-level, so a bulk scrape commit sends one notification per table.
+CREATE OR REPLACE FUNCTION notify_catalog_changed()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = NOW();
+    PERFORM pg_notify('catalog_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER notify_departments_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON departments
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+-- Only catalog columns; embedding and search_vector updates don't count
+CREATE TRIGGER notify_courses_changed
+AFTER INSERT OR DELETE OR TRUNCATE
+    OR UPDATE OF course_id, department_id, course_number, name, description, credits, grading_status, requisites_note
+ON courses
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_prerequisites_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON prerequisites
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_grade_requirements_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON grade_requirements
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_gen_ed_fulfillments_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON gen_ed_fulfillments
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_programs_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON programs
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_program_requirements_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON program_requirements
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
+
+CREATE TRIGGER notify_program_requirement_courses_changed
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON program_requirement_courses
+FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_changed();
@@ -16,13 +16,13 @@ interface CourseSelectorProps {
 
 export function CourseSelector({ onAddCourse }: CourseSelectorProps) {
   const [searchQuery, setSearchQuery] = useState('');
-  const debouncedQuery = useDebounce(searchQuery, 300);
+  const debouncedQuery = useDebounce(searchQuery, 100);
   const { schedule } = useSchedule();
 
   const { data: courses, isLoading } = useQuery({
-    queryKey: ['courses', 'search', debouncedQuery],
-    queryFn: () => courseApi.searchCourses(debouncedQuery),
-    enabled: debouncedQuery.length > 2,
+    queryKey: ['courses', 'autocomplete', debouncedQuery],
+    queryFn: () => courseApi.autocompleteCourses(debouncedQuery),
+    enabled: debouncedQuery.trim().length > 0,
   });
 
   // Get all courses already in the schedule
@@ -1,6 +1,7 @@
 // lib/api.ts
 import axios from 'axios';
-import { Course, CoursePrerequisites, Department, SearchResult } from '@/types/course';
+import { Course, CourseBatch, CoursePrerequisites, CourseSuggestion, Department, SearchResult } from '@/types/course';
+import { PlanEdit, PlanValidation, PlanViolation } from '@/types/planner';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -24,6 +25,12 @@ export const courseApi = {
     return data;
   },
 
+  // Get many courses with their prerequisite groups in one request
+  getCourses: async (courseIds: string[]): Promise<CourseBatch> => {
+    const { data } = await api.post('/api/courses/batch', { course_ids: courseIds });
+    return data;
+  },
+
   // Search courses
   searchCourses: async (query: string, limit: number = 20): Promise<SearchResult[]> => {
     const { data } = await api.get('/api/courses/search', {
@@ -32,6 +39,14 @@ export const courseApi = {
     return data;
   },
 
+  // Typeahead suggestions by course code or name prefix
+  autocompleteCourses: async (query: string, limit: number = 10): Promise<CourseSuggestion[]> => {
+    const { data } = await api.get('/api/courses/autocomplete', {
+      params: { q: query, limit },
+    });
+    return data;
+  },
+
   // Get all departments
   getDepartments: async (): Promise<Department[]> => {
     const { data } = await api.get('/api/departments');
@@ -65,4 +80,23 @@ export const programApi = {
     const { data } = await api.get(`/api/programs/${programId}/requirements`);
     return data;
   },
+};
+
+export const plannerApi = {
+  // Apply schedule edits and re-check only the affected courses; pass the previous
+  // violations to validate incrementally, or omit them to check the whole plan
+  validatePlan: async (
+    semesters: { id: string; courses: string[] }[],
+    edits: PlanEdit[] = [],
+    violations?: PlanViolation[],
+    completedCourses: string[] = []
+  ): Promise<PlanValidation> => {
+    const { data } = await api.post('/api/planner/validate-plan', {
+      completed_courses: completedCourses,
+      semesters,
+      edits,
+      violations,
+    });
+    return data;
+  },
 };
\ No newline at end of file
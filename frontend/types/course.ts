@@ -24,6 +24,17 @@ export interface CoursePrerequisites {
   corequisite_groups: PrerequisiteGroup[];
 }
 
+export interface CourseDetails extends Course {
+  requisites_note: string | null;
+  prerequisite_groups: PrerequisiteGroup[];
+  corequisite_groups: PrerequisiteGroup[];
+}
+
+export interface CourseBatch {
+  courses: CourseDetails[];
+  missing: string[];
+}
+
 export interface Department {
   id: number;
   code: string;
@@ -33,4 +44,12 @@ export interface Department {
 
 export interface SearchResult extends Course {
   rank?: number;
-}
\ No newline at end of file
+}
+
+export interface CourseSuggestion {
+  course_id: string;
+  name: string;
+  credits: string | null;
+  department_code: string;
+  match: 'exact' | 'code' | 'name';
+}
@@ -28,4 +28,28 @@ export interface PrerequisiteCheck {
   canTake: boolean;
   missingPrereqs: string[];
   warnings: string[];
-}
\ No newline at end of file
+}
+
+export interface PlanEdit {
+  action: 'add' | 'remove' | 'move';
+  course_id: string;
+  from_semester?: string;
+  to_semester?: string;
+}
+
+export interface PlanViolation {
+  course_id: string;
+  semester_id: string;
+  missing_prerequisites: string[];
+  missing_corequisites: string[];
+  scheduled_too_late: { course_id: string; semester_id: string }[];
+  warnings: string[];
+}
+
+export interface PlanValidation {
+  valid: boolean;
+  violations: PlanViolation[];
+  semesters: { id: string; courses: string[] }[];
+  rechecked: number;
+  elapsed_ms: number;
+}